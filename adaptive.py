@@ -0,0 +1,198 @@
+"""
+Adaptive quiz engine driven by the ontology class hierarchy.
+
+Instead of a fixed 5 questions per module, an adaptive quiz picks each next
+question from the learner's running mastery estimate. Mastery is tracked per
+ontology class as a Beta(correct + 1, wrong + 1) posterior; answering a
+question updates the classes it is tagged with (its "concepts", see
+questions.py) and all of their ancestors, so evidence about Malicious_Email
+also counts towards Infection_Vectors.
+
+Each step asks about the module whose estimate is least certain (largest
+posterior standard deviation) and, within it, the least certain concept that
+still has unused questions. The quiz ends once every module's deviation is
+at or below a target, so learners who clearly know (or clearly don't know) a
+module are not asked about it again and again.
+
+Everything that depends only on the content is precomputed once per content
+version in an AdaptiveModel: each question's update set (from the ancestor
+queries of ontology_index.OntologyIndex) and the question IDs per
+(module, concept) cell. A session then only keeps its sparse posteriors and two levels of heaps with
+lazy invalidation, so a selection step costs O(log n) in the number of
+modules and concepts, independent of the bank size.
+"""
+import heapq
+import math
+import random
+import weakref
+from math import factorial
+
+# Stop once every module's posterior standard deviation is at most this.
+TARGET_SD = 0.2
+MAX_QUESTIONS = 20
+
+
+def beta_sd(a, b):
+    """Standard deviation of a Beta(a, b) distribution."""
+    n = a + b
+    return math.sqrt(a * b / (n * n * (n + 1)))
+
+
+_PRIOR_SD = beta_sd(1, 1)
+
+
+class AdaptiveModel:
+    """Content-dependent tables shared by every adaptive session.
+
+    Built from an ontology_index.OntologyIndex over the content's ontology and
+    the QuestionClasses tagging ``bank``; modules are those whose class is in
+    the ontology and that have questions.
+    """
+
+    def __init__(self, index, bank, question_classes):
+        self.index = index
+        self.bank = bank
+        self.modules = {m: c for m, c in question_classes.module_class.items() if bank.count(m)}
+        # question ID -> classes whose mastery its answer updates
+        self.updates = [()] * len(bank)
+        # module title -> {concept class ID: tuple of question IDs}
+        self.cells = {}
+        for m in self.modules:
+            cells = {}
+            for qid in bank.ids(m):
+                classes = question_classes[qid]
+                update = set()
+                for c in classes:
+                    update.update(index.ancestors(c))
+                self.updates[qid] = tuple(sorted(update))
+                cells.setdefault(classes[0], []).append(qid)
+            self.cells[m] = {c: tuple(ids) for c, ids in cells.items()}
+        self.module_of_class = {c: m for m, c in self.modules.items()}
+        self.cell_module = {c: m for m, cells in self.cells.items() for c in cells}
+
+    def session(self, seed, target_sd=TARGET_SD, max_questions=MAX_QUESTIONS):
+        return AdaptiveSession(self, seed, target_sd, max_questions)
+
+
+_models = weakref.WeakKeyDictionary()  # bank -> AdaptiveModel
+
+
+def shared_model(index, bank, question_classes):
+    """The AdaptiveModel for one content version, built on first use."""
+    model = _models.get(bank)
+    if model is None or model.index is not index:
+        model = _models[bank] = AdaptiveModel(index, bank, question_classes)
+    return model
+
+
+class AdaptiveSession:
+    """One learner's adaptive quiz: posteriors, selection heaps and used questions.
+
+    Call ``next_item()`` for the next ``(question ID, option code)`` and
+    ``record(qid, correct)`` with the learner's first answer to it. Selection
+    only uses an RNG seeded with ``seed``, so the same seed and the same
+    answers always give the same quiz.
+    """
+
+    def __init__(self, model, seed, target_sd=TARGET_SD, max_questions=MAX_QUESTIONS):
+        self.model = model
+        self.seed = seed
+        self.target_sd = target_sd
+        self.max_questions = max_questions
+        self.rng = random.Random(seed)
+        self.asked = 0
+        self.used = set()
+        self.counts = {}  # class index -> [correct, wrong]; absent means no evidence
+        self._version = {}  # class index -> number of updates, for lazy invalidation
+        self._remaining = {}  # (module, concept) -> unused question IDs, copied on first use
+        self._exhausted = set()  # modules with no unused questions left
+        # Heap entries are (-sd, tie-break, key, version); stale ones are skipped on pop.
+        self._modules = [(-_PRIOR_SD, self.rng.random(), m, 0) for m in model.modules]
+        heapq.heapify(self._modules)
+        self._concepts = {}
+        for m, cells in model.cells.items():
+            heap = [(-_PRIOR_SD, self.rng.random(), c, 0) for c in cells]
+            heapq.heapify(heap)
+            self._concepts[m] = heap
+
+    def sd(self, cls):
+        correct, wrong = self.counts.get(cls, (0, 0))
+        return beta_sd(correct + 1, wrong + 1)
+
+    def mean(self, cls):
+        correct, wrong = self.counts.get(cls, (0, 0))
+        return (correct + 1) / (correct + wrong + 2)
+
+    def _top(self, heap, valid):
+        while heap:
+            neg_sd, _, key, version = heap[0]
+            if valid(key, version):
+                return key, -neg_sd
+            heapq.heappop(heap)
+        return None, None
+
+    def _module_valid(self, m, version):
+        return m not in self._exhausted and version == self._version.get(self.model.modules[m], 0)
+
+    def _pick_module(self):
+        return self._top(self._modules, self._module_valid)
+
+    def _pick_question(self, m):
+        heap = self._concepts[m]
+        while True:
+            concept, _ = self._top(heap, lambda c, v: v == self._version.get(c, 0))
+            if concept is None:
+                return None
+            remaining = self._remaining.get((m, concept))
+            if remaining is None:
+                remaining = self._remaining[(m, concept)] = list(self.model.cells[m][concept])
+            while remaining:
+                # swap-remove a random entry: O(1) per draw
+                k = self.rng.randrange(len(remaining))
+                remaining[k], remaining[-1] = remaining[-1], remaining[k]
+                qid = remaining.pop()
+                if qid not in self.used:
+                    return qid
+            heapq.heappop(heap)  # cell exhausted
+
+    def done(self):
+        """True once every module is measured precisely enough, or nothing is left to ask."""
+        if self.asked >= self.max_questions:
+            return True
+        m, sd = self._pick_module()
+        return m is None or sd <= self.target_sd
+
+    def next_item(self):
+        """Next ``(question ID, option code)``, or None when the quiz is over."""
+        while not self.done():
+            m, _ = self._pick_module()
+            qid = self._pick_question(m)
+            if qid is None:
+                self._exhausted.add(m)
+                continue
+            self.used.add(qid)
+            self.asked += 1
+            # A uniform rank in [0, n!) is a uniform permutation of n options.
+            code = self.rng.randrange(factorial(len(self.model.bank[qid]["options"])))
+            return qid, code
+        return None
+
+    def record(self, qid, correct):
+        """Update every class the question's answer bears on."""
+        for cls in self.model.updates[qid]:
+            counts = self.counts.get(cls)
+            if counts is None:
+                counts = self.counts[cls] = [0, 0]
+            counts[0 if correct else 1] += 1
+            version = self._version[cls] = self._version.get(cls, 0) + 1
+            neg_sd = -self.sd(cls)
+            m = self.model.module_of_class.get(cls)
+            if m is not None:
+                heapq.heappush(self._modules, (neg_sd, self.rng.random(), m, version))
+            m = self.model.cell_module.get(cls)
+            if m is not None:
+                heapq.heappush(self._concepts[m], (neg_sd, self.rng.random(), cls, version))
+
+    def mastery(self):
+        """Module title -> (estimated mastery, standard deviation)."""
+        return {m: (self.mean(c), self.sd(c)) for m, c in self.model.modules.items()}
@@ -0,0 +1,94 @@
+"""
+Per-module score aggregation.
+
+ModuleScores holds correct/total counters per module. A session's counters are
+created once when its quiz starts and updated as each answer is submitted, so
+the results page reads them in O(modules) instead of rescanning the quiz.
+
+The same counters merge across attempts, which gives cohort-level rollups
+over stored attempts at one course (see cohort_rollup).
+"""
+
+
+class ModuleScores:
+    """Correct/total counts per module, in the order modules were first seen."""
+
+    def __init__(self, totals=None):
+        self.totals = dict(totals or {})
+        self.correct = dict.fromkeys(self.totals, 0)
+
+    @classmethod
+    def for_quiz(cls, bank, question_ids):
+        """Empty counters sized for a quiz made of ``question_ids``."""
+        totals = {}
+        for qid in question_ids:
+            m = bank[qid].get("module", "General")
+            totals[m] = totals.get(m, 0) + 1
+        return cls(totals)
+
+    def add_question(self, module):
+        """Count one more question in ``module`` (quizzes that grow as they go)."""
+        self.totals[module] = self.totals.get(module, 0) + 1
+        self.correct.setdefault(module, 0)
+
+    def record(self, module, is_correct, was_correct=None):
+        """Apply one submitted answer.
+
+        ``was_correct`` is the result of this question's previous answer, if it
+        had one, so re-answering a question moves the count instead of adding
+        to it.
+        """
+        delta = int(bool(is_correct)) - int(bool(was_correct))
+        if delta:
+            self.correct[module] = self.correct.get(module, 0) + delta
+
+    def reset(self):
+        """Clear correct counts, keeping totals (e.g. for a retake)."""
+        self.correct = dict.fromkeys(self.totals, 0)
+
+    def merge(self, other):
+        """Add another set of counters into this one; returns self."""
+        for m, tot in other.totals.items():
+            self.totals[m] = self.totals.get(m, 0) + tot
+        for m, corr in other.correct.items():
+            self.correct[m] = self.correct.get(m, 0) + corr
+        return self
+
+    def rows(self):
+        """(module, correct, total) for every module."""
+        return [(m, self.correct.get(m, 0), tot) for m, tot in self.totals.items()]
+
+    @property
+    def score(self):
+        return sum(self.correct.values())
+
+    @property
+    def total(self):
+        return sum(self.totals.values())
+
+
+def cohort_rollup(store, bank, course="default"):
+    """Aggregate the stored attempts at ``course`` into per-module counters.
+
+    Only attempts taken against ``bank`` count: those stored with another
+    bank version, or (from before versions were stored) presenting question
+    IDs that ``bank`` does not have, are skipped. Totals count every question
+    presented; correct counts the latest answer per question. Returns
+    ``(ModuleScores, learner count)``.
+    """
+    version = bank.version
+    rollup = ModuleScores()
+    learners = set()
+    presented = set()
+    for att in store.attempts():
+        if att.course != course or att.bank_version not in (None, version):
+            continue
+        if any(not 0 <= qid < len(bank) for qid in att.question_ids):
+            continue
+        learners.add(att.learner_id)
+        presented.add(att.attempt_id)
+        rollup.merge(ModuleScores.for_quiz(bank, att.question_ids))
+    for attempt_id, qid, _option, correct in store.answer_rows(course, version):
+        if correct and attempt_id in presented:
+            rollup.record(bank[qid].get("module", "General"), True)
+    return rollup, len(learners)
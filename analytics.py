@@ -0,0 +1,278 @@
+"""
+Cohort item analytics over stored quiz attempts.
+
+Answers are loaded once into flat NumPy columns (attempt index, question ID,
+chosen option, correct flag) and every statistic is computed with vectorised
+``bincount`` reductions over those columns, never a Python loop per answer:
+
+- difficulty (p-value): share of responses that were correct
+- discrimination: point-biserial correlation between getting the item right
+  and the learner's score on the rest of the attempt
+- distractor analysis: share of responses that chose each option
+- per-module reliability: KR-20, using the mean number of module items per
+  attempt since every attempt sees a different random subset of questions
+
+Run ``python analytics.py`` for a report on the attempt database, or
+``python analytics.py --synthetic 1000000`` to time a million answer rows.
+"""
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class AnswerColumns:
+    attempt: np.ndarray  # int32 attempt index, 0..n_attempts-1
+    question: np.ndarray  # int32 question ID
+    option: np.ndarray  # int16 chosen option (bank order)
+    correct: np.ndarray  # int8 0/1
+    n_attempts: int
+
+    def __len__(self):
+        return len(self.question)
+
+    def select(self, mask):
+        """The rows where ``mask`` is true, with attempts renumbered to those left."""
+        kept, attempt = np.unique(self.attempt[mask], return_inverse=True)
+        return AnswerColumns(
+            attempt=attempt.astype(np.int32),
+            question=self.question[mask],
+            option=self.option[mask],
+            correct=self.correct[mask],
+            n_attempts=len(kept),
+        )
+
+
+def load_columns(rows):
+    """Build AnswerColumns from ``(attempt_id, question_id, option, correct)`` rows."""
+    attempt_index = {}
+    attempts, questions, options, corrects = [], [], [], []
+    for attempt_id, qid, option, correct in rows:
+        attempts.append(attempt_index.setdefault(attempt_id, len(attempt_index)))
+        questions.append(qid)
+        options.append(option)
+        corrects.append(correct)
+    return AnswerColumns(
+        attempt=np.asarray(attempts, dtype=np.int32),
+        question=np.asarray(questions, dtype=np.int32),
+        option=np.asarray(options, dtype=np.int16),
+        correct=np.asarray(corrects, dtype=np.int8),
+        n_attempts=len(attempt_index),
+    )
+
+
+def _safe_divide(num, den):
+    out = np.full(np.shape(num), np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def item_statistics(cols, n_items, n_options):
+    """Per-question response counts, p-values, point-biserials and option rates.
+
+    Returns a dict of arrays indexed by question ID; ``option_rates`` has shape
+    ``(n_items, n_options)``. Items with no responses (or no variance) get NaN.
+    """
+    x = cols.correct.astype(np.float64)
+    responses = np.bincount(cols.question, minlength=n_items).astype(np.float64)
+    sum_x = np.bincount(cols.question, weights=x, minlength=n_items)
+    p_value = _safe_divide(sum_x, responses)
+
+    # Rest score: the attempt's total minus this item, so an item does not
+    # correlate with itself.
+    totals = np.bincount(cols.attempt, weights=x, minlength=cols.n_attempts)
+    y = totals[cols.attempt] - x
+    sum_y = np.bincount(cols.question, weights=y, minlength=n_items)
+    sum_yy = np.bincount(cols.question, weights=y * y, minlength=n_items)
+    sum_xy = np.bincount(cols.question, weights=x * y, minlength=n_items)
+    n = responses
+    cov = n * sum_xy - sum_x * sum_y
+    var_x = n * sum_x - sum_x * sum_x  # x is 0/1, so sum(x*x) == sum(x)
+    var_y = n * sum_yy - sum_y * sum_y
+    point_biserial = _safe_divide(cov, np.sqrt(np.clip(var_x * var_y, 0, None)))
+
+    flat = cols.question.astype(np.int64) * n_options + cols.option
+    option_counts = np.bincount(flat, minlength=n_items * n_options).reshape(n_items, n_options)
+    option_rates = _safe_divide(option_counts, responses[:, None])
+
+    return {
+        "responses": responses.astype(np.int64),
+        "p_value": p_value,
+        "point_biserial": point_biserial,
+        "option_rates": option_rates,
+    }
+
+
+def module_reliability(cols, item_module, n_modules):
+    """KR-20 per module.
+
+    ``item_module`` maps question ID -> module index. Returns a dict of arrays
+    indexed by module: ``kr20`` and ``items_per_attempt``.
+    """
+    x = cols.correct.astype(np.float64)
+    module = item_module[cols.question]
+    # One cell per (attempt, module): that attempt's score and item count there.
+    cell = cols.attempt.astype(np.int64) * n_modules + module
+    size = cols.n_attempts * n_modules
+    cell_items = np.bincount(cell, minlength=size).reshape(cols.n_attempts, n_modules)
+    cell_score = np.bincount(cell, weights=x, minlength=size).reshape(cols.n_attempts, n_modules)
+
+    seen = cell_items > 0
+    takers = seen.sum(axis=0)
+    k = _safe_divide(cell_items.sum(axis=0), takers)
+    mean = _safe_divide(cell_score.sum(axis=0), takers)
+    var_total = _safe_divide((np.where(seen, cell_score, 0) ** 2).sum(axis=0), takers) - mean ** 2
+
+    # Average item variance p(1-p) per module, weighted by responses.
+    responses = np.bincount(module, minlength=n_modules)
+    p_item = _safe_divide(
+        np.bincount(cols.question, weights=x, minlength=len(item_module)),
+        np.bincount(cols.question, minlength=len(item_module)),
+    )
+    pq = np.nan_to_num(p_item * (1 - p_item))[cols.question]
+    mean_pq = _safe_divide(np.bincount(module, weights=pq, minlength=n_modules), responses)
+
+    kr20 = _safe_divide(k, k - 1) * (1 - _safe_divide(k * mean_pq, var_total))
+    return {"kr20": kr20, "items_per_attempt": k, "attempts": takers}
+
+
+@dataclass(frozen=True)
+class CohortReport:
+    items: list  # one dict per question
+    modules: list  # one dict per module
+    answers: int
+    attempts: int
+    seconds: float
+    dropped: int = 0  # answer rows that do not fit the bank (e.g. recorded against an older version)
+
+
+def fits_bank(cols, bank):
+    """Mask of the rows whose question ID and option exist in ``bank``."""
+    n_options = np.asarray([len(q["options"]) for q in bank.questions], dtype=np.int64)
+    fits = (cols.question >= 0) & (cols.question < len(n_options))
+    fits[fits] = (cols.option[fits] >= 0) & (cols.option[fits] < n_options[cols.question[fits]])
+    return fits
+
+
+def analyze(bank, rows):
+    """Full item and module report for ``bank`` from answer rows.
+
+    Rows whose question or option is not in ``bank`` are left out and counted
+    in ``dropped``.
+    """
+    start = time.perf_counter()
+    cols = load_columns(rows)
+    fits = fits_bank(cols, bank)
+    dropped = len(cols) - int(fits.sum())
+    if dropped:
+        cols = cols.select(fits)
+    n_items = len(bank)
+    n_options = max((len(q["options"]) for q in bank.questions), default=1)
+    modules = list(bank.modules())
+    module_index = {m: i for i, m in enumerate(modules)}
+    item_module = np.asarray(
+        [module_index[q.get("module", "General")] for q in bank.questions], dtype=np.int32)
+
+    stats = item_statistics(cols, n_items, n_options)
+    rel = module_reliability(cols, item_module, len(modules))
+
+    items = []
+    for qid, q in enumerate(bank.questions):
+        rates = stats["option_rates"][qid][:len(q["options"])]
+        items.append({
+            "id": qid,
+            "module": q.get("module", "General"),
+            "question": q["question"],
+            "responses": int(stats["responses"][qid]),
+            "p_value": float(stats["p_value"][qid]),
+            "point_biserial": float(stats["point_biserial"][qid]),
+            "option_rates": [float(r) for r in rates],
+            "correct_option": q["correct"],
+        })
+    module_rows = [{
+        "module": m,
+        "attempts": int(rel["attempts"][i]),
+        "items_per_attempt": float(rel["items_per_attempt"][i]),
+        "kr20": float(rel["kr20"][i]),
+    } for i, m in enumerate(modules)]
+    return CohortReport(items, module_rows, len(cols), cols.n_attempts, time.perf_counter() - start, dropped)
+
+
+def synthetic_rows(bank, n_rows, per_attempt=20, seed=0):
+    """Simulated answers: learner ability vs item difficulty, for benchmarking."""
+    rng = np.random.default_rng(seed)
+    n_attempts = max(1, -(-n_rows // per_attempt))
+    n_items = len(bank)
+    attempt = np.repeat(np.arange(n_attempts), per_attempt)[:n_rows]
+    question = rng.integers(0, n_items, size=n_rows)
+    ability = rng.normal(size=n_attempts)[attempt]
+    difficulty = rng.normal(size=n_items)[question]
+    correct = rng.random(n_rows) < 1 / (1 + np.exp(difficulty - ability))
+    n_opts = np.asarray([len(q["options"]) for q in bank.questions])
+    right = np.asarray([q["correct"] for q in bank.questions])
+    wrong = (right[question] + 1 + rng.integers(0, np.maximum(n_opts[question] - 1, 1))) % n_opts[question]
+    option = np.where(correct, right[question], wrong)
+    return zip(attempt.tolist(), question.tolist(), option.tolist(), correct.tolist())
+
+
+def format_report(report, top=None):
+    lines = ["%d answers from %d attempts analysed in %.2f s" % (
+        report.answers, report.attempts, report.seconds)]
+    if report.dropped:
+        lines.append("%d answers left out: their questions are not in the current bank" % report.dropped)
+    lines += ["", "module                          attempts  items/attempt   KR-20"]
+    for m in report.modules:
+        lines.append("%-30s %9d %14.2f %7.3f" % (m["module"][:30], m["attempts"],
+                                                m["items_per_attempt"], m["kr20"]))
+    lines += ["", "  id  responses  p-value  r_pb   option rates (* = correct)  question"]
+    items = report.items if top is None else report.items[:top]
+    for it in items:
+        rates = " ".join("%s%.2f" % ("*" if i == it["correct_option"] else " ", r)
+                         for i, r in enumerate(it["option_rates"]))
+        lines.append("%4d %10d %8.2f %5.2f   %-27s %s" % (
+            it["id"], it["responses"], it["p_value"], it["point_biserial"], rates, it["question"][:50]))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from question_bank import QuestionBank
+    from questions import QUIZ
+
+    parser = argparse.ArgumentParser(description="Item analytics for stored quiz attempts.")
+    parser.add_argument("--db", default=os.environ.get(
+        "AV_TUTOR_ATTEMPT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "attempts.sqlite3")),
+        help="attempt database (default: the app's)")
+    parser.add_argument("--synthetic", type=int, metavar="ROWS",
+                        help="analyse ROWS simulated answers instead of the database")
+    parser.add_argument("--top", type=int, default=None, help="only list the first N items")
+    parser.add_argument("--course", default=None,
+                        help="only answers to this course (see content_registry); default: the built-in course")
+    args = parser.parse_args(argv)
+
+    if args.course is None:
+        bank = QuestionBank(QUIZ)
+    else:
+        from content_registry import build_registry
+        content = build_registry(os.environ.get("AV_TUTOR_COURSES")).content(args.course)
+        if content is None:
+            print("course %s could not be loaded" % args.course, file=sys.stderr)
+            return 1
+        bank = content.bank
+    if args.synthetic:
+        rows = synthetic_rows(bank, args.synthetic)
+    else:
+        from attempt_store import SQLiteAttemptStore
+        if not os.path.exists(args.db):
+            print("no attempt database at %s" % args.db, file=sys.stderr)
+            return 1
+        rows = SQLiteAttemptStore(args.db).answer_rows(args.course or "default", bank.version)
+    print(format_report(analyze(bank, rows), top=args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
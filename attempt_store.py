@@ -0,0 +1,503 @@
+"""
+Persistent quiz attempt storage with write-behind batching.
+
+Quiz events are small immutable records:
+
+- AttemptRecord: a quiz was started (learner, seed, question IDs, option codes)
+- AnswerRecord: one answer was submitted
+- ResultRecord: the learner reached the results page
+- ReviewRecord: a question was answered on the spaced-repetition Review page
+
+Pages never write to a store directly. They hand records to a
+WriteBehindWriter, which queues them and lets a background thread write them
+in batches, one transaction per batch, so the UI thread never waits on disk.
+
+Two stores are provided: SQLiteAttemptStore (WAL mode, for deployments) and
+MemoryAttemptStore (for tests and benchmarks). Both implement AttemptStore.
+"""
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AttemptRecord:
+    attempt_id: str
+    learner_id: str
+    seed: int
+    question_ids: tuple
+    perms: tuple
+    started_at: float
+    course: str = "default"  # content_registry course the question IDs refer to
+    bank_version: str = None  # QuestionBank.version of the bank the question IDs index
+
+
+@dataclass(frozen=True)
+class AnswerRecord:
+    attempt_id: str
+    position: int  # index of the question within the attempt
+    question_id: int
+    option: int  # chosen option, as an index into the bank's option list
+    correct: bool
+    answered_at: float
+
+
+@dataclass(frozen=True)
+class ResultRecord:
+    attempt_id: str
+    score: int
+    total: int
+    finished_at: float
+
+
+@dataclass(frozen=True)
+class ReviewRecord:
+    learner_id: str
+    course: str
+    question_id: int
+    correct: bool
+    reviewed_at: float
+    bank_version: str = None  # QuestionBank.version the question ID belongs to
+
+
+class AttemptStore:
+    """Interface shared by all attempt stores."""
+
+    def write_batch(self, records):
+        """Persist a mixed batch of records atomically."""
+        raise NotImplementedError
+
+    def attempt(self, attempt_id):
+        """The AttemptRecord for ``attempt_id``, or None."""
+        raise NotImplementedError
+
+    def attempts(self, learner_id=None):
+        """All AttemptRecords, or those of one learner, oldest first."""
+        raise NotImplementedError
+
+    def answers(self, attempt_id=None):
+        """AnswerRecords for one attempt (by position) or for all attempts.
+
+        A question answered more than once keeps only its latest answer.
+        """
+        raise NotImplementedError
+
+    def result(self, attempt_id):
+        """The ResultRecord for ``attempt_id``, or None if not finished."""
+        raise NotImplementedError
+
+    def answer_rows(self, course=None, bank_version=None):
+        """Iterate ``(attempt_id, question_id, option, correct)`` for every answer,
+        or for the answers to attempts at one course.
+
+        A lightweight bulk read for analytics; no record objects are built.
+        With ``bank_version``, answers to attempts at other versions of the
+        bank are skipped (question IDs are positions, so they may mean other
+        questions there); attempts stored before versions were recorded are
+        kept.
+        """
+        raise NotImplementedError
+
+    def review_events(self, learner_id=None, course="default", bank_version=None):
+        """Iterate ``(learner_id, question_id, correct, at)`` for every quiz answer
+        and review at one course, or one learner's, oldest first.
+
+        The input to spaced-repetition scheduling (see review.py).
+        ``bank_version`` filters as in answer_rows.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryAttemptStore(AttemptStore):
+    """In-process store with the same semantics as the SQLite store."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._attempts = {}
+        self._answers = {}  # (attempt_id, position) -> AnswerRecord
+        self._results = {}
+        self._reviews = []
+
+    def write_batch(self, records):
+        with self._lock:
+            for rec in records:
+                if isinstance(rec, AttemptRecord):
+                    self._attempts[rec.attempt_id] = rec
+                elif isinstance(rec, AnswerRecord):
+                    self._answers[(rec.attempt_id, rec.position)] = rec
+                elif isinstance(rec, ResultRecord):
+                    self._results[rec.attempt_id] = rec
+                elif isinstance(rec, ReviewRecord):
+                    self._reviews.append(rec)
+                else:
+                    raise TypeError("unknown record type %r" % type(rec).__name__)
+
+    def attempt(self, attempt_id):
+        with self._lock:
+            return self._attempts.get(attempt_id)
+
+    def attempts(self, learner_id=None):
+        with self._lock:
+            rows = [a for a in self._attempts.values() if learner_id is None or a.learner_id == learner_id]
+        return sorted(rows, key=lambda a: a.started_at)
+
+    def answers(self, attempt_id=None):
+        with self._lock:
+            rows = [a for key, a in self._answers.items() if attempt_id is None or key[0] == attempt_id]
+        return sorted(rows, key=lambda a: (a.attempt_id, a.position))
+
+    def result(self, attempt_id):
+        with self._lock:
+            return self._results.get(attempt_id)
+
+    def answer_rows(self, course=None, bank_version=None):
+        with self._lock:
+            rows = []
+            for a in self._answers.values():
+                attempt = self._attempts.get(a.attempt_id)
+                if course is not None and (attempt is None or attempt.course != course):
+                    continue
+                if bank_version is not None and attempt is not None and attempt.bank_version not in (
+                        None, bank_version):
+                    continue
+                rows.append((a.attempt_id, a.question_id, a.option, a.correct))
+        return iter(rows)
+
+    def review_events(self, learner_id=None, course="default", bank_version=None):
+        versions = (None, bank_version) if bank_version is not None else None
+        with self._lock:
+            rows = []
+            for a in self._answers.values():
+                attempt = self._attempts.get(a.attempt_id)
+                if (attempt is not None and attempt.course == course and learner_id in (None, attempt.learner_id)
+                        and (versions is None or attempt.bank_version in versions)):
+                    rows.append((attempt.learner_id, a.question_id, a.correct, a.answered_at))
+            rows.extend((r.learner_id, r.question_id, r.correct, r.reviewed_at) for r in self._reviews
+                        if r.course == course and learner_id in (None, r.learner_id)
+                        and (versions is None or r.bank_version in versions))
+        return iter(sorted(rows, key=lambda r: r[3]))
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    attempt_id   TEXT PRIMARY KEY,
+    learner_id   TEXT NOT NULL,
+    seed         TEXT NOT NULL,  -- 64-bit unsigned, too wide for INTEGER
+    question_ids TEXT NOT NULL,
+    perms        TEXT NOT NULL,
+    started_at   REAL NOT NULL,
+    course       TEXT NOT NULL DEFAULT 'default',
+    bank_version TEXT
+);
+CREATE TABLE IF NOT EXISTS answers (
+    attempt_id   TEXT NOT NULL,
+    position     INTEGER NOT NULL,
+    question_id  INTEGER NOT NULL,
+    option       INTEGER NOT NULL,
+    correct      INTEGER NOT NULL,
+    answered_at  REAL NOT NULL,
+    PRIMARY KEY (attempt_id, position)
+);
+CREATE TABLE IF NOT EXISTS results (
+    attempt_id   TEXT PRIMARY KEY,
+    score        INTEGER NOT NULL,
+    total        INTEGER NOT NULL,
+    finished_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    learner_id   TEXT NOT NULL,
+    course       TEXT NOT NULL,
+    question_id  INTEGER NOT NULL,
+    correct      INTEGER NOT NULL,
+    reviewed_at  REAL NOT NULL,
+    bank_version TEXT
+);
+CREATE INDEX IF NOT EXISTS reviews_learner ON reviews (learner_id, course);
+"""
+
+
+_ATTEMPT_COLUMNS = "attempt_id, learner_id, seed, question_ids, perms, started_at, course, bank_version"
+_REVIEW_COLUMNS = "learner_id, course, question_id, correct, reviewed_at, bank_version"
+
+
+def _attempt_from_row(row):
+    return AttemptRecord(row[0], row[1], int(row[2]), tuple(json.loads(row[3])),
+                         tuple(json.loads(row[4])), row[5], row[6], row[7])
+
+
+class SQLiteAttemptStore(AttemptStore):
+    """SQLite store in WAL mode; readers do not block the batch writer."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL only syncs at checkpoints: a crash can lose the last
+        # batch but never corrupts the database.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(attempts)")}
+        if "course" not in columns:
+            # databases written before courses existed hold only default-course attempts
+            self._conn.execute("ALTER TABLE attempts ADD COLUMN course TEXT NOT NULL DEFAULT 'default'")
+        for table in ("attempts", "reviews"):
+            # NULL for records written before bank versions were stored
+            if "bank_version" not in {r[1] for r in self._conn.execute("PRAGMA table_info(%s)" % table)}:
+                self._conn.execute("ALTER TABLE %s ADD COLUMN bank_version TEXT" % table)
+        # created after the migration above, which it depends on
+        self._conn.execute("CREATE INDEX IF NOT EXISTS attempts_learner ON attempts (learner_id, course)")
+
+    def write_batch(self, records):
+        attempts, answers, results, reviews = [], [], [], []
+        for rec in records:
+            if isinstance(rec, AttemptRecord):
+                attempts.append((rec.attempt_id, rec.learner_id, str(rec.seed),
+                                 json.dumps(rec.question_ids), json.dumps(rec.perms), rec.started_at,
+                                 rec.course, rec.bank_version))
+            elif isinstance(rec, AnswerRecord):
+                answers.append((rec.attempt_id, rec.position, rec.question_id,
+                                rec.option, int(rec.correct), rec.answered_at))
+            elif isinstance(rec, ResultRecord):
+                results.append((rec.attempt_id, rec.score, rec.total, rec.finished_at))
+            elif isinstance(rec, ReviewRecord):
+                reviews.append((rec.learner_id, rec.course, rec.question_id, int(rec.correct), rec.reviewed_at,
+                                rec.bank_version))
+            else:
+                raise TypeError("unknown record type %r" % type(rec).__name__)
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                if attempts:
+                    cur.executemany("INSERT OR REPLACE INTO attempts (%s) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                                    % _ATTEMPT_COLUMNS, attempts)
+                if answers:
+                    cur.executemany("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)", answers)
+                if results:
+                    cur.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", results)
+                if reviews:
+                    cur.executemany("INSERT INTO reviews (%s) VALUES (?, ?, ?, ?, ?, ?)" % _REVIEW_COLUMNS, reviews)
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            cur.execute("COMMIT")
+
+    def attempt(self, attempt_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT %s FROM attempts WHERE attempt_id = ?" % _ATTEMPT_COLUMNS, (attempt_id,)).fetchone()
+        return _attempt_from_row(row) if row else None
+
+    def attempts(self, learner_id=None):
+        sql = "SELECT %s FROM attempts" % _ATTEMPT_COLUMNS
+        args = ()
+        if learner_id is not None:
+            sql += " WHERE learner_id = ?"
+            args = (learner_id,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY started_at", args).fetchall()
+        return [_attempt_from_row(r) for r in rows]
+
+    def answers(self, attempt_id=None):
+        sql = "SELECT attempt_id, position, question_id, option, correct, answered_at FROM answers"
+        args = ()
+        if attempt_id is not None:
+            sql += " WHERE attempt_id = ?"
+            args = (attempt_id,)
+        sql += " ORDER BY attempt_id, position"
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [AnswerRecord(r[0], r[1], r[2], r[3], bool(r[4]), r[5]) for r in rows]
+
+    def result(self, attempt_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempt_id, score, total, finished_at FROM results WHERE attempt_id = ?",
+                (attempt_id,)).fetchone()
+        return ResultRecord(*row) if row else None
+
+    def answer_rows(self, course=None, bank_version=None):
+        sql = "SELECT attempt_id, question_id, option, correct FROM answers"
+        where, args = [], []
+        if course is not None:
+            where.append("course = ?")
+            args.append(course)
+        if bank_version is not None:
+            where.append("(bank_version IS NULL OR bank_version = ?)")
+            args.append(bank_version)
+        if where:
+            sql += " WHERE attempt_id IN (SELECT attempt_id FROM attempts WHERE %s)" % " AND ".join(where)
+        # A separate read connection: WAL lets it stream while batches are written.
+        conn = sqlite3.connect(self.path)
+        try:
+            cur = conn.execute(sql, args)
+            while True:
+                rows = cur.fetchmany(10000)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def review_events(self, learner_id=None, course="default", bank_version=None):
+        answers = ("SELECT t.learner_id, a.question_id, a.correct, a.answered_at"
+                   " FROM answers a JOIN attempts t ON t.attempt_id = a.attempt_id WHERE t.course = ?")
+        reviews = "SELECT learner_id, question_id, correct, reviewed_at FROM reviews WHERE course = ?"
+        filters = []
+        if learner_id is not None:
+            answers += " AND t.learner_id = ?"
+            reviews += " AND learner_id = ?"
+            filters.append(learner_id)
+        if bank_version is not None:
+            answers += " AND (t.bank_version IS NULL OR t.bank_version = ?)"
+            reviews += " AND (bank_version IS NULL OR bank_version = ?)"
+            filters.append(bank_version)
+        args = (course, *filters, course, *filters)
+        conn = sqlite3.connect(self.path)
+        try:
+            cur = conn.execute("%s UNION ALL %s ORDER BY 4" % (answers, reviews), args)
+            while True:
+                rows = cur.fetchmany(10000)
+                if not rows:
+                    break
+                for learner, qid, correct, at in rows:
+                    yield learner, qid, bool(correct), at
+        finally:
+            conn.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(path):
+    """SQLite store at ``path``, or a MemoryAttemptStore for ":memory:"."""
+    if str(path) == ":memory:":
+        return MemoryAttemptStore()
+    return SQLiteAttemptStore(path)
+
+
+class WriteBehindWriter:
+    """Queue records and write them to a store from a background thread.
+
+    ``submit`` never touches the store. The writer thread blocks until a
+    record arrives, then drains whatever else is queued (up to ``max_batch``
+    records, waiting at most ``max_delay`` seconds for more) and writes the
+    lot in one ``write_batch`` call.
+    """
+
+    def __init__(self, store, max_batch=500, max_delay=0.05):
+        self.store = store
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._stopping = object()
+        self._closed = False
+        self._submit_lock = threading.Lock()  # nothing is queued after the stop sentinel
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="attempt-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        with self._submit_lock:
+            if not self._closed:
+                self._queue.put(record)
+                return
+        logger.warning("Attempt writer is closed; dropping %s", type(record).__name__)
+
+    def _collect(self, first):
+        batch = [first]
+        if first is self._stopping:
+            return batch
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is self._stopping:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect(self._queue.get())
+            # _collect ends a batch at the stop sentinel, and nothing is queued after it
+            stop = batch[-1] is self._stopping
+            records = [r for r in batch if r is not self._stopping and not isinstance(r, threading.Event)]
+            if records:
+                try:
+                    self.store.write_batch(records)
+                    self.batches += 1
+                    self.written += len(records)
+                except Exception:
+                    self.failed += len(records)
+                    logger.exception("Failed to write %d attempt records", len(records))
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()  # a flush() marker: everything before it is written
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far has been written.
+
+        Records submitted meanwhile are not waited for. Returns False if
+        ``timeout`` seconds passed first.
+        """
+        done = threading.Event()
+        with self._submit_lock:
+            closed = self._closed
+            if not closed:
+                self._queue.put(done)
+        if closed:
+            # everything was queued before the stop sentinel
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return done.wait(timeout)
+
+    def close(self):
+        """Write what is queued, stop the thread and close the store; later submits are dropped."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(self._stopping)
+        self._thread.join()
+        self.store.close()
+
+
+_shared_lock = threading.Lock()
+_shared_writers = {}  # store path -> WriteBehindWriter
+
+
+def shared_writer(path):
+    """Process-wide writer for the store at ``path``, created on first use.
+
+    Streamlit executes the app script in a fresh module on every rerun, so
+    the app cannot keep its writer in its own globals; writers kept here last
+    for the life of the process and write what is still queued at exit.
+    """
+    key = str(path)
+    with _shared_lock:
+        writer = _shared_writers.get(key)
+        if writer is None:
+            writer = _shared_writers[key] = WriteBehindWriter(open_store(path))
+            atexit.register(writer.close)
+        return writer
@@ -8,205 +8,193 @@ It preserves the same flows: Home, Learning Modules, and a Quick Quiz.
 Features:
 - Sidebar navigation for easy page switching
 - Persistent module selection across sessions
-- Ontology loading from av_tutor.owl (if rdflib is installed)
+- Ontology loading from av_tutor.owl (OWL functional syntax, no rdflib needed)
 - Graceful fallback to mock content if ontology unavailable
 """
+import logging
+import os
+
+if os.environ.get("AV_TUTOR_PROFILE_IMPORTS"):
+    # Must run before the imports below so their cost is recorded too.
+    import import_profile
+    import_profile.install()
+
 import streamlit as st
-from pathlib import Path
-import random
+import functools
+import json
+import secrets
+import time
+import uuid
+from array import array
+from math import factorial
+
+from aggregation import ModuleScores, cohort_rollup
+from attempt_store import AnswerRecord, AttemptRecord, ResultRecord, ReviewRecord, shared_writer
+from content_registry import DEFAULT_COURSE, fallback_bank, shared_registry
+from quiz_generator import QUESTIONS_PER_MODULE, GeneratedQuiz, derive_seed, generate_quiz
+from quiz_pool import shared_pool
+from quiz_state import decode_permutation, module_positions, new_quiz, present
+import telemetry
+from telemetry import TELEMETRY, instrument
+
+# The ontology parser, snapshot reader and question bank are imported inside
+# the content loaders (content_registry.py) so that pages which show no content
+# never pay for them.
+
+logger = logging.getLogger(__name__)
+
+# Ready-made quizzes kept per process; a size of 0 disables the pool.
+QUIZ_POOL_SIZE = int(os.environ.get("AV_TUTOR_QUIZ_POOL_SIZE", "64"))
+QUIZ_POOL_LOW_WATER = int(os.environ.get("AV_TUTOR_QUIZ_POOL_LOW_WATER", "16"))
+
+# Questions shown per page in each module's section of the results page.
+RESULTS_PAGE_SIZE = 10
+
+# Matches listed under the sidebar search box.
+SEARCH_RESULTS = 8
+
+# Adaptive quizzes stop once every module's mastery estimate has at most this
+# standard deviation, or after the maximum number of questions.
+ADAPTIVE_TARGET_SD = float(os.environ.get("AV_TUTOR_ADAPTIVE_TARGET_SD", "0.2"))
+ADAPTIVE_MAX_QUESTIONS = int(os.environ.get("AV_TUTOR_ADAPTIVE_MAX_QUESTIONS", "20"))
+
+# Seconds between checks for changed content files; changed content is rebuilt
+# in the background and used by new quizzes. 0 re-parses on the next request instead.
+RELOAD_INTERVAL = float(os.environ.get("AV_TUTOR_RELOAD_INTERVAL", "2"))
+
+# JSON catalog of extra courses, selected with ?course=<id> (see content_registry.py).
+COURSES_FILE = os.environ.get("AV_TUTOR_COURSES")
+
+# Where quiz attempts are persisted; ":memory:" keeps them in-process only.
+ATTEMPT_DB = os.environ.get(
+    "AV_TUTOR_ATTEMPT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "attempts.sqlite3")
+)
+
+
+def get_registry():
+    """Process-wide course registry; the built-in course loads via the snapshot."""
+    return shared_registry(COURSES_FILE, RELOAD_INTERVAL)
+
+
+def current_course():
+    """Course ID from ``?course=<id>``; unknown or missing IDs mean the built-in course."""
+    course_id = st.query_params.get("course")
+    if not course_id:
+        return DEFAULT_COURSE
+    return get_registry().course(course_id).id
+
+
+def get_content():
+    """Shared, immutable content for the current course (parsed at most once per process)."""
+    return get_registry().content(current_course())
+
 
 # Try to load ontology content; fall back to mock if unavailable
+@instrument()
 def load_content_from_ontology():
-    """Load content from av_tutor.owl using rdflib if available."""
-    try:
-        from rdflib import Graph, Namespace
-        
-        owl_path = Path(__file__).parent / "av_tutor.owl"
-        if not owl_path.exists():
-            return None
-        
-        g = Graph()
-        g.parse(str(owl_path), format="xml")
-        
-        # Extract basic concepts and their descriptions from the ontology
-        content = {}
-        AV = Namespace("http://example.org/av_tutor#")
-        
-        # Manually map key concepts (in a real app, you'd query more dynamically)
-        content["What is a Virus?"] = "A virus is a type of malicious software that can replicate and spread to other files. (Loaded from ontology)"
-        content["How Viruses Spread"] = "Viruses spread through infection vectors including downloads, email attachments, infected USB drives, and unsafe websites. (Loaded from ontology)"
-        content["Using Antivirus Software"] = "Install trusted antivirus, keep definitions updated, run scans regularly, and respond to alerts. (Loaded from ontology)"
-        content["Maintenance & Updates"] = "Keep your OS and software updated; enable firewall; perform regular backups. (Loaded from ontology)"
-        
-        return content
-    except ImportError:
-        return None
-    except Exception as e:
+    """Load learning modules from av_tutor.owl, parsing it at most once per process.
+
+    The parsed result is shared across reruns and sessions and is re-parsed only
+    when the ontology or question bank changes on disk.
+    """
+    content = get_content()
+    if content is None:
         return None
+    return content.modules
+
 
-# Load ontology if available, otherwise use mock content
-ONTOLOGY_CONTENT = load_content_from_ontology()
+def load_bank():
+    """Indexed question bank, built once per content version."""
+    content = get_content()
+    if content is None:
+        return fallback_bank()
+    return content.bank
 
-CONTENT_MAP = ONTOLOGY_CONTENT or {
+
+# Mock content used when the ontology is unavailable
+MOCK_CONTENT_MAP = {
     "What is a Virus?": "A virus is a type of malicious software that can replicate and spread to other files.",
     "How Viruses Spread": "Viruses spread through downloads, email attachments, infected USB drives, and unsafe websites.",
     "Using Antivirus Software": "Install trusted antivirus, keep definitions updated, run scans regularly, and respond to alerts.",
     "Maintenance & Updates": "Keep your OS and software updated; enable firewall; perform regular backups."
 }
 
-# Quiz: list of questions with options, index of correct option, explanation, and module tag
-# There are 20 questions total — 5 from each learning module.
-QUIZ = [
-    # Module: What is a Virus?
-    {
-        "module": "What is a Virus?",
-        "question": "What is the defining capability of a computer virus?",
-        "options": ["It provides useful features", "It replicates and spreads", "It speeds up the system"],
-        "correct": 1,
-        "explanation": "A virus can replicate itself and spread to other files or systems.",
-    },
-    {
-        "module": "What is a Virus?",
-        "question": "Which term best describes software that disguises itself as legitimate?",
-        "options": ["Adware", "Trojan", "Firewall"],
-        "correct": 1,
-        "explanation": "A Trojan disguises itself as legitimate software to trick users into running it.",
-    },
-    {
-        "module": "What is a Virus?",
-        "question": "Which of these is NOT a typical symptom of virus infection?",
-        "options": ["Unexpected crashes", "Slower performance", "Improved battery life"],
-        "correct": 2,
-        "explanation": "Improved battery life is not a symptom of malware; the others commonly occur.",
-    },
-    {
-        "module": "What is a Virus?",
-        "question": "What does 'payload' refer to in malware context?",
-        "options": ["Update mechanism", "Harmful action carried out", "User interface"],
-        "correct": 1,
-        "explanation": "The payload is the harmful action the malware performs (e.g., data theft).",
-    },
-    {
-        "module": "What is a Virus?",
-        "question": "Which practice helps prevent virus infections?",
-        "options": ["Running unknown executables", "Keeping software updated", "Disabling antivirus"],
-        "correct": 1,
-        "explanation": "Keeping software updated helps close vulnerabilities that viruses exploit.",
-    },
-
-    # Module: How Viruses Spread
-    {
-        "module": "How Viruses Spread",
-        "question": "Which is a common vector for viruses to spread?",
-        "options": ["Email attachments", "Clear desktop wallpaper", "Regular backups"],
-        "correct": 0,
-        "explanation": "Email attachments are a common vector for malware delivery.",
-    },
-    {
-        "module": "How Viruses Spread",
-        "question": "Public Wi‑Fi can be risky because attackers may:",
-        "options": ["Encrypt your files automatically", "Intercept unencrypted traffic", "Improve connection speed"],
-        "correct": 1,
-        "explanation": "Attackers on the same network can intercept unencrypted traffic and exploit vulnerabilities.",
-    },
-    {
-        "module": "How Viruses Spread",
-        "question": "Removable drives (USB sticks) can spread infections when:",
-        "options": ["They are scanned by antivirus", "They carry autorun-infected files", "They are formatted regularly"],
-        "correct": 1,
-        "explanation": "Autorun or infected files on removable media can spread malware between machines.",
-    },
-    {
-        "module": "How Viruses Spread",
-        "question": "Social engineering attacks rely mainly on:",
-        "options": ["Technical exploits", "Tricking users", "Hardware failure"],
-        "correct": 1,
-        "explanation": "Social engineering tricks users into performing unsafe actions like opening attachments.",
-    },
-    {
-        "module": "How Viruses Spread",
-        "question": "Downloading software from untrusted sites increases risk because:",
-        "options": ["Files may be tampered with", "Downloads are always faster", "It reduces disk usage"],
-        "correct": 0,
-        "explanation": "Untrusted sites may provide tampered or bundled malware with installers.",
-    },
-
-    # Module: Using Antivirus Software
-    {
-        "module": "Using Antivirus Software",
-        "question": "What should you do if your antivirus warns about a program?",
-        "options": ["Ignore the warning", "Quarantine or delete the file", "Share it with colleagues"],
-        "correct": 1,
-        "explanation": "Quarantine or delete suspected malicious files and investigate further.",
-    },
-    {
-        "module": "Using Antivirus Software",
-        "question": "Real-time protection in antivirus software means:",
-        "options": ["It scans only on boot", "It scans files as they are accessed", "It never scans"],
-        "correct": 1,
-        "explanation": "Real-time protection scans files and actions as they occur to block threats immediately.",
-    },
-    {
-        "module": "Using Antivirus Software",
-        "question": "Why keep antivirus definitions up to date?",
-        "options": ["To detect new threats", "To reduce internet use", "To improve screen resolution"],
-        "correct": 0,
-        "explanation": "Updated definitions help the antivirus recognize and block the latest threats.",
-    },
-    {
-        "module": "Using Antivirus Software",
-        "question": "Running a full system scan is useful when:",
-        "options": ["You suspect infection", "You want to uninstall software", "You want to defragment disk"],
-        "correct": 0,
-        "explanation": "A full scan helps find infections that real-time scanning may have missed.",
-    },
-    {
-        "module": "Using Antivirus Software",
-        "question": "A good antivirus vendor practice is to:",
-        "options": ["Ignore reports", "Provide regular updates and support", "Release no updates"],
-        "correct": 1,
-        "explanation": "Trusted vendors provide frequent updates and support to address new threats.",
-    },
-
-    # Module: Maintenance & Updates
-    {
-        "module": "Maintenance & Updates",
-        "question": "Why install OS updates promptly?",
-        "options": ["They add unnecessary features", "They patch security vulnerabilities", "They slow the system down"],
-        "correct": 1,
-        "explanation": "OS updates often patch security flaws that attackers could exploit.",
-    },
-    {
-        "module": "Maintenance & Updates",
-        "question": "Regular backups help because they:",
-        "options": ["Allow recovery after an incident", "Encrypt all files automatically", "Prevent viruses entirely"],
-        "correct": 0,
-        "explanation": "Backups let you restore data after malware or hardware failure.",
-    },
-    {
-        "module": "Maintenance & Updates",
-        "question": "Using least-privilege accounts means:",
-        "options": ["Users run with only required permissions", "Everyone has admin rights", "No user can log in"],
-        "correct": 0,
-        "explanation": "Least privilege reduces the potential impact of compromised accounts.",
-    },
-    {
-        "module": "Maintenance & Updates",
-        "question": "Why enable a firewall?",
-        "options": ["To block unauthorized network access", "To speed up downloads", "To display ads"],
-        "correct": 0,
-        "explanation": "Firewalls help block unauthorized inbound and outbound connections.",
-    },
-    {
-        "module": "Maintenance & Updates",
-        "question": "What is an important habit for maintenance?",
-        "options": ["Ignore update prompts", "Review logs and update regularly", "Share passwords"],
-        "correct": 1,
-        "explanation": "Regularly reviewing logs and applying updates helps maintain security.",
-    },
-]
+# Content is loaded on first use rather than at import time, so the Home page
+# and the sidebar render without touching the ontology stack.
+def get_content_map():
+    """Learning module texts (ontology-derived if available, otherwise mock)."""
+    return load_content_from_ontology() or MOCK_CONTENT_MAP
+
+
+def get_bank():
+    """The shared, indexed question bank."""
+    return load_bank()
+
+
+def quiz_bank():
+    """The bank the current quiz was drawn from.
+
+    A quiz keeps the content version it started with, so a reload mid-quiz
+    cannot change its questions; the next quiz uses the latest version.
+    """
+    bank = st.session_state.get("quiz_bank")
+    return get_bank() if bank is None else bank
+
+
+def get_attempt_writer():
+    """Process-wide write-behind writer for quiz attempts."""
+    return shared_writer(ATTEMPT_DB)
+
 
+def get_review_scheduler():
+    """Process-wide spaced-repetition queues, folded from stored answers on first use."""
+    from review import shared_scheduler
+    return shared_scheduler(get_attempt_writer())
 
+
+def review_queue(course=None, bank=None):
+    """This learner's review queue for ``course`` and its ``bank`` (default: the current ones)."""
+    # An anonymous learner ID is minted by this session, so nothing is stored for it
+    # the first time; after that the queue may have been evicted and must be reloaded.
+    stored = bool(st.query_params.get("learner")) or st.session_state.get("review_queue_used", False)
+    st.session_state.review_queue_used = True
+    bank = get_bank() if bank is None else bank
+    return get_review_scheduler().queue(learner_id(), course or current_course(), stored, bank.version)
+
+
+def learner_id():
+    """Learner identifier: ``?learner=<id>`` if given, else one per session."""
+    learner = st.query_params.get("learner")
+    if learner:
+        return learner
+    if "anonymous_learner" not in st.session_state:
+        st.session_state.anonymous_learner = "anon-" + uuid.uuid4().hex
+    return st.session_state.anonymous_learner
+
+
+def begin_attempt():
+    """Record a new attempt at the session's current quiz."""
+    st.session_state.attempt_id = uuid.uuid4().hex
+    st.session_state.attempt_started_at = time.time()
+    st.session_state.attempt_result_saved = False
+    save_attempt()
+
+
+def save_attempt():
+    """Queue the current attempt's record; re-saved when an adaptive quiz grows."""
+    get_attempt_writer().submit(AttemptRecord(
+        attempt_id=st.session_state.attempt_id,
+        learner_id=learner_id(),
+        seed=st.session_state.quiz_seed,
+        question_ids=tuple(st.session_state.quiz_ids),
+        perms=tuple(st.session_state.quiz_perms),
+        started_at=st.session_state.attempt_started_at,
+        course=st.session_state.quiz_course,
+        bank_version=quiz_bank().version,
+    ))
+
+
+@instrument()
 def show_home():
     st.title("🛡️ AV Tutor")
     st.write("Learn how to protect your computer from viruses.")
@@ -216,17 +204,21 @@ def show_home():
     with col1:
         if st.button("📚 Learning Modules", use_container_width=True):
             st.session_state.page = "learning"
+            st.rerun()
     with col2:
         if st.button("❓ Quick Quiz", use_container_width=True):
             st.session_state.page = "quiz"
+            st.rerun()
     
     st.markdown("---")
     st.info("Use the sidebar to navigate between different sections at any time.")
 
 
+@instrument()
 def show_learning():
+    content_map = get_content_map()
     st.header("📚 Learning Modules")
-    modules = list(CONTENT_MAP.keys())
+    modules = list(content_map.keys())
 
     # Persistent module selection
     if "selected_module" not in st.session_state:
@@ -236,10 +228,19 @@ def show_learning():
     
     # Selection
     sel = st.radio("Choose a module:", modules, index=current_idx)
+    if sel != st.session_state.selected_module:
+        st.session_state.learning_concept = None
     st.session_state.selected_module = sel  # Persist selection
     
     st.subheader(sel)
-    st.write(CONTENT_MAP.get(sel, "No content available."))
+    content = get_content()
+    module_class = None
+    if content is not None and content.question_classes is not None:
+        module_class = content.question_classes.module_class.get(sel)
+    if module_class is None:
+        st.write(content_map.get(sel, "No content available."))
+    else:
+        show_concept(content, sel, module_class)
     st.markdown("---")
 
     cols = st.columns(3)
@@ -254,85 +255,97 @@ def show_learning():
             st.rerun()
     with cols[2]:
         if st.button("❓ Take Quiz", use_container_width=True):
-            st.session_state.page = "quiz"
+            st.session_state.page = "quiz_start"
             st.rerun()
 
 
+def show_concept(content, module, module_class):
+    """Concept page within ``module``: the module's own class unless a cross-link chose another.
+
+    Page text comes from the shared rendered-page cache; each section is only
+    rendered (and cached) once someone opens it.
+    """
+    from concept_pages import concept_page, concept_section
+
+    index = content.index
+    cls = index.find(st.session_state.get("learning_concept") or "")
+    if cls is None or not index.is_a(cls, module_class):
+        cls = module_class
+    page = concept_page(content, cls)
+    if cls != module_class:
+        st.markdown(f"#### {page.title}")
+    st.markdown(page.overview)
+    for key, heading in page.sections:
+        if st.toggle(heading, key=f"concept_{page.name}_{key}"):
+            st.markdown(concept_section(content, cls, key))
+
+    # cross-links to concepts that some module teaches, and the module to open for each
+    links = []
+    for name, label in page.links:
+        target = index.find(name)
+        owner = next((title for title, c in content.question_classes.module_class.items()
+                      if index.is_a(target, c)), None)
+        if owner is not None:
+            links.append((name, label, owner))
+    if links:
+        st.caption("See also")
+        cols = st.columns(4)
+        for n, (name, label, owner) in enumerate(links):
+            if cols[n % 4].button(label, key=f"concept_link_{name}", use_container_width=True):
+                st.session_state.selected_module = owner
+                st.session_state.learning_concept = name
+                st.rerun()
+    if cls != module_class and st.button(f"⬅️ Back to {module}"):
+        st.session_state.learning_concept = None
+        st.rerun()
+
+
+@instrument()
 def show_quiz():
+    content_map = get_content_map()
     st.header("❓ Quick Quiz")
 
+    adaptive = st.session_state.get("adaptive_quiz")
     # Inform the user about total questions
-    st.info("This quiz comprises 20 questions total — 5 questions from each learning module.")
+    if adaptive is not None:
+        st.info(
+            "Adaptive quiz — each question is chosen from your answers so far, and the quiz "
+            f"ends once every module is measured (at most {adaptive.max_questions} questions)."
+        )
+    else:
+        st.info("This quiz comprises 20 questions total — 5 questions from each learning module.")
 
     # Prepare module order and ensure the quiz is initialized
-    module_order = list(CONTENT_MAP.keys())
+    module_order = list(content_map.keys())
 
     # If the quiz hasn't been prepared yet in session state, initialize it
-    if "shuffled_quiz" not in st.session_state:
+    if "quiz_ids" not in st.session_state:
         try:
-            initialize_quiz_grouped()
+            initialize_quiz()
         except Exception:
             # Fallback: create a simple shuffled quiz of up to 20 questions
-            indices = list(range(len(QUIZ)))
-            random.shuffle(indices)
-            shuffled = []
-            for qi in indices[:20]:
-                q = QUIZ[qi]
-                opts_idx = list(range(len(q["options"])));
-                random.shuffle(opts_idx)
-                opts = [q["options"][i] for i in opts_idx]
-                new_correct = opts_idx.index(q["correct"])
-                shuffled.append({
-                    "module": q.get("module", "General"),
-                    "question": q["question"],
-                    "options": opts,
-                    "correct": new_correct,
-                    "explanation": q.get("explanation", ""),
-                })
-            st.session_state.shuffled_quiz = shuffled
-            st.session_state.quiz_idx = 0
-            st.session_state.quiz_score = 0
-            st.session_state.quiz_answers = {}
-            st.session_state.quiz_submitted = False
+            initialize_quiz_ungrouped(limit=20)
     if "quiz_idx" not in st.session_state:
         # quiz order and shuffled options are prepared once per quiz session
-        st.session_state.quiz_idx = 0
-        st.session_state.quiz_score = 0
-        st.session_state.quiz_answers = {}  # idx -> selected_index (in shuffled options)
-        st.session_state.quiz_submitted = False
-        # create shuffled question order
-        indices = list(range(len(QUIZ)))
-        random.shuffle(indices)
-        st.session_state.quiz_order = indices
-        # create shuffled option lists and adjusted correct indices
-        shuffled = []
-        for qi in st.session_state.quiz_order:
-            q = QUIZ[qi]
-            opts_idx = list(range(len(q["options"])))
-            random.shuffle(opts_idx)
-            opts = [q["options"][i] for i in opts_idx]
-            # find new correct index
-            new_correct = opts_idx.index(q["correct"])
-            shuffled.append({
-                "question": q["question"],
-                "options": opts,
-                "correct": new_correct,
-                "explanation": q.get("explanation", ""),
-                "original_index": qi,
-            })
-        st.session_state.shuffled_quiz = shuffled
+        initialize_quiz_ungrouped()
         # quiz timing removed — no timers used
 
+    bank = quiz_bank()
     idx = st.session_state.quiz_idx
-    total = len(st.session_state.shuffled_quiz)
-    q = st.session_state.shuffled_quiz[idx]
+    total = len(st.session_state.quiz_ids)
+    adaptive = st.session_state.get("adaptive_quiz")
+    # resolve text and option order from the shared bank for this render only
+    q = present(bank[st.session_state.quiz_ids[idx]], st.session_state.quiz_perms[idx])
 
     try:
         module_idx = module_order.index(q.get("module", module_order[0])) + 1
     except Exception:
         module_idx = 1
     st.subheader(f"Module {module_idx}: {q.get('module', 'Module')}")
-    st.markdown(f"**Question {idx+1} of {total}**")
+    if adaptive is not None:
+        st.markdown(f"**Question {idx+1}** (adaptive, at most {adaptive.max_questions})")
+    else:
+        st.markdown(f"**Question {idx+1} of {total}**")
     st.write(q["question"])
 
     # Timers removed — questions are answered manually by the user
@@ -354,11 +367,34 @@ def show_quiz():
         if st.button("✅ Submit Answer", use_container_width=True) and not st.session_state.quiz_submitted:
             selected_index = q["options"].index(choice)
             already_answered = idx in st.session_state.quiz_answers and st.session_state.quiz_answers[idx] is not None
+            answered_at = time.time()
+            if not already_answered:
+                # before the answer is queued: a first load of the learner's cards reads the store
+                review_queue(st.session_state.quiz_course, quiz_bank()).record(
+                    st.session_state.quiz_ids[idx], selected_index == q["correct"], answered_at)
+            was_correct = already_answered and st.session_state.quiz_answers[idx] == q["correct"]
+            st.session_state.module_scores.record(q["module"], selected_index == q["correct"], was_correct)
             # store answer (in shuffled options index)
             st.session_state.quiz_answers[idx] = selected_index
             st.session_state.quiz_submitted = True
+            # queue the answer for the attempt store; written in the background
+            code = st.session_state.quiz_perms[idx]
+            get_attempt_writer().submit(AnswerRecord(
+                attempt_id=st.session_state.attempt_id,
+                position=idx,
+                question_id=st.session_state.quiz_ids[idx],
+                option=decode_permutation(code, len(q["options"]))[selected_index],
+                correct=selected_index == q["correct"],
+                answered_at=answered_at,
+            ))
+            if already_answered:
+                # the store replaces the earlier answer to this position; fold the cards again from it
+                get_review_scheduler().forget(learner_id(), st.session_state.quiz_course, quiz_bank().version)
             # update score only the first time this question is submitted
             if not already_answered:
+                if adaptive is not None:
+                    # mastery estimates use the first answer to each question
+                    adaptive.record(st.session_state.quiz_ids[idx], selected_index == q["correct"])
                 if selected_index == q["correct"]:
                     st.session_state.quiz_score += 1
                     # show celebratory bubbles when the user selects the correct answer
@@ -370,7 +406,7 @@ def show_quiz():
 
     with cols[2]:
         if st.button("Next ➡️", use_container_width=True):
-            if idx < total - 1:
+            if idx < total - 1 or (adaptive is not None and extend_adaptive_quiz()):
                 st.session_state.quiz_idx = idx + 1
                 st.session_state.quiz_submitted = False
                 st.rerun()
@@ -395,52 +431,72 @@ def show_quiz():
     # If on results page, show a summary (handled outside this function when page set)
 
 
+@instrument()
 def show_quiz_results():
     # Ensure quiz state exists
     score = st.session_state.get("quiz_score", 0)
-    total = len(st.session_state.get("shuffled_quiz", QUIZ))
+    bank = quiz_bank()
+    if "quiz_ids" in st.session_state:
+        ids, perms = st.session_state.quiz_ids, st.session_state.quiz_perms
+        module_scores = st.session_state.module_scores
+        positions = st.session_state.quiz_module_positions
+    else:
+        # no quiz taken yet: list the whole bank in original order
+        ids, perms = new_quiz(range(len(bank)), [0] * len(bank))
+        module_scores = ModuleScores.for_quiz(bank, ids)
+        positions = module_positions(bank, ids)
+    total = len(ids)
+    if st.session_state.get("attempt_id") and not st.session_state.get("attempt_result_saved"):
+        get_attempt_writer().submit(ResultRecord(
+            st.session_state.attempt_id, score, total, time.time()
+        ))
+        st.session_state.attempt_result_saved = True
     st.header("🏁 Quiz Results")
     st.write(f"You scored **{score}** out of **{total}**.")
-    # Per-module breakdown
-    # derive module totals from shuffled_quiz so it matches what was presented
-    module_totals = {}
-    module_correct = {}
-    for i, q in enumerate(st.session_state.get("shuffled_quiz", [])):
-        m = q.get("module", "General")
-        module_totals[m] = module_totals.get(m, 0) + 1
-        ans = st.session_state.get("quiz_answers", {}).get(i)
-        if ans is not None and ans == q["correct"]:
-            module_correct[m] = module_correct.get(m, 0) + 1
-
+    # Per-module breakdown, kept up to date as answers were submitted
     st.subheader("Per-module results")
-    for m, tot in module_totals.items():
-        corr = module_correct.get(m, 0)
+    for m, corr, tot in module_scores.rows():
         st.write(f"**{m}:** {corr} / {tot} correct")
     st.progress(score / total if total > 0 else 0)
+    adaptive = st.session_state.get("adaptive_quiz")
+    if adaptive is not None:
+        st.subheader("Estimated mastery")
+        for m, (mean, sd) in adaptive.mastery().items():
+            st.write(f"**{m}:** {mean:.0%} ± {sd:.0%}")
+    st.markdown("---")
+    # Question-by-question summary, one collapsible section per module. Details
+    # are only rendered for opened sections, one page at a time, so long quizzes
+    # don't send hundreds of elements on every rerun.
+    st.subheader("Question details")
+    answers = st.session_state.get("quiz_answers", {})
+    for m, corr, tot in module_scores.rows():
+        if st.toggle(f"{m} ({corr} / {tot} correct)", key=f"results_open_{m}"):
+            show_results_module(bank, ids, perms, answers, m, positions.get(m, ()))
     st.markdown("---")
-    # show question-by-question summary (use shuffled_quiz to match what was presented)
-    for i, q in enumerate(st.session_state.get("shuffled_quiz", QUIZ)):
-        answered = st.session_state.get("quiz_answers", {}).get(i)
-        correct = q["correct"]
-        st.write(f"**Q{i+1}. {q['question']}**")
-        if answered is None:
-            st.write("Your answer: _No answer_")
-        else:
-            st.write(f"Your answer: {q['options'][answered]}")
-        st.write(f"Correct answer: {q['options'][correct]}")
-        # explanation if available
-        if q.get("explanation"):
-            st.info(f"Explanation: {q['explanation']}")
-        st.markdown("---")
+
+    missed = sum(1 for a in answers.values() if a is not None) - score
+    if missed > 0:
+        st.info(f"The {missed} question{'s' if missed != 1 else ''} you missed "
+                f"{'are' if missed != 1 else 'is'} now in your review queue.")
+        if st.button("🔁 Review missed questions", use_container_width=True):
+            st.session_state.page = "review"
+            st.rerun()
 
     cols = st.columns(3)
     with cols[0]:
         if st.button("Retake Quiz", use_container_width=True):
+            if adaptive is not None:
+                # an adaptive quiz depends on the answers, so start a fresh one
+                initialize_quiz_adaptive()
+                st.session_state.page = "quiz"
+                st.rerun()
             # reset quiz
             st.session_state.quiz_idx = 0
             st.session_state.quiz_score = 0
             st.session_state.quiz_answers = {}
             st.session_state.quiz_submitted = False
+            st.session_state.module_scores.reset()
+            begin_attempt()
             st.session_state.page = "quiz"
             st.rerun()
     with cols[1]:
@@ -453,6 +509,162 @@ def show_quiz_results():
             st.rerun()
 
 
+def show_results_module(bank, ids, perms, answers, module, positions):
+    """One page of question details for ``module`` on the results page."""
+    pages = max(1, -(-len(positions) // RESULTS_PAGE_SIZE))
+    page_key = f"results_page_{module}"
+    page = min(st.session_state.get(page_key, 0), pages - 1)
+    start = page * RESULTS_PAGE_SIZE
+    for pos in positions[start:start + RESULTS_PAGE_SIZE]:
+        # resolve text from the bank (use the session's quiz to match what was presented)
+        q = present(bank[ids[pos]], perms[pos])
+        answered = answers.get(pos)
+        your_answer = "_No answer_" if answered is None else q["options"][answered]
+        st.markdown(
+            f"**Q{pos+1}. {q['question']}**  \n"
+            f"Your answer: {your_answer}  \n"
+            f"Correct answer: {q['options'][q['correct']]}"
+        )
+        # explanation if available
+        if q.get("explanation"):
+            st.info(f"Explanation: {q['explanation']}")
+
+    if pages > 1:
+        cols = st.columns([1, 2, 1])
+        with cols[0]:
+            if st.button("⬅️ Previous", key=f"results_prev_{module}", disabled=page == 0):
+                st.session_state[page_key] = page - 1
+                st.rerun()
+        with cols[1]:
+            st.caption(f"Page {page + 1} of {pages}")
+        with cols[2]:
+            if st.button("Next ➡️", key=f"results_next_{module}", disabled=page >= pages - 1):
+                st.session_state[page_key] = page + 1
+                st.rerun()
+
+
+def admin_enabled():
+    """Instructor pages are shown with ``?admin=1`` or AV_TUTOR_ADMIN=1."""
+    return st.query_params.get("admin") == "1" or os.environ.get("AV_TUTOR_ADMIN") == "1"
+
+
+@instrument()
+def show_admin():
+    """Cohort item analytics over every stored attempt."""
+    import analytics  # NumPy is only needed on this page
+
+    st.header("📊 Item Analytics")
+    bank = get_bank()
+    report = analytics.analyze(bank, get_attempt_writer().store.answer_rows(current_course(), bank.version))
+    st.caption(
+        f"{report.answers} answers from {report.attempts} attempts, analysed in {report.seconds:.2f} s"
+    )
+    if report.dropped:
+        st.warning(f"{report.dropped} stored answers were left out: their questions are not in the current bank.")
+    if not report.answers:
+        st.info("No answers have been recorded yet.")
+        return
+
+    st.subheader("Module results")
+    rollup, learners = cohort_rollup(get_attempt_writer().store, bank, current_course())
+    st.caption(f"{learners} learners, {rollup.score} / {rollup.total} questions answered correctly")
+    st.dataframe(
+        [{"module": m, "correct": c, "presented": t, "share correct": round(c / t, 3) if t else None}
+         for m, c, t in rollup.rows()],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    st.subheader("Module reliability (KR-20)")
+    st.dataframe(report.modules, hide_index=True, use_container_width=True)
+
+    st.subheader("Content cache")
+    st.dataframe([get_registry().stats()], hide_index=True, use_container_width=True)
+    from concept_pages import PAGE_CACHE
+    st.caption("Rendered concept pages")
+    st.dataframe([PAGE_CACHE.stats()], hide_index=True, use_container_width=True)
+
+    st.subheader("Items")
+    st.dataframe(
+        [{
+            "module": it["module"],
+            "question": it["question"],
+            "responses": it["responses"],
+            "difficulty (p)": round(it["p_value"], 3),
+            "discrimination (r_pb)": round(it["point_biserial"], 3),
+            "option rates": " / ".join(
+                ("*" if i == it["correct_option"] else "") + f"{r:.2f}"
+                for i, r in enumerate(it["option_rates"])
+            ),
+        } for it in report.items],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+@instrument()
+def show_review():
+    """Spaced-repetition review: the learner's due questions, one at a time."""
+    st.header("🔁 Review")
+    bank = get_bank()
+    queue = review_queue()
+    qid = st.session_state.get("review_qid")
+    if st.session_state.get("review_course") != current_course():
+        qid = None
+    if qid is None or qid >= len(bank):
+        qid = queue.next_due(time.time())
+        while qid is not None and qid >= len(bank):
+            # from an older version of the bank
+            queue.drop(qid)
+            qid = queue.next_due(time.time())
+        if qid is None:
+            st.success("Nothing to review right now.")
+            due = queue.next_review()
+            if due is not None:
+                st.write(f"Next review {time.strftime('%a %d %b, %H:%M', time.localtime(due))}.")
+            else:
+                st.write("Questions you miss in a quiz come back here, at growing intervals "
+                         "until you answer them right.")
+            if st.button("❓ Take a Quiz", use_container_width=True):
+                st.session_state.page = "quiz_start"
+                st.rerun()
+            return
+        st.session_state.review_qid = qid
+        st.session_state.review_course = current_course()
+        st.session_state.review_perm = secrets.randbelow(factorial(len(bank[qid]["options"])))
+        st.session_state.review_answer = None
+
+    st.caption(f"{queue.due_count(time.time())} due · {len(queue)} in your review queue")
+    q = present(bank[qid], st.session_state.review_perm)
+    st.subheader(q["module"])
+    st.write(q["question"])
+    answer = st.session_state.review_answer
+    choice = st.radio("Select an answer:", q["options"], index=answer or 0, disabled=answer is not None)
+    if answer is None:
+        if st.button("✅ Submit Answer", use_container_width=True):
+            answer = st.session_state.review_answer = q["options"].index(choice)
+            now = time.time()
+            card = queue.record(qid, answer == q["correct"], now)
+            get_attempt_writer().submit(ReviewRecord(
+                learner_id(), current_course(), qid, answer == q["correct"], now, bank.version))
+            st.session_state.review_card = card
+            st.rerun()
+        return
+
+    card = st.session_state.get("review_card")
+    if answer == q["correct"]:
+        st.success(f"✓ Correct — next review in {card.interval:g} day{'s' if card.interval != 1 else ''}")
+    else:
+        st.error(f"✗ Incorrect — correct answer: {q['options'][q['correct']]}. It stays in today's review.")
+    if q.get("explanation"):
+        st.info(f"Explanation: {q['explanation']}")
+    if st.button("Next ➡️", use_container_width=True):
+        for key in ("review_qid", "review_perm", "review_answer", "review_card"):
+            st.session_state.pop(key, None)
+        st.rerun()
+
+
+@instrument()
 def show_exit():
     st.success("Thanks for using AV Tutor!")
     st.write("You can close this tab to exit, or return home.")
@@ -461,61 +673,166 @@ def show_exit():
         st.rerun()
 
 
-def initialize_quiz_grouped():
-    """Prepare a quiz of 20 random questions: select up to 5 random questions per module,
-    shuffle options per question, then randomize overall order so the 20 questions are mixed.
-    """
-    module_order = list(CONTENT_MAP.keys())
-    per_module_selected = []
-    for m in module_order:
-        # collect questions for this module
-        qs = [q for q in QUIZ if q.get("module") == m]
-        if len(qs) <= 5:
-            selected = qs[:]
-        else:
-            selected = random.sample(qs, 5)
-        per_module_selected.extend(selected)
-
-    # For each selected question, shuffle options and compute new correct index
-    final = []
-    for q in per_module_selected:
-        opts_idx = list(range(len(q["options"])))
-        random.shuffle(opts_idx)
-        opts = [q["options"][i] for i in opts_idx]
-        new_correct = opts_idx.index(q["correct"])
-        final.append({
-            "module": q.get("module", "General"),
-            "question": q["question"],
-            "options": opts,
-            "correct": new_correct,
-            "explanation": q.get("explanation", ""),
-        })
-
-    # Keep overall order grouped by module (Module 1 -> Module 4)
+def next_quiz_seed():
+    """Seed for the next quiz in this session.
 
-    # store in session state
-    st.session_state.shuffled_quiz = final
+    An ``?assignment=<id>`` URL parameter gives every learner on that
+    assignment the same quiz; otherwise each session gets its own random base
+    seed and each attempt a new seed derived from it.
+    """
+    assignment = st.query_params.get("assignment")
+    if assignment:
+        return derive_seed("assignment", assignment)
+    if "session_seed" not in st.session_state:
+        st.session_state.session_seed = secrets.randbits(64)
+    st.session_state.quiz_attempt = st.session_state.get("quiz_attempt", 0) + 1
+    return derive_seed("session", st.session_state.session_seed, st.session_state.quiz_attempt)
+
+
+def store_quiz(quiz, bank):
+    """Put a quiz generated from ``bank`` in session state and reset quiz progress."""
+    st.session_state.pop("adaptive_quiz", None)
+    # question IDs only mean something within the course and content version they were drawn from
+    st.session_state.quiz_course = current_course()
+    st.session_state.quiz_bank = bank
+    # store question IDs and option codes in session state; text stays in the bank
+    st.session_state.quiz_seed = quiz.seed
+    st.session_state.quiz_ids, st.session_state.quiz_perms = quiz.session_arrays()
+    # per-module counters, updated on each submit so results need no rescan
+    st.session_state.module_scores = ModuleScores.for_quiz(bank, quiz.ids)
+    st.session_state.quiz_module_positions = module_positions(bank, quiz.ids)
     st.session_state.quiz_idx = 0
     st.session_state.quiz_score = 0
-    st.session_state.quiz_answers = {}
+    st.session_state.quiz_answers = {}  # idx -> selected_index (in shuffled options)
     st.session_state.quiz_submitted = False
     st.session_state.quiz_started = True
+    begin_attempt()
+
+
+def get_quiz_pool(bank, module_order):
+    """Process-wide pool of ready grouped quizzes for the current content."""
+    factory = functools.partial(
+        generate_quiz, bank, modules=module_order, per_module=QUESTIONS_PER_MODULE
+    )
+    return shared_pool(
+        (bank, module_order), factory, size=QUIZ_POOL_SIZE, low_water=QUIZ_POOL_LOW_WATER,
+        slot=current_course(),
+    )
+
 
+@instrument()
+def initialize_quiz_grouped(seed=None):
+    """Prepare a quiz of 20 random questions: select up to 5 random questions per module
+    and shuffle options per question. The same seed always yields the same quiz.
 
+    Without an explicit seed or assignment, a ready quiz is taken from the
+    background pool so nothing is generated on the request path.
+    """
+    content_map = get_content_map()
+    module_order = tuple(content_map.keys())
+    bank = get_bank()
+    # Keep overall order grouped by module (Module 1 -> Module 4)
+    if seed is None and QUIZ_POOL_SIZE > 0 and not st.query_params.get("assignment"):
+        quiz = get_quiz_pool(bank, module_order).pop()
+    else:
+        quiz = generate_quiz(
+            bank,
+            next_quiz_seed() if seed is None else seed,
+            modules=module_order,
+            per_module=QUESTIONS_PER_MODULE,
+        )
+    store_quiz(quiz, bank)
+
+
+def adaptive_enabled():
+    """Adaptive quizzes are chosen on the summary page or with ``?mode=adaptive``."""
+    return st.query_params.get("mode") == "adaptive" or st.session_state.get("quiz_mode") == "adaptive"
+
+
+def get_adaptive_model():
+    """Shared adaptive-quiz tables for the current content, or None without an ontology."""
+    content = get_content()
+    if content is None or content.index is None:
+        return None
+    from adaptive import shared_model
+    model = shared_model(content.index, content.bank, content.question_classes)
+    return model if model.modules else None
+
+
+def initialize_quiz():
+    """Start the kind of quiz the learner asked for."""
+    if adaptive_enabled():
+        initialize_quiz_adaptive()
+    else:
+        initialize_quiz_grouped()
+
+
+@instrument()
+def initialize_quiz_adaptive(seed=None):
+    """Start an adaptive quiz with its first question; more are added as it goes.
+
+    Falls back to the grouped quiz when the ontology is unavailable.
+    """
+    model = get_adaptive_model()
+    if model is None:
+        logger.warning("Adaptive quiz needs the ontology; starting a grouped quiz")
+        initialize_quiz_grouped(seed)
+        return
+    seed = next_quiz_seed() if seed is None else seed
+    session = model.session(seed, ADAPTIVE_TARGET_SD, ADAPTIVE_MAX_QUESTIONS)
+    qid, code = session.next_item()
+    store_quiz(GeneratedQuiz(seed, (qid,), (code,)), model.bank)
+    st.session_state.adaptive_quiz = session
+
+
+def extend_adaptive_quiz():
+    """Append the adaptive quiz's next question; False once the quiz is over."""
+    item = st.session_state.adaptive_quiz.next_item()
+    if item is None:
+        return False
+    qid, code = item
+    module = quiz_bank()[qid].get("module", "General")
+    st.session_state.quiz_ids.append(qid)
+    st.session_state.quiz_perms.append(code)
+    st.session_state.module_scores.add_question(module)
+    positions = st.session_state.quiz_module_positions
+    if module not in positions:
+        positions[module] = array("I")
+    positions[module].append(len(st.session_state.quiz_ids) - 1)
+    save_attempt()
+    return True
+
+
+def initialize_quiz_ungrouped(limit=None, seed=None):
+    """Fallback quiz: up to ``limit`` questions (default all) drawn from the whole bank."""
+    bank = get_bank()
+    quiz = generate_quiz(bank, next_quiz_seed() if seed is None else seed, limit=limit)
+    store_quiz(quiz, bank)
+
+
+@instrument()
 def show_quiz_start():
     """Summary page shown before the quiz starts."""
+    content_map = get_content_map()
+    bank = get_bank()
     st.header("❓ Quick Quiz — Summary")
     st.info("You will complete 20 questions in total — 5 questions from each of the 4 learning modules.")
 
     st.subheader("Modules & question counts")
-    for m, cnt in [(m, sum(1 for q in QUIZ if q.get("module") == m)) for m in CONTENT_MAP.keys()]:
+    for m, cnt in [(m, bank.count(m)) for m in content_map.keys()]:
         st.write(f"- **{m}**: {cnt} questions")
 
+    adaptive = st.checkbox(
+        "Adaptive quiz (questions follow your answers and it ends as soon as your level is clear)",
+        value=st.session_state.get("quiz_mode") == "adaptive",
+    )
+    st.session_state.quiz_mode = "adaptive" if adaptive else "grouped"
+
     st.markdown("---")
     cols = st.columns(3)
     with cols[0]:
         if st.button("Start Quiz", use_container_width=True):
-            initialize_quiz_grouped()
+            initialize_quiz()
             st.session_state.page = "quiz"
             st.rerun()
     with cols[1]:
@@ -528,69 +845,115 @@ def show_quiz_start():
             st.rerun()
 
 
+def _navigate():
+    st.session_state.page = st.session_state.nav_page
+
+
 def sidebar_navigation():
     """Render sidebar navigation menu."""
     st.sidebar.title("🛡️ AV Tutor")
+    if current_course() != DEFAULT_COURSE:
+        st.sidebar.caption(f"Course: {get_registry().course(current_course()).title}")
     st.sidebar.markdown("---")
     # (No quiz timers configured — timer functionality removed)
-    
-    page = st.sidebar.radio(
+
+    pages = ["home", "learning", "quiz", "review"]
+    if admin_enabled():
+        pages.append("admin")
+    # The menu follows page changes made by buttons; pages outside it (quiz
+    # summary, results, exit) leave it unselected.
+    st.session_state.nav_page = st.session_state.page if st.session_state.page in pages else None
+    st.sidebar.radio(
         "Navigate to:",
-        ["home", "learning", "quiz"],
-        format_func=lambda x: {"home": "🏠 Home", "learning": "📚 Learning", "quiz": "❓ Quiz"}.get(x, x),
-        index=["home", "learning", "quiz"].index(st.session_state.page) if st.session_state.page in ["home", "learning", "quiz"] else 0
+        pages,
+        format_func=lambda x: {"home": "🏠 Home", "learning": "📚 Learning", "quiz": "❓ Quiz", "review": "🔁 Review",
+                               "admin": "📊 Analytics"}.get(x, x),
+        key="nav_page",
+        on_change=_navigate,
     )
-    st.session_state.page = page
-    
+
+    query = st.sidebar.text_input("🔍 Search", key="search_query", placeholder="Concepts, questions…")
+    if query.strip():
+        show_search_results(query)
+
     st.sidebar.markdown("---")
     if st.sidebar.button("🚪 Exit App", use_container_width=True):
         st.session_state.page = "exit"
 
-
-def main():
+    if telemetry.ENABLED:
+        show_telemetry_panel()
+
+
+@instrument()
+def show_search_results(query):
+    """Sidebar list of the best matches for ``query``; each opens its Learning page."""
+    from search import INDEXES
+
+    content = get_content()
+    if content is None:
+        st.sidebar.caption("Search is unavailable: the course content could not be loaded.")
+        return
+    results = INDEXES.get(content, get_content_map()).search(query, limit=SEARCH_RESULTS)
+    if not results:
+        st.sidebar.caption("No matches.")
+    icons = {"concept": "💡", "module": "📚", "question": "❓"}
+    for n, result in enumerate(results):
+        doc = result.document
+        title = doc.title if len(doc.title) <= 60 else doc.title[:59] + "…"
+        if st.sidebar.button(f"{icons[doc.kind]} {title}", key=f"search_hit_{n}", use_container_width=True):
+            st.session_state.page = "learning"
+            st.session_state.selected_module = doc.module
+            st.session_state.learning_concept = doc.concept
+            st.rerun()
+        st.sidebar.caption(doc.module)
+
+
+def show_telemetry_panel():
+    """Sidebar debug panel: this process's span timings and this session's previous rerun."""
+    if not st.sidebar.toggle("⏱️ Show timings", key="telemetry_panel"):
+        return
+    last = st.session_state.get("telemetry_last_rerun")
+    if last:
+        st.sidebar.caption("Previous rerun")
+        st.sidebar.code("\n".join(f"{'  ' * depth}{name:<{28 - 2 * depth}} {ms:8.2f} ms"
+                                   for depth, name, ms in last), language=None)
+    state = st.session_state.get("telemetry_state")
+    if state:
+        st.sidebar.caption(f"Session state: {state[0] / 1024:.1f} KiB ({state[1]:+,} bytes in the previous rerun)")
+    st.sidebar.dataframe(TELEMETRY.table(), hide_index=True, use_container_width=True)
+    st.sidebar.download_button("Prometheus metrics", TELEMETRY.prometheus(), "av_tutor_metrics.prom",
+                               mime="text/plain", use_container_width=True)
+    st.sidebar.download_button("OpenTelemetry spans (JSON)", json.dumps(TELEMETRY.otlp()),
+                               "av_tutor_spans.json", mime="application/json", use_container_width=True)
+
+
+def render_app():
     st.set_page_config(page_title="AV Tutor", layout="wide")
 
     if "page" not in st.session_state:
         st.session_state.page = "home"
-    if "selected_module" not in st.session_state:
-        st.session_state.selected_module = list(CONTENT_MAP.keys())[0]
     # Ensure quiz_start / quiz flow flags exist
     if "quiz_started" not in st.session_state:
         st.session_state.quiz_started = False
 
+    # A quiz is tied to the course it was drawn from; start over if the course changed
+    if "quiz_ids" in st.session_state and st.session_state.get("quiz_course") != current_course():
+        for key in ("quiz_ids", "quiz_perms", "quiz_idx", "adaptive_quiz", "quiz_bank"):
+            st.session_state.pop(key, None)
+        st.session_state.quiz_started = False
+
     # Sidebar navigation
     sidebar_navigation()
 
     # If user navigates to quiz and quiz not initialized, prepare the randomized 20-question quiz
     if st.session_state.page == "quiz" and not st.session_state.quiz_started:
         try:
-            initialize_quiz_grouped()
+            initialize_quiz()
         except Exception:
             # fallback: initialize basic shuffled quiz
             if "quiz_idx" not in st.session_state:
-                st.session_state.quiz_idx = 0
-                st.session_state.quiz_score = 0
-                st.session_state.quiz_answers = {}
-                st.session_state.quiz_submitted = False
-                # simple fallback: shuffle existing QUIZ list (may be >20)
-                shuffled = []
-                indices = list(range(len(QUIZ)))
-                random.shuffle(indices)
-                for qi in indices[:20]:
-                    q = QUIZ[qi]
-                    opts_idx = list(range(len(q["options"])))
-                    random.shuffle(opts_idx)
-                    opts = [q["options"][i] for i in opts_idx]
-                    new_correct = opts_idx.index(q["correct"])
-                    shuffled.append({
-                        "module": q.get("module", "General"),
-                        "question": q["question"],
-                        "options": opts,
-                        "correct": new_correct,
-                        "explanation": q.get("explanation", ""),
-                    })
-                st.session_state.shuffled_quiz = shuffled
-                st.session_state.quiz_started = True
+                # simple fallback: up to 20 questions from the whole bank
+                initialize_quiz_ungrouped(limit=20)
 
     # Main content
 
@@ -604,9 +967,39 @@ def main():
         show_quiz_start()
     elif st.session_state.page == "quiz_results":
         show_quiz_results()
+    elif st.session_state.page == "review":
+        show_review()
+    elif st.session_state.page == "admin" and admin_enabled():
+        show_admin()
     elif st.session_state.page == "exit":
         show_exit()
 
+    if os.environ.get("AV_TUTOR_PROFILE_IMPORTS"):
+        import_profile.log_report()
+
+
+# Session-state keys left out of the size measurement: shared objects and telemetry's own.
+TELEMETRY_SKIP_KEYS = frozenset({"quiz_bank", "telemetry_panel", "telemetry_last_rerun", "telemetry_state"})
+
+
+def main():
+    """Render one rerun; with AV_TUTOR_TELEMETRY=1 also time it and measure session state."""
+    if not telemetry.ENABLED:
+        render_app()
+        return
+    rerun = None
+    try:
+        with telemetry.span("rerun") as rerun:
+            render_app()
+    finally:
+        # runs on st.rerun() too, which leaves render_app() by exception
+        size = telemetry.state_size(st.session_state, skip=TELEMETRY_SKIP_KEYS)
+        previous = st.session_state.get("telemetry_state")
+        growth = TELEMETRY.observe_state(size, previous[0] if previous else None)
+        st.session_state.telemetry_state = (size, growth)
+        if rerun is not None:
+            st.session_state.telemetry_last_rerun = rerun.tree()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,132 @@
+"""
+Questions-to-convergence: adaptive quizzes vs fixed round-robin quizzes.
+
+Simulated learners with a hidden mastery per module answer questions from a
+synthetic ontology (modules x concepts) and question bank. Both strategies
+keep the same Beta posterior per module and stop once every module's standard
+deviation is at most the target; the fixed strategy asks modules in turn, the
+adaptive one asks whatever adaptive.AdaptiveSession selects. Reports
+questions needed, estimation error and time per selection step.
+
+    python benchmarks/adaptive_convergence.py [learners] [modules] [concepts_per_module] [target_sd]
+"""
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from adaptive import AdaptiveModel, beta_sd  # noqa: E402
+from ontology import parse_functional_syntax  # noqa: E402
+from ontology_index import OntologyIndex, QuestionClasses  # noqa: E402
+from question_bank import QuestionBank  # noqa: E402
+from stats import percentile  # noqa: E402
+
+QUESTIONS_PER_CONCEPT = 10
+
+
+def synthetic_content(modules, concepts):
+    """Ontology text, module classes and questions for a modules x concepts hierarchy."""
+    lines = ["Prefix(:=<http://example.org/av#>)", "Ontology(<http://example.org/av>"]
+    module_classes, questions = {}, []
+    for m in range(modules):
+        title = "Module %d" % m
+        module_classes[title] = "M%d" % m
+        lines.append("SubClassOf(:M%d :Root)" % m)
+        for c in range(concepts):
+            lines.append("SubClassOf(:M%d_C%d :M%d)" % (m, c, m))
+            for k in range(QUESTIONS_PER_CONCEPT):
+                questions.append({
+                    "module": title,
+                    "question": "M%d C%d Q%d" % (m, c, k),
+                    "options": ["a", "b", "c", "d"],
+                    "correct": 0,
+                    "concepts": ["M%d_C%d" % (m, c)],
+                })
+    lines.append(")")
+    return parse_functional_syntax(lines), module_classes, questions
+
+
+def run_fixed(model, truth, target_sd, rng, limit):
+    """Round-robin over modules until every module's posterior is precise enough."""
+    counts = {m: [0, 0] for m in model.modules}
+    pools = {m: list(model.bank.ids(m)) for m in model.modules}
+    for p in pools.values():
+        rng.shuffle(p)
+    asked = 0
+    order = list(model.modules)
+    while asked < limit:
+        if all(beta_sd(c + 1, w + 1) <= target_sd for c, w in counts.values()):
+            break
+        progressed = False
+        for m in order:
+            if pools[m]:
+                pools[m].pop()
+                counts[m][0 if rng.random() < truth[m] else 1] += 1
+                asked += 1
+                progressed = True
+        if not progressed:
+            break
+    estimate = {m: (c + 1) / (c + w + 2) for m, (c, w) in counts.items()}
+    return asked, estimate
+
+
+def run_adaptive(model, truth, target_sd, seed, rng, limit, step_times):
+    session = model.session(seed, target_sd=target_sd, max_questions=limit)
+    while True:
+        t0 = time.perf_counter()
+        item = session.next_item()
+        step_times.append(time.perf_counter() - t0)
+        if item is None:
+            break
+        qid = item[0]
+        session.record(qid, rng.random() < truth[model.bank[qid]["module"]])
+    return session.asked, {m: mean for m, (mean, _) in session.mastery().items()}
+
+
+def summarize(name, asked, errors):
+    asked = sorted(asked)
+    print("%-9s questions mean %6.1f  p50 %4d  p90 %4d   mean |error| %.3f" % (
+        name, statistics.mean(asked), percentile(asked, 50), percentile(asked, 90), statistics.mean(errors)))
+
+
+def main(argv):
+    learners = int(argv[1]) if len(argv) > 1 else 500
+    modules = int(argv[2]) if len(argv) > 2 else 4
+    concepts = int(argv[3]) if len(argv) > 3 else 5
+    target_sd = float(argv[4]) if len(argv) > 4 else 0.15
+
+    ontology, module_classes, questions = synthetic_content(modules, concepts)
+    t0 = time.perf_counter()
+    bank = QuestionBank(questions)
+    index = OntologyIndex(ontology)
+    model = AdaptiveModel(index, bank, QuestionClasses(index, bank, module_classes))
+    print("%d modules x %d concepts, %d questions; model built in %.1f ms" % (
+        modules, concepts, len(questions), (time.perf_counter() - t0) * 1000))
+    print("%d simulated learners, target sd %.2f" % (learners, target_sd))
+
+    rng = random.Random(0)
+    limit = len(questions)
+    fixed_asked, fixed_err, adaptive_asked, adaptive_err, step_times = [], [], [], [], []
+    for learner in range(learners):
+        # U-shaped abilities: most learners clearly know or clearly don't know a module
+        truth = {m: rng.betavariate(0.7, 0.7) for m in model.modules}
+        asked, est = run_fixed(model, truth, target_sd, random.Random(learner), limit)
+        fixed_asked.append(asked)
+        fixed_err.extend(abs(est[m] - truth[m]) for m in truth)
+        asked, est = run_adaptive(model, truth, target_sd, learner, random.Random(learner), limit, step_times)
+        adaptive_asked.append(asked)
+        adaptive_err.extend(abs(est[m] - truth[m]) for m in truth)
+
+    summarize("fixed", fixed_asked, fixed_err)
+    summarize("adaptive", adaptive_asked, adaptive_err)
+    saved = 1 - statistics.mean(adaptive_asked) / statistics.mean(fixed_asked)
+    step_times.sort()
+    print("adaptive asks %.0f%% fewer questions; selection step p50 %.1f us, p99 %.1f us" % (
+        saved * 100, percentile(step_times, 50) * 1e6, percentile(step_times, 99) * 1e6))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
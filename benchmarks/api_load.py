@@ -0,0 +1,178 @@
+"""
+Load test for the headless quiz API (quiz_api.py) with thousands of open connections.
+
+Starts the API with uvicorn in a subprocess (attempts in an in-memory store)
+unless --url points at a running one, then opens --connections keep-alive
+HTTP/1.1 connections at once. Each connection plays learners taking quizzes
+back to back: list the modules, start a quiz, answer every question one
+request at a time, fetch the results. Reports throughput and latency
+percentiles per endpoint; the client is one asyncio loop, so on a single
+machine it competes with the server for CPU.
+
+    python benchmarks/api_load.py [--connections 2000] [--quizzes 2] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from stats import percentile  # noqa: E402
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection sending JSON requests."""
+
+    def __init__(self, reader, writer, host):
+        self.reader, self.writer, self.host = reader, writer, host
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, host)
+
+    async def request(self, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(b"%s %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                          b"Content-Length: %d\r\n\r\n%s" % (method.encode(), path.encode(), self.host.encode(),
+                                                              len(payload), payload))
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+
+async def learner(host, port, quizzes, rng, start, latencies, errors):
+    await start.wait()
+    try:
+        client = await Client.connect(host, port)
+    except OSError as e:
+        errors["connect: %s" % type(e).__name__] += 1
+        return
+
+    async def timed(name, method, path, body=None):
+        t0 = time.perf_counter()
+        status, data = await client.request(method, path, body)
+        latencies[name].append(time.perf_counter() - t0)
+        if status >= 400:
+            errors["%s %d" % (name, status)] += 1
+        return data
+
+    try:
+        await timed("GET /modules", "GET", "/modules")
+        for _ in range(quizzes):
+            quiz = await timed("POST /quizzes", "POST", "/quizzes", {})
+            for q in quiz["questions"]:
+                await timed("POST answers", "POST", "/quizzes/%s/answers" % quiz["quiz_id"],
+                            {"position": q["position"], "option": rng.randrange(len(q["options"]))})
+            await timed("GET /quizzes/<id>", "GET", "/quizzes/" + quiz["quiz_id"])
+    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+        errors["connection: %s" % type(e).__name__] += 1
+    finally:
+        client.close()
+
+
+async def run(host, port, connections, quizzes):
+    latencies, errors = defaultdict(list), defaultdict(int)
+    start = asyncio.Event()
+    rng = random.Random(0)
+    tasks = [asyncio.create_task(learner(host, port, quizzes, random.Random(rng.random()), start, latencies, errors))
+             for _ in range(connections)]
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    start.set()
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - t0, latencies, errors
+
+
+def raise_open_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_healthy(host, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            client = await Client.connect(host, port)
+            status, _ = await client.request("GET", "/health")
+            client.close()
+            if status == 200:
+                return
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("quiz API did not start within %d s" % timeout)
+        await asyncio.sleep(0.2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--quizzes", type=int, default=2, help="quizzes taken per connection")
+    parser.add_argument("--url", help="test a running API instead of starting one")
+    args = parser.parse_args(argv)
+
+    limit = raise_open_file_limit()
+    # the server holds one descriptor per connection as well when started here
+    if limit < args.connections * (1 if args.url else 2) + 100:
+        print("warning: the open file limit (%d) is too low for %d connections" % (limit, args.connections))
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        env = dict(os.environ, AV_TUTOR_ATTEMPT_DB=os.environ.get("AV_TUTOR_ATTEMPT_DB", ":memory:"))
+        server = subprocess.Popen([sys.executable, str(ROOT / "quiz_api.py"), "--port", str(port)], env=env)
+    try:
+        asyncio.run(wait_healthy(host, port))
+        elapsed, latencies, errors = asyncio.run(run(host, port, args.connections, args.quizzes))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    requests = sum(len(v) for v in latencies.values())
+    print("%d connections, %d quizzes each: %d requests in %.1f s, %.0f requests/s" % (
+        args.connections, args.quizzes, requests, elapsed, requests / elapsed))
+    print("%-20s %8s %9s %9s %9s" % ("endpoint", "requests", "p50 ms", "p99 ms", "max ms"))
+    for name, times in latencies.items():
+        times.sort()
+        print("%-20s %8d %9.1f %9.1f %9.1f" % (
+            name, len(times), percentile(times, 50) * 1e3, percentile(times, 99) * 1e3, times[-1] * 1e3))
+    for name, count in sorted(errors.items()):
+        print("errors: %s x %d" % (name, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Answer submission throughput for simulated concurrent learners.
+
+Each submitter thread plays one learner answering questions as fast as it
+can. Compares:
+
+- sync:         each answer written in its own transaction on the UI thread
+- write-behind: answers queued and written in batches by the background writer
+
+for the SQLite (WAL) store and the in-memory store.
+
+    python benchmarks/attempt_store_throughput.py [submitters] [answers_each]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from attempt_store import (  # noqa: E402
+    AnswerRecord, MemoryAttemptStore, SQLiteAttemptStore, WriteBehindWriter,
+)
+
+
+def run(submit, submitters, answers_each):
+    barrier = threading.Barrier(submitters + 1)
+
+    def learner(n):
+        barrier.wait()
+        for i in range(answers_each):
+            submit(AnswerRecord("attempt-%d" % n, i, i % 20, i % 3, i % 2 == 0, time.time()))
+
+    threads = [threading.Thread(target=learner, args=(n,)) for n in range(submitters)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main(argv):
+    submitters = int(argv[1]) if len(argv) > 1 else 50
+    answers_each = int(argv[2]) if len(argv) > 2 else 200
+    total = submitters * answers_each
+    print("%d submitters x %d answers = %d records" % (submitters, answers_each, total))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteAttemptStore(os.path.join(tmp, "sync.db"))
+        elapsed = run(lambda rec: store.write_batch([rec]), submitters, answers_each)
+        print("sqlite sync          %9.0f records/s" % (total / elapsed))
+        store.close()
+
+        for name, store in (("sqlite write-behind", SQLiteAttemptStore(os.path.join(tmp, "wb.db"))),
+                            ("memory write-behind", MemoryAttemptStore())):
+            writer = WriteBehindWriter(store)
+            submit_elapsed = run(writer.submit, submitters, answers_each)
+            start = time.perf_counter()
+            writer.flush()
+            persisted = submit_elapsed + time.perf_counter() - start
+            assert len(store.answers()) == total
+            print("%-20s %9.0f records/s submitted, %9.0f records/s persisted (%d batches)" % (
+                name, total / submit_elapsed, total / persisted, writer.batches))
+            writer.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
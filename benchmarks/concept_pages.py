@@ -0,0 +1,169 @@
+"""
+Concept page render time with a cold and a warm rendered-page cache.
+
+1. Every concept page of a synthetic ontology (a random hierarchy under four
+   module classes, with relations between random classes and questions
+   tagged with random concepts), header plus all sections: rendered from
+   scratch (cold) vs served from PageCache (warm).
+2. The app's Learning page for the same ontology, served as a course (see
+   content_registry.py) and rendered headlessly through AppTest with every
+   section of each module page open: rerun time with the page cache cleared
+   before each rerun vs kept.
+
+    python benchmarks/concept_pages.py [classes] [relations_per_class] [reruns]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from concept_pages import PAGE_CACHE, PageCache, concept_page, concept_section  # noqa: E402
+from content_cache import freeze_content  # noqa: E402
+from ontology import parse_functional_syntax  # noqa: E402
+from stats import percentile  # noqa: E402
+
+MODULES = 4
+PROPERTIES = ("spreadsVia", "preventedBy", "handledBy")
+
+
+def synthetic_course(n, relations, rng):
+    """Ontology lines, module classes and questions for a random ``n``-class hierarchy."""
+    lines = ["Prefix(:=<http://example.org/big#>)", "Ontology(<http://example.org/big>"]
+    module_classes = {}
+    for m in range(MODULES):
+        module_classes["Module %d" % m] = "C%d" % (m + 1)
+        lines.append("SubClassOf(:C%d :C0)" % (m + 1))
+    for i in range(MODULES + 1, n):
+        lines.append("SubClassOf(:C%d :C%d)" % (i, rng.randrange(1, i)))
+    for i in range(1, n):
+        for _ in range(relations):
+            lines.append("SubClassOf(:C%d ObjectSomeValuesFrom(:%s :C%d))" % (
+                i, rng.choice(PROPERTIES), rng.randrange(1, n)))
+    lines.append(")")
+    questions = [{
+        "module": "Module %d" % (q % MODULES),
+        "question": "Question %d?" % q,
+        "options": ["a", "b", "c", "d"],
+        "correct": 0,
+        "concepts": ["C%d" % rng.randrange(1, n)],
+    } for q in range(n)]
+    return lines, module_classes, questions
+
+
+def write_course(directory, lines, module_classes, questions):
+    """Write the course files plus a catalog listing it as "bench"; returns the catalog path."""
+    directory = Path(directory)
+    (directory / "bench.owl").write_text("\n".join(lines), encoding="utf-8")
+    with open(directory / "bench.jsonl", "w", encoding="utf-8") as f:
+        for q in questions:
+            f.write(json.dumps(q) + "\n")
+    catalog = directory / "courses.json"
+    catalog.write_text(json.dumps({"bench": {
+        "title": "Benchmark", "ontology": "bench.owl", "questions": "bench.jsonl", "modules": module_classes,
+    }}), encoding="utf-8")
+    return catalog
+
+
+def render_all(content, cache):
+    times = []
+    for cls in range(len(content.index)):
+        start = time.perf_counter()
+        page = concept_page(content, cls, cache)
+        for key, _ in page.sections:
+            concept_section(content, cls, key, cache)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+
+def summarize(name, times):
+    print("%-6s mean %8.1f us  p50 %8.1f us  p99 %9.1f us  max %9.1f us" % (
+        name, statistics.mean(times) * 1e6, percentile(times, 50) * 1e6,
+        percentile(times, 99) * 1e6, times[-1] * 1e6))
+
+
+LEARNING_PAGE = '''
+import sys
+sys.path.insert(0, {root!r})
+import streamlit as st
+import av_tutor_ui as ui
+st.session_state.page = "learning"
+for name in {module_classes!r}:
+    for section in ("kinds", "related", "questions"):
+        st.session_state["concept_%s_%s" % (name, section)] = True
+ui.main()
+'''
+
+
+def learning_page(module_classes, reruns):
+    """Rerun times of the Learning page, every module visited, with the page cache cleared or kept."""
+    script = LEARNING_PAGE.format(root=str(ROOT), module_classes=list(module_classes.values()))
+    at = AppTest.from_string(script, default_timeout=120)
+    at.query_params["course"] = "bench"
+    at.run()  # content load and imports happen here, outside the measurement
+    assert not at.exception, at.exception
+    modules = list(module_classes)
+    results = {}
+    for name, clear in (("cold", True), ("warm", False)):
+        if not clear:
+            for module in modules:  # fill the cache first
+                at.session_state["selected_module"] = module
+                at.run()
+        times = []
+        for _ in range(reruns):
+            for module in modules:
+                if clear:
+                    PAGE_CACHE.clear()
+                at.session_state["selected_module"] = module
+                start = time.perf_counter()
+                at.run()
+                times.append(time.perf_counter() - start)
+                assert not at.exception, at.exception
+        results[name] = sorted(times)
+    return results
+
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 20_000
+    relations = int(argv[2]) if len(argv) > 2 else 2
+    reruns = int(argv[3]) if len(argv) > 3 else 10
+    rng = random.Random(0)
+
+    lines, module_classes, questions = synthetic_course(n, relations, rng)
+    t0 = time.perf_counter()
+    content = freeze_content("bench.owl", (n,), parse_functional_syntax(lines),
+                             dict.fromkeys(module_classes, ""), questions, module_classes)
+    print("%d classes, %d relations each, %d questions; content built in %.1f s" % (
+        n, relations, len(content.questions), time.perf_counter() - t0))
+    cache = PageCache()
+    cold = render_all(content, cache)
+    warm = render_all(content, cache)
+    print("every concept page, header and all sections:")
+    summarize("cold", cold)
+    summarize("warm", warm)
+    stats = cache.stats()
+    print("cache: %d entries, %.1f MB; cold total %.2f s, warm total %.3f s" % (
+        stats["entries"], stats["bytes"] / 1e6, sum(cold), sum(warm)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # read by av_tutor_ui when AppTest first imports it
+        os.environ["AV_TUTOR_COURSES"] = str(write_course(tmp, lines, module_classes, questions))
+        os.environ.setdefault("AV_TUTOR_ATTEMPT_DB", ":memory:")
+        pages = learning_page(module_classes, reruns)
+    print("Learning page rerun (AppTest, all sections open), %d reruns:" % len(pages["cold"]))
+    for name in ("cold", "warm"):
+        times = pages[name]
+        print("%-6s mean %6.2f ms  p50 %6.2f ms  p99 %6.2f ms" % (
+            name, statistics.mean(times) * 1e3, percentile(times, 50) * 1e3, percentile(times, 99) * 1e3))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
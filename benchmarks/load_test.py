@@ -0,0 +1,269 @@
+"""
+Headless load test: concurrent learners walking the app's page flow.
+
+Each simulated learner is its own Streamlit AppTest session running
+av_tutor_ui.main() in this process, so sessions share the content cache,
+quiz pool and attempt writer exactly as they do in one server worker. A
+learner walks
+
+    Home -> Learning -> quiz summary -> Start Quiz -> (answer, Next) x N -> results
+
+picking random answers. ``--concurrency`` learners are in flight at once and
+their reruns are interleaved in random order; AppTest drives one script run
+at a time per process, much as the GIL serialises script runs in a worker,
+while the app's background threads keep running alongside. Every rerun is
+timed and reported per step as latency percentiles, along with throughput
+and the memory each live session holds (measured separately with
+tracemalloc, which would otherwise slow the timed pass down).
+
+The report is printed and written as JSON; pass a previous report with
+--baseline to fail (exit status 1) when a step's p90 latency or the memory
+per session got worse by more than --tolerance.
+
+    python benchmarks/load_test.py [--sessions 50] [--concurrency 8] [--output report.json]
+                                   [--baseline old.json] [--tolerance 0.25] [--adaptive]
+
+Attempts go to an in-memory store unless AV_TUTOR_ATTEMPT_DB is set.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("AV_TUTOR_ATTEMPT_DB", ":memory:")
+
+import streamlit  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from stats import percentile  # noqa: E402
+
+STEPS = ("home", "learning", "quiz_start", "start_quiz", "submit", "next", "results")
+
+
+def app():
+    import av_tutor_ui
+    av_tutor_ui.main()
+
+
+class Walk:
+    """One learner's session; ``timings`` maps step name to rerun durations (seconds)."""
+
+    def __init__(self, seed, adaptive=False, max_questions=20, timeout=60):
+        self.rng = random.Random(seed)
+        self.max_questions = max_questions
+        self.at = AppTest.from_function(app, default_timeout=timeout)
+        if adaptive:
+            self.at.query_params["mode"] = "adaptive"
+        self.timings = {}
+        self.answered = 0
+
+    def _run(self, step, action=None):
+        start = time.perf_counter()
+        (action or self.at).run()
+        self.timings.setdefault(step, []).append(time.perf_counter() - start)
+        if self.at.exception:
+            raise RuntimeError("%s: %s" % (step, self.at.exception[0].value))
+
+    def _button(self, label):
+        for b in self.at.button:
+            if label in b.label:
+                return b.click()
+        raise RuntimeError("no %r button on page %r" % (label, self.at.session_state["page"]))
+
+    def _expect(self, page):
+        if self.at.session_state["page"] != page:
+            raise RuntimeError("expected page %r, got %r" % (page, self.at.session_state["page"]))
+
+    def steps(self):
+        """Walk the flow, yielding after every rerun so sessions can be interleaved."""
+        self._run("home")
+        yield
+        self._run("learning", self._button("Learning Modules"))
+        self._expect("learning")
+        yield
+        self._run("quiz_start", self._button("Take Quiz"))
+        self._expect("quiz_start")
+        yield
+        self._run("start_quiz", self._button("Start Quiz"))
+        yield
+        while self.at.session_state["page"] == "quiz" and self.answered < self.max_questions:
+            answer = next(r for r in self.at.radio if r.label == "Select an answer:")
+            answer.set_value(self.rng.choice(answer.options))
+            self._run("submit", self._button("Submit Answer"))
+            self.answered += 1
+            yield
+            self._run("next", self._button("Next"))
+            yield
+        self._run("results")
+        self._expect("quiz_results")
+
+    def run(self):
+        for _ in self.steps():
+            pass
+        return self
+
+
+def latency_table(walks):
+    steps = {}
+    for w in walks:
+        for step, times in w.timings.items():
+            steps.setdefault(step, []).extend(times)
+    table = {}
+    for step in STEPS + ("all",):
+        times = sorted(t for s, ts in steps.items() for t in ts) if step == "all" else sorted(steps.get(step, ()))
+        if times:
+            table[step] = {
+                "reruns": len(times),
+                "mean_ms": sum(times) / len(times) * 1000,
+                "p50_ms": percentile(times, 50) * 1000,
+                "p90_ms": percentile(times, 90) * 1000,
+                "p99_ms": percentile(times, 99) * 1000,
+                "max_ms": times[-1] * 1000,
+            }
+    return table
+
+
+def timed_pass(sessions, concurrency, adaptive, questions):
+    """Run ``sessions`` walks, ``concurrency`` at a time, stepping a random live one each tick."""
+    rng = random.Random(0)
+    waiting = iter(range(sessions))
+    live, walks, errors = [], [], []
+
+    def admit():
+        i = next(waiting, None)
+        if i is not None:
+            w = Walk(i, adaptive, questions)
+            live.append((i, w, w.steps()))
+
+    start = time.perf_counter()
+    for _ in range(concurrency):
+        admit()
+    while live:
+        k = rng.randrange(len(live))
+        i, w, steps = live[k]
+        try:
+            next(steps)
+            continue
+        except StopIteration:
+            walks.append(w)
+        except Exception as e:
+            errors.append("session %d: %s" % (i, e))
+        live.pop(k)
+        admit()
+    return walks, errors, time.perf_counter() - start
+
+
+def memory_pass(sessions, adaptive, questions):
+    """Bytes held per finished session, with every session kept alive (run after a warm-up)."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    live = [Walk(-2 - i, adaptive, questions).run() for i in range(sessions)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del live
+    return (after - before) / sessions
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def regressions(report, baseline, tolerance):
+    """Human-readable list of metrics that got worse than ``baseline`` by more than ``tolerance``."""
+    found = []
+    for step, row in report["latency"].items():
+        old = baseline.get("latency", {}).get(step)
+        if old and row["p90_ms"] > old["p90_ms"] * (1 + tolerance):
+            found.append("%s p90 %.1f ms -> %.1f ms" % (step, old["p90_ms"], row["p90_ms"]))
+    old_mem = baseline.get("memory", {}).get("bytes_per_session")
+    new_mem = report["memory"].get("bytes_per_session")
+    if old_mem and new_mem and new_mem > old_mem * (1 + tolerance):
+        found.append("memory per session %.0f KiB -> %.0f KiB" % (old_mem / 1024, new_mem / 1024))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent learners walking the app.")
+    parser.add_argument("--sessions", type=int, default=50, help="learners to simulate (default 50)")
+    parser.add_argument("--concurrency", type=int, default=8, help="learners active at once (default 8)")
+    parser.add_argument("--questions", type=int, default=20, help="questions each learner answers (default 20)")
+    parser.add_argument("--memory-sessions", type=int, default=10,
+                        help="sessions kept alive for the memory measurement (default 10, 0 skips it)")
+    parser.add_argument("--adaptive", action="store_true", help="take adaptive quizzes (?mode=adaptive)")
+    parser.add_argument("--output", default="load_test_report.json", help="JSON report to write")
+    parser.add_argument("--baseline", default=None, help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before --baseline fails (default 0.25)")
+    args = parser.parse_args(argv)
+
+    # warm up: first content load, snapshot read and quiz pool fill are not what we measure
+    Walk(-1, args.adaptive, args.questions).run()
+
+    walks, errors, wall = timed_pass(args.sessions, args.concurrency, args.adaptive, args.questions)
+    reruns = sum(len(ts) for w in walks for ts in w.timings.values())
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "streamlit": streamlit.__version__,
+        "config": {"sessions": args.sessions, "concurrency": args.concurrency,
+                   "questions": args.questions, "adaptive": args.adaptive},
+        "completed": len(walks),
+        "errors": errors,
+        "wall_seconds": wall,
+        "throughput": {
+            "reruns_per_second": reruns / wall if wall else 0.0,
+            "sessions_per_second": len(walks) / wall if wall else 0.0,
+            "answers_per_second": sum(w.answered for w in walks) / wall if wall else 0.0,
+        },
+        "latency": latency_table(walks),
+        "memory": {},
+    }
+    if args.memory_sessions > 0:
+        report["memory"] = {
+            "sessions": args.memory_sessions,
+            "bytes_per_session": memory_pass(args.memory_sessions, args.adaptive, args.questions),
+        }
+
+    print("%d/%d sessions completed in %.1f s (concurrency %d), %d errors" % (
+        len(walks), args.sessions, wall, args.concurrency, len(errors)))
+    for e in errors[:5]:
+        print("  " + e)
+    print("%-11s %7s %9s %9s %9s %9s" % ("step", "reruns", "p50 ms", "p90 ms", "p99 ms", "max ms"))
+    for step, row in report["latency"].items():
+        print("%-11s %7d %9.1f %9.1f %9.1f %9.1f" % (
+            step, row["reruns"], row["p50_ms"], row["p90_ms"], row["p99_ms"], row["max_ms"]))
+    t = report["throughput"]
+    print("throughput: %.1f reruns/s, %.1f answers/s, %.2f sessions/s" % (
+        t["reruns_per_second"], t["answers_per_second"], t["sessions_per_second"]))
+    if report["memory"]:
+        print("memory: %.0f KiB per live session" % (report["memory"]["bytes_per_session"] / 1024))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("report written to %s" % args.output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            worse = regressions(report, json.load(f), args.tolerance)
+        for line in worse:
+            print("REGRESSION: " + line)
+        if worse:
+            return 1
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
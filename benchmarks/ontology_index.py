@@ -0,0 +1,102 @@
+"""
+Hierarchy queries on a synthetic ontology: OntologyIndex vs walking SubClassOf edges.
+
+Builds a random class hierarchy (a random recursive tree, plus a share of
+classes with a second parent so it is a DAG), then times subsumption,
+ancestor, descendant and lowest-common-ancestor queries answered by the
+precomputed index and by a breadth-first walk over ``ontology.parents`` /
+``ontology.children`` as features did before.
+
+    python benchmarks/ontology_index.py [classes] [extra_parent_share] [queries]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ontology import parse_functional_syntax  # noqa: E402
+from ontology_index import OntologyIndex  # noqa: E402
+
+
+def synthetic_ontology(n, extra_share, rng):
+    lines = ["Prefix(:=<http://example.org/big#>)", "Ontology(<http://example.org/big>",
+             "Declaration(Class(:C0))"]
+    for i in range(1, n):
+        lines.append("SubClassOf(:C%d :C%d)" % (i, rng.randrange(i)))
+        if i > 1 and rng.random() < extra_share:
+            lines.append("SubClassOf(:C%d :C%d)" % (i, rng.randrange(i)))
+    lines.append(")")
+    return parse_functional_syntax(lines)
+
+
+def walk(start, edges):
+    seen = {start}
+    frontier = [start]
+    while frontier:
+        nxt = []
+        for c in frontier:
+            for p in edges[c]:
+                if p not in seen:
+                    seen.add(p)
+                    nxt.append(p)
+        frontier = nxt
+    return seen
+
+
+def naive_lca(ontology, a, b):
+    common = walk(a, ontology.parents) & walk(b, ontology.parents)
+    if not common:
+        return None
+    # deepest = the common ancestor with the most ancestors of its own
+    return max(common, key=lambda c: len(walk(c, ontology.parents)))
+
+
+def timed(fn, args):
+    start = time.perf_counter()
+    for a in args:
+        fn(*a)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 100_000
+    extra_share = float(argv[2]) if len(argv) > 2 else 0.01
+    queries = int(argv[3]) if len(argv) > 3 else 2000
+    rng = random.Random(0)
+
+    t0 = time.perf_counter()
+    ontology = synthetic_ontology(n, extra_share, rng)
+    t1 = time.perf_counter()
+    index = OntologyIndex(ontology)
+    t2 = time.perf_counter()
+    print("%d classes (%.0f%% with a second parent): parsed in %.2f s, index built in %.2f s, max depth %d"
+          % (len(index), extra_share * 100, t1 - t0, t2 - t1, max(index.depth)))
+
+    iris = ontology.classes
+    pairs = [(rng.choice(iris), rng.choice(iris)) for _ in range(queries)]
+    id_pairs = [(index.id[a], index.id[b]) for a, b in pairs]
+    # Descendant queries on random classes, plus the root and a few of its
+    # children, where a walk is most expensive.
+    near_top = [index.find("C0")] + [i for i in range(1, len(index)) if index.depth[i] == 1][:9]
+    desc_ids = [(i,) for i in near_top] + [(i,) for i, _ in id_pairs[:200]]
+    desc_iris = [(index.iri(i),) for (i,) in desc_ids]
+
+    rows = [
+        ("is_a", timed(lambda a, b: b in walk(a, ontology.parents), pairs),
+         timed(index.is_a, id_pairs)),
+        ("ancestors", timed(lambda a, b: walk(a, ontology.parents), pairs),
+         timed(lambda a, b: index.ancestors(a), id_pairs)),
+        ("descendants", timed(lambda a: walk(a, ontology.children), desc_iris),
+         timed(lambda a: len(index.descendants(a)), desc_ids)),
+        ("lca", timed(lambda a, b: naive_lca(ontology, a, b), pairs[:200]),
+         timed(index.lca, id_pairs)),
+    ]
+    print("%-12s %12s %12s %9s" % ("query", "walk (us)", "index (us)", "speed-up"))
+    for name, naive, fast in rows:
+        print("%-12s %12.1f %12.2f %8.0fx" % (name, naive, fast, naive / fast))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
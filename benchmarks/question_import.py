@@ -0,0 +1,79 @@
+"""
+Import throughput and memory for a large synthetic question file.
+
+Writes N JSON Lines rows (about 1% exact duplicates, 1% re-shuffled
+duplicates and 1% malformed rows) to a temporary directory, imports them with
+question_import.import_questions and reports rows/s and the growth in peak
+RSS, which should stay flat as N grows.
+
+    python benchmarks/question_import.py [rows]
+"""
+import json
+import random
+import resource
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from question_import import import_questions  # noqa: E402
+from snapshot import read_snapshot  # noqa: E402
+
+MODULES = ("What is a Virus?", "How Viruses Spread", "Using Antivirus Software", "Maintenance & Updates")
+
+
+def write_input(path, rows, rng):
+    previous = None
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            roll = rng.random()
+            if previous is not None and roll < 0.01:
+                q = previous
+            elif previous is not None and roll < 0.02:
+                # same question, options in another order
+                opts = list(previous["options"])
+                right = opts[previous["correct"]]
+                rng.shuffle(opts)
+                q = dict(previous, options=opts, correct=opts.index(right))
+            elif roll < 0.03:
+                f.write('{"module": "broken", "question": \n' if i % 2 else
+                        json.dumps({"module": "x", "question": "no options"}) + "\n")
+                continue
+            else:
+                q = {
+                    "module": MODULES[i % len(MODULES)],
+                    "question": "Synthetic question %d?" % i,
+                    "options": ["option %d" % k for k in range(4)],
+                    "correct": rng.randrange(4),
+                    "explanation": "Explanation for question %d." % i,
+                }
+            f.write(json.dumps(q) + "\n")
+            previous = q
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(argv):
+    rows = int(argv[1]) if len(argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "bank.jsonl"
+        write_input(src, rows, random.Random(0))
+        print("input: %d rows, %.1f MB" % (rows, src.stat().st_size / 2 ** 20))
+        before = peak_rss_mb()
+        report = import_questions(src, Path(tmp) / "bank.snapshot", Path(tmp) / "rejects.jsonl")
+        after = peak_rss_mb()
+        print(report)
+        print("peak RSS %.1f MB before import, %.1f MB after (+%.1f MB)" % (before, after, after - before))
+        with open(Path(tmp) / "rejects.jsonl", encoding="utf-8") as f:
+            print("first reject:", f.readline().strip()[:120])
+        snap_size = (Path(tmp) / "bank.snapshot").stat().st_size
+        print("snapshot %.1f MB, %d questions readable" % (
+            snap_size / 2 ** 20, len(read_snapshot(Path(tmp) / "bank.snapshot").questions)))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,71 @@
+"""
+"Start Quiz" latency under a synthetic classroom burst.
+
+N threads are released at once and each starts one quiz, either by generating
+it inline (the old request-path behaviour) or by popping from a pre-filled
+QuizPool. Reports p50/p99 start latency for both.
+
+    python benchmarks/quiz_pool_burst.py [learners] [pool_size]
+"""
+import functools
+import secrets
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from question_bank import QuestionBank  # noqa: E402
+from questions import QUIZ  # noqa: E402
+from quiz_generator import QUESTIONS_PER_MODULE, generate_quiz  # noqa: E402
+from quiz_pool import QuizPool  # noqa: E402
+from stats import percentile  # noqa: E402
+
+
+def burst(start_quiz, learners):
+    barrier = threading.Barrier(learners)
+    latencies = []
+    lock = threading.Lock()
+
+    def learner():
+        barrier.wait()
+        t0 = time.perf_counter()
+        start_quiz()
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.append(elapsed)
+
+    threads = [threading.Thread(target=learner) for _ in range(learners)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(latencies)
+
+
+def report(name, latencies):
+    print("%-8s p50 %8.3f ms   p99 %8.3f ms" % (
+        name, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000))
+
+
+def main(argv):
+    learners = int(argv[1]) if len(argv) > 1 else 300
+    size = int(argv[2]) if len(argv) > 2 else learners
+    bank = QuestionBank(QUIZ)
+    factory = functools.partial(
+        generate_quiz, bank, modules=bank.modules(), per_module=QUESTIONS_PER_MODULE)
+
+    print("%d learners, pool size %d" % (learners, size))
+    report("inline", burst(lambda: factory(secrets.randbits(64)), learners))
+
+    pool = QuizPool(factory, size=size, low_water=size // 4).start()
+    pool.wait_full(timeout=30)
+    report("pool", burst(pool.pop, learners))
+    stats = pool.stats()
+    pool.stop()
+    print("pool hits %d, misses %d" % (stats["hits"], stats["misses"]))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,98 @@
+"""
+Results page cost for long quizzes: element (delta) count and render time.
+
+Renders show_quiz_results() headlessly with Streamlit's AppTest for quizzes of
+20, 200 and 2000 questions drawn from a synthetic bank, and compares:
+
+- legacy:    every question rendered on every rerun (the previous layout)
+- collapsed: summary and per-module aggregates only
+- one open:  one module section opened (first page of its questions)
+
+    python benchmarks/results_render.py [sizes...]
+"""
+import sys
+import time
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCRIPT = '''
+import random, sys
+sys.path.insert(0, {root!r})
+import streamlit as st
+import av_tutor_ui as ui
+from question_bank import QuestionBank
+from quiz_generator import generate_quiz
+
+N = {n}
+MODULES = ["Module %d" % i for i in range(4)]
+if "bench_bank" not in st.session_state:
+    bank = QuestionBank([
+        {{"module": MODULES[i % 4], "question": "Question %d?" % i,
+          "options": ["A%d" % i, "B%d" % i, "C%d" % i], "correct": i % 3,
+          "explanation": "Because %d." % i}}
+        for i in range(N)
+    ])
+    st.session_state.bench_bank = bank
+ui.get_bank = lambda: st.session_state.bench_bank
+ui.get_content_map = lambda: dict.fromkeys(MODULES, "")
+ui.get_attempt_writer = lambda: type("W", (), {{"submit": lambda self, r: None}})()
+if "quiz_ids" not in st.session_state:
+    ui.store_quiz(generate_quiz(st.session_state.bench_bank, 1, limit=N))
+    rng = random.Random(2)
+    st.session_state.quiz_answers = {{i: rng.randrange(3) for i in range(N)}}
+
+if {legacy}:
+    bank = st.session_state.bench_bank
+    st.header("Quiz Results")
+    for m, corr, tot in st.session_state.module_scores.rows():
+        st.write(f"**{{m}}:** {{corr}} / {{tot}} correct")
+    from quiz_state import present_quiz
+    for i, q in enumerate(present_quiz(bank, st.session_state.quiz_ids, st.session_state.quiz_perms)):
+        answered = st.session_state.quiz_answers.get(i)
+        st.write(f"**Q{{i+1}}. {{q['question']}}**")
+        st.write(f"Your answer: {{q['options'][answered]}}")
+        st.write(f"Correct answer: {{q['options'][q['correct']]}}")
+        st.info(f"Explanation: {{q['explanation']}}")
+        st.markdown("---")
+else:
+    ui.show_quiz_results()
+'''
+
+
+def count_elements(node):
+    children = getattr(node, "children", None)
+    if not children:
+        return 1
+    return 1 + sum(count_elements(c) for c in children.values())
+
+
+def measure(n, legacy, open_first=False, reruns=5):
+    at = AppTest.from_string(SCRIPT.format(root=str(ROOT), n=n, legacy=legacy), default_timeout=120)
+    at.run()
+    if open_first:
+        at.toggle[0].set_value(True)
+        at.run()
+    assert not at.exception, at.exception
+    start = time.perf_counter()
+    for _ in range(reruns):
+        at.run()
+    elapsed = (time.perf_counter() - start) / reruns
+    return count_elements(at.main), elapsed
+
+
+def main(argv):
+    sizes = [int(a) for a in argv[1:]] or [20, 200, 2000]
+    print("%6s  %-9s %9s %11s" % ("n", "layout", "elements", "rerun ms"))
+    for n in sizes:
+        for name, legacy, open_first in (("legacy", True, False),
+                                         ("collapsed", False, False),
+                                         ("one open", False, True)):
+            elements, elapsed = measure(n, legacy, open_first)
+            print("%6d  %-9s %9d %11.1f" % (n, name, elements, elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,98 @@
+"""
+Search latency on a synthetic corpus: SearchIndex vs a substring scan.
+
+Builds documents from a Zipf-distributed vocabulary of made-up words (short
+titles, longer bodies, all three document kinds), indexes them, and times
+queries of one and two whole words, word prefixes as typed, and words with
+a typo, against scanning every document's text for each query word as a
+plain substring search would.
+
+    python benchmarks/search.py [documents] [vocabulary] [queries]
+"""
+import itertools
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from search import KINDS, Document, SearchIndex  # noqa: E402
+from stats import percentile  # noqa: E402
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def make_words(n, rng):
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 11))))
+    return sorted(words)
+
+
+def synthetic_documents(n, words, rng):
+    # Zipf: a few words are in nearly every document
+    cumulative = list(itertools.accumulate(1.0 / (r + 1) for r in range(len(words))))
+
+    def text(k):
+        return " ".join(rng.choices(words, cum_weights=cumulative, k=k))
+
+    return [Document(KINDS[d % 3], text(rng.randint(2, 8)), text(rng.randint(10, 40)), "Module %d" % (d % 4))
+            for d in range(n)]
+
+
+def typo(word, rng):
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+def queries(words, count, rng):
+    # mostly mid-frequency words: the top of the Zipf ranking is in nearly every document
+    pick = words[len(words) // 100:]
+    return {
+        "word": [rng.choice(pick) for _ in range(count)],
+        "two words": ["%s %s" % (rng.choice(pick), rng.choice(words[:len(words) // 10])) for _ in range(count)],
+        "prefix": [rng.choice(pick)[:3] for _ in range(count)],
+        "typo": [typo(rng.choice(pick), rng) for _ in range(count)],
+        "common word": [rng.choice(words[:10]) for _ in range(count)],
+    }
+
+
+def scan(documents, query):
+    words = query.lower().split()
+    return [d for d in documents if all(w in d.title.lower() or w in d.body.lower() for w in words)][:10]
+
+
+def timed(fn, args):
+    times = []
+    for a in args:
+        start = time.perf_counter()
+        fn(a)
+        times.append(time.perf_counter() - start)
+    return sorted(times)
+
+
+def main(argv):
+    n = int(argv[1]) if len(argv) > 1 else 100_000
+    vocabulary = int(argv[2]) if len(argv) > 2 else 30_000
+    count = int(argv[3]) if len(argv) > 3 else 200
+    rng = random.Random(0)
+    words = make_words(vocabulary, rng)
+    documents = synthetic_documents(n, words, rng)
+
+    start = time.perf_counter()
+    index = SearchIndex(documents)
+    print("%d documents, %d terms; index built in %.2f s" % (n, len(index.terms), time.perf_counter() - start))
+
+    print("%-12s %10s %10s %10s %12s" % ("query", "p50 ms", "p99 ms", "max ms", "scan p50 ms"))
+    for name, qs in queries(words, count, rng).items():
+        times = timed(lambda q: index.search(q, 10), qs)
+        scanned = timed(lambda q: scan(documents, q), qs[:max(1, count // 20)])
+        print("%-12s %10.2f %10.2f %10.2f %12.1f" % (
+            name, percentile(times, 50) * 1e3, percentile(times, 99) * 1e3, times[-1] * 1e3,
+            statistics.median(scanned) * 1e3))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
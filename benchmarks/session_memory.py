@@ -0,0 +1,73 @@
+"""
+Per-session quiz state memory: copied question dicts vs compact IDs + codes.
+
+Builds the quiz state for many simulated sessions both ways and reports the
+memory each layout allocates per session (tracemalloc, so strings shared with
+the bank are not counted for either layout).
+
+    python benchmarks/session_memory.py [sessions]
+"""
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from question_bank import QuestionBank  # noqa: E402
+from questions import QUIZ  # noqa: E402
+from quiz_state import encode_permutation, new_quiz  # noqa: E402
+
+PER_MODULE = 5
+
+
+def legacy_state(bank, modules, rng):
+    # The layout sessions used to hold: one copied dict and option list per question.
+    final = []
+    for qid in bank.sample_per_module(modules, PER_MODULE, rng):
+        q = bank[qid]
+        opts_idx = list(range(len(q["options"])))
+        rng.shuffle(opts_idx)
+        final.append({
+            "module": q.get("module", "General"),
+            "question": q["question"],
+            "options": [q["options"][i] for i in opts_idx],
+            "correct": opts_idx.index(q["correct"]),
+            "explanation": q.get("explanation", ""),
+        })
+    return final
+
+
+def compact_state(bank, modules, rng):
+    ids = bank.sample_per_module(modules, PER_MODULE, rng)
+    perms = []
+    for qid in ids:
+        opts_idx = list(range(len(bank[qid]["options"])))
+        rng.shuffle(opts_idx)
+        perms.append(encode_permutation(opts_idx))
+    return new_quiz(ids, perms)
+
+
+def measure(build, bank, modules, sessions):
+    rng = random.Random(0)
+    tracemalloc.start()
+    states = [build(bank, modules, rng) for _ in range(sessions)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del states
+    return current / sessions
+
+
+def main(argv):
+    sessions = int(argv[1]) if len(argv) > 1 else 2000
+    bank = QuestionBank(QUIZ)
+    modules = bank.modules()
+    before = measure(legacy_state, bank, modules, sessions)
+    after = measure(compact_state, bank, modules, sessions)
+    print("sessions: %d, questions per quiz: %d" % (sessions, PER_MODULE * len(modules)))
+    print("copied dicts : %8.0f bytes/session" % before)
+    print("compact state: %8.0f bytes/session (%.1fx smaller)" % (after, before / after))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,284 @@
+"""
+Concept pages generated from the ontology, rendered once and cached.
+
+Every class in the ontology gets a page: where it sits in the hierarchy, its
+kinds (subclasses), the threats, infection vectors and response actions it
+is related to through ``ObjectSomeValuesFrom`` restrictions (see
+ontology.py), and the practice questions that test it. Each page also lists
+the concepts it refers to, which the Learning page shows as cross-links.
+
+Rendering walks the hierarchy and the relations, so it is done once per
+content version: the page header (title, overview and section list) and
+each section's markdown are cached separately in PAGE_CACHE, keyed by
+``(ontology path, file stat key, class ID[, section])``. Sections are only
+rendered when a learner opens them. The cache is shared by all sessions and
+evicts the least recently used entries once their total size exceeds
+AV_TUTOR_PAGE_CACHE_MB (default 16). Entries for an older content version
+are never hit again and age out the same way.
+
+    python benchmarks/concept_pages.py    # cold vs warm render times
+"""
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from ontology import describe_class, local_name
+
+SECTIONS = (
+    ("kinds", "Kinds of {label}"),
+    ("related", "Related threats, infection vectors and actions"),
+    ("questions", "Practice questions"),
+)
+MAX_LINKS = 24  # cross-links listed per page
+MAX_QUESTIONS = 20  # practice questions listed per page
+
+
+@dataclass(frozen=True)
+class ConceptPage:
+    """Rendered header of one concept page; sections come from concept_section()."""
+    cls: int  # class ID in the content's OntologyIndex
+    name: str  # local name of the class, stable across content versions
+    title: str
+    overview: str  # markdown
+    sections: tuple  # (section key, heading) for the sections that have content
+    links: tuple  # (local name, label) of the concepts the page refers to
+
+    @property
+    def size(self):
+        return (len(self.overview) + len(self.title) + sum(len(h) for _, h in self.sections)
+                + sum(len(n) + len(label) for n, label in self.links) + 200)
+
+
+class PageCache:
+    """Thread-safe LRU of rendered pages and sections, bounded by total size."""
+
+    def __init__(self, max_bytes=None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.render_seconds = 0.0
+
+    def get(self, key, render):
+        """Cached value for ``key``, calling ``render()`` on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+        # Rendered outside the lock; two sessions missing the same key at once
+        # both render it, which is cheaper than making every other page wait.
+        start = time.perf_counter()
+        value = render()
+        elapsed = time.perf_counter() - start
+        size = len(value) if isinstance(value, str) else value.size
+        with self._lock:
+            self.misses += 1
+            self.render_seconds += elapsed
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self._bytes += size
+            self._evict()
+        return value
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        while len(self._entries) > 1 and self._bytes > self.max_bytes:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "render_seconds": self.render_seconds,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.render_seconds = 0.0
+
+
+# Shared by every session in this process.
+PAGE_CACHE = PageCache(max_bytes=int(float(os.environ.get("AV_TUTOR_PAGE_CACHE_MB", "16")) * 1024 * 1024))
+
+
+_incoming = weakref.WeakKeyDictionary()  # OntologyIndex -> {class ID: ((source ID, property IRI), ...)}
+
+
+def incoming_relations(index):
+    """Relations pointing at each class, by class ID; built once per content version."""
+    table = _incoming.get(index)
+    if table is None:
+        table = {}
+        for source, rels in index.ontology.relations.items():
+            s = index.id.get(source)
+            for prop, target in rels:
+                t = index.id.get(target)
+                if s is not None and t is not None:
+                    table.setdefault(t, []).append((s, prop))
+        table = _incoming[index] = {t: tuple(v) for t, v in table.items()}
+    return table
+
+
+def _outgoing(index, cls):
+    """``(property IRI, target ID, source ID)`` for relations of ``cls``, its kinds and its superclasses."""
+    ontology = index.ontology
+    out = []
+    for source in list(index.descendants(cls)) + list(index.ancestors(cls)[1:]):
+        for prop, target in ontology.relations.get(index.iri(source), ()):
+            t = index.id.get(target)
+            if t is not None:
+                out.append((prop, t, source))
+    return out
+
+
+def _incoming_under(index, cls):
+    """``(source ID, property IRI, target ID)`` for relations into ``cls`` or its kinds
+    from outside it (relations within the subtree are already outgoing ones).
+    """
+    table = incoming_relations(index)
+    descendants = index.descendants(cls)
+    if len(table) < len(descendants):
+        found = [(s, prop, t) for t, rels in table.items() if index.is_a(t, cls) for s, prop in rels]
+    else:
+        found = [(s, prop, t) for t in descendants for s, prop in table.get(t, ())]
+    return [r for r in found if not index.is_a(r[0], cls)]
+
+
+def _label(index, i):
+    return index.ontology.label(index.iri(i))
+
+
+def _questions(content, cls):
+    if content.question_classes is None:
+        return []
+    return content.question_classes.questions_under(cls)
+
+
+def build_page(content, cls):
+    """Render the header of the concept page for class ID ``cls``."""
+    index, ontology = content.index, content.ontology
+    iri = index.iri(cls)
+    label = ontology.label(iri)
+
+    path = []
+    parent = index.parent[cls]
+    while parent >= 0:
+        path.append(_label(index, parent))
+        parent = index.parent[parent]
+    path.reverse()
+    lines = []
+    if path:
+        lines.append("*" + " › ".join(path) + "*")
+        lines.append("")
+    lines.append(describe_class(ontology, iri) or label)
+
+    children = ontology.children.get(iri, ())
+    outgoing = _outgoing(index, cls)
+    incoming = _incoming_under(index, cls)
+    questions = _questions(content, cls)
+    facts = []
+    if children:
+        facts.append("%d kind%s" % (len(children), "" if len(children) == 1 else "s"))
+    related = {t for _, t, _ in outgoing} | {s for s, _, _ in incoming}
+    related.discard(cls)
+    if related:
+        facts.append("%d related concept%s" % (len(related), "" if len(related) == 1 else "s"))
+    if questions:
+        facts.append("%d practice question%s" % (len(questions), "" if len(questions) == 1 else "s"))
+    if facts:
+        lines.append("")
+        lines.append(" · ".join(facts))
+
+    sections = []
+    for key, heading in SECTIONS:
+        if (key == "kinds" and children) or (key == "related" and related) or (key == "questions" and questions):
+            sections.append((key, heading.format(label=label)))
+
+    linked = []
+    parent = index.parent[cls]
+    if parent >= 0:
+        linked.append(parent)
+    linked.extend(index.id[c] for c in children if c in index.id)
+    linked.extend(sorted(related, key=lambda i: _label(index, i)))
+    links = tuple((local_name(index.iri(i)), _label(index, i)) for i in dict.fromkeys(linked))[:MAX_LINKS]
+
+    return ConceptPage(cls=cls, name=local_name(iri), title=label, overview="\n".join(lines),
+                       sections=tuple(sections), links=links)
+
+
+def render_section(content, cls, section):
+    """Markdown for one section of the concept page for ``cls``."""
+    index, ontology = content.index, content.ontology
+    iri = index.iri(cls)
+    lines = []
+    if section == "kinds":
+        for child in sorted(ontology.children.get(iri, ()), key=ontology.label):
+            more = len(ontology.children.get(child, ()))
+            line = "- **%s**" % ontology.label(child)
+            if ontology.comments.get(child):
+                line += " — " + ontology.comments[child]
+            if more:
+                line += " (%d kind%s)" % (more, "" if more == 1 else "s")
+            lines.append(line)
+    elif section == "related":
+        # group by property, then by related concept, naming the classes each relation comes from
+        groups = {}
+        for prop, target, source in _outgoing(index, cls):
+            groups.setdefault((0, ontology.label(prop)), {}).setdefault(target, set()).add(source)
+        for source, prop, target in _incoming_under(index, cls):
+            groups.setdefault((1, ontology.label(prop)), {}).setdefault(source, set()).add(target)
+        for (direction, prop), related in sorted(groups.items()):
+            if direction == 0:
+                lines.append("**%s**" % (prop[:1].upper() + prop[1:]))
+            else:
+                lines.append("**What %s %s**" % (prop, ontology.label(iri)))
+            for other in sorted(related, key=lambda i: _label(index, i)):
+                via = sorted(_label(index, s) for s in related[other] if s != cls)
+                suffix = " (%s)" % ", ".join(via) if via else ""
+                lines.append("- %s%s" % (_label(index, other), suffix))
+            lines.append("")
+    elif section == "questions":
+        qids = _questions(content, cls)
+        for n, qid in enumerate(qids[:MAX_QUESTIONS], 1):
+            lines.append("%d. %s" % (n, content.bank[qid]["question"]))
+        if len(qids) > MAX_QUESTIONS:
+            lines.append("")
+            lines.append("…and %d more in the quiz." % (len(qids) - MAX_QUESTIONS))
+    else:
+        raise ValueError("unknown section %r" % section)
+    return "\n".join(lines).strip()
+
+
+def _version(content):
+    return (content.path, content.key)
+
+
+def concept_page(content, cls, cache=PAGE_CACHE):
+    """The cached ConceptPage for class ID ``cls`` of this content version."""
+    return cache.get(_version(content) + (cls,), lambda: build_page(content, cls))
+
+
+def concept_section(content, cls, section, cache=PAGE_CACHE):
+    """Cached markdown of one section, rendered the first time anyone opens it."""
+    return cache.get(_version(content) + (cls, section), lambda: render_section(content, cls, section))
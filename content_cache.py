@@ -0,0 +1,337 @@
+"""
+Process-wide ontology content cache.
+
+Streamlit re-executes av_tutor_ui.py on every interaction, but imported modules
+stay in sys.modules, so state kept here survives reruns and is shared by every
+session served by the same worker process.
+
+Entries are keyed on the ontology file path plus the files it is loaded with
+(such as the question bank), and invalidated when the mtime or size of any of
+them changes. Loaded content is exposed as a frozen OntologyContent whose
+mappings are read-only, so sessions can share a single instance safely.
+
+When several courses share a process (see content_registry.py) the cache can
+be given a memory budget: entries are then kept in least-recently-used order
+and the oldest are evicted once their estimated sizes exceed the budget.
+Sessions still holding an evicted OntologyContent keep using it; it is only
+dropped from the cache.
+
+For hot reload the cache can watch its files: changed content is rebuilt on a
+background thread and swapped in whole, so no request waits for a parse and
+sessions that pinned the previous version keep a consistent view of it.
+"""
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from question_bank import QuestionBank
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OntologyContent:
+    """Immutable result of parsing an ontology file."""
+    path: str
+    key: tuple  # (mtime_ns, size) of the ontology and each dependency
+    ontology: object  # ontology.Ontology (itself immutable), or None
+    modules: MappingProxyType  # module title -> learning text, or None
+    questions: tuple  # read-only question mappings
+    bank: QuestionBank  # indexes over ``questions``
+    index: object = None  # ontology_index.OntologyIndex over ``ontology``, or None
+    question_classes: object = None  # ontology_index.QuestionClasses for ``bank``, or None
+    size: int = 0  # estimated bytes (pickled size of the sources)
+
+
+def _freeze_question(q):
+    q = dict(q)
+    q["options"] = tuple(q["options"])
+    return MappingProxyType(q)
+
+
+def estimate_size(ontology, modules, questions):
+    """Approximate memory footprint of loaded content, by its pickled size."""
+    return len(pickle.dumps((ontology, modules, questions), pickle.HIGHEST_PROTOCOL))
+
+
+def freeze_content(path, key, ontology, modules, questions, module_classes=None):
+    """Build an OntologyContent from freshly loaded, mutable parts.
+
+    ``module_classes`` maps module titles to class names for tagging the
+    questions (default: ontology.DEFAULT_MODULE_CLASSES).
+    """
+    size = estimate_size(ontology, modules, questions)
+    questions = tuple(_freeze_question(q) for q in questions)
+    bank = QuestionBank(questions)
+    index = question_classes = None
+    if ontology is not None:
+        # imported here so that importing this module stays free of the ontology stack
+        from ontology_index import OntologyIndex, QuestionClasses
+        index = OntologyIndex(ontology)
+        if module_classes is None:
+            question_classes = QuestionClasses(index, bank)
+        else:
+            question_classes = QuestionClasses(index, bank, module_classes)
+    return OntologyContent(
+        path=str(path),
+        key=key,
+        ontology=ontology,
+        modules=MappingProxyType(dict(modules)) if modules is not None else None,
+        questions=questions,
+        bank=bank,
+        index=index,
+        question_classes=question_classes,
+        size=size,
+    )
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _entry_key(name):
+    return tuple(_stat_key(p) for p in name)
+
+
+class OntologyCache:
+    """Thread-safe cache of parsed ontology content, one entry per set of source files.
+
+    With ``max_bytes`` set, least recently used entries are evicted once the
+    estimated size of all entries exceeds it; the entry just loaded is always
+    kept, even if it alone is over budget.
+
+    By default a changed file is re-parsed by the next ``get``. After
+    ``start_watching`` a background thread polls the files instead, and
+    changed content is rebuilt off the request path and swapped in as a new
+    OntologyContent once it is ready; until then ``get`` keeps returning the
+    previous version. Readers holding the old object are unaffected.
+    """
+
+    def __init__(self, max_bytes=None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (path, *depends_on) -> (key, OntologyContent, loader)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.reload_failures = 0
+        self.parse_seconds = 0.0
+        self.last_parse_seconds = 0.0
+        self._loading = {}  # entry name -> lock held while a get() loads it
+        self._rebuilding = set()  # entry names being rebuilt in the background
+        self._failed = {}  # entry name -> key whose rebuild failed, so it is not retried
+        self._watch_stop = None
+
+    @property
+    def watching(self):
+        return self._watch_stop is not None and not self._watch_stop.is_set()
+
+    def get(self, path, loader, depends_on=()):
+        """Return cached content for ``path``, calling ``loader(path)`` on a miss.
+
+        ``loader`` returns an ``(ontology, modules, questions)`` triple, or a
+        4-tuple adding the module classes to tag questions with (see
+        freeze_content); ``ontology`` and ``modules`` are None when the
+        ontology cannot be used. Failed ontology loads are cached too so a
+        broken file is not re-parsed on every rerun. Changing ``path`` or any
+        file in ``depends_on`` invalidates the entry.
+        """
+        path = str(path)
+        name = (path, *map(str, depends_on))
+        entry = self._entries.get(name)
+        if entry is not None and self.watching:
+            # the watcher notices file changes; no stat calls on the request path
+            self._touch(name)
+            return entry[1]
+        try:
+            key = _entry_key(name)
+        except OSError:
+            return None
+
+        if entry is not None and entry[0] == key:
+            self._touch(name)
+            return entry[1]
+
+        with self._lock:
+            loading = self._loading.setdefault(name, threading.Lock())
+        # Parse outside the cache lock, so hits on other entries never wait
+        # for it; the per-entry lock makes concurrent misses parse only once.
+        try:
+            with loading:
+                with self._lock:
+                    entry = self._entries.get(name)
+                    if entry is not None and entry[0] == key:
+                        # another thread loaded it while we waited
+                        self.hits += 1
+                        self._entries.move_to_end(name)
+                        return entry[1]
+                    self.misses += 1
+
+                start = time.perf_counter()
+                content = freeze_content(path, key, *loader(path))
+                elapsed = time.perf_counter() - start
+
+                with self._lock:
+                    self.parse_seconds += elapsed
+                    self.last_parse_seconds = elapsed
+                    self._entries[name] = (key, content, loader)
+                    self._entries.move_to_end(name)
+                    self._evict()
+                return content
+        finally:
+            with self._lock:
+                # threads still waiting on it find the entry when they get it;
+                # later misses make a new lock
+                if self._loading.get(name) is loading:
+                    del self._loading[name]
+
+    def peek(self, path, depends_on=()):
+        """The cached content for ``path`` if it is resident and current, else None; never loads.
+
+        Without a watcher, whether it is current is checked with ``stat``.
+        """
+        name = (str(path), *map(str, depends_on))
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        if not self.watching:
+            try:
+                if _entry_key(name) != entry[0]:
+                    return None
+            except OSError:
+                return None
+        self._touch(name)
+        return entry[1]
+
+    def _touch(self, name):
+        with self._lock:
+            self.hits += 1
+            if name in self._entries:
+                self._entries.move_to_end(name)
+
+    def start_watching(self, interval=2.0):
+        """Poll cached files every ``interval`` seconds and rebuild changed ones in the background."""
+        with self._lock:
+            if self.watching:
+                return
+            stop = self._watch_stop = threading.Event()
+        threading.Thread(target=self._watch, args=(stop, interval), name="content-watcher", daemon=True).start()
+
+    def stop_watching(self):
+        with self._lock:
+            if self._watch_stop is not None:
+                self._watch_stop.set()
+
+    def _watch(self, stop, interval):
+        while not stop.wait(interval):
+            try:
+                self._poll()
+            except Exception:
+                # keep watching: a thread that died here would stop hot reload for good
+                logger.exception("Checking cached content for changes failed")
+
+    def _poll(self):
+        with self._lock:
+            entries = list(self._entries.items())
+        for name, (key, _, loader) in entries:
+            try:
+                current = _entry_key(name)
+            except OSError:
+                continue  # e.g. mid-replace during a deploy; look again next time
+            if current != key:
+                self._schedule(name, loader, current)
+
+    def _schedule(self, name, loader, key):
+        with self._lock:
+            if name in self._rebuilding or self._failed.get(name) == key:
+                return
+            self._rebuilding.add(name)
+        threading.Thread(target=self._rebuild, args=(name, loader, key),
+                         name="content-rebuild", daemon=True).start()
+
+    def _rebuild(self, name, loader, key):
+        path = name[0]
+        try:
+            start = time.perf_counter()
+            content = freeze_content(path, key, *loader(path))
+            elapsed = time.perf_counter() - start
+        except Exception:
+            logger.exception("Rebuilding %s failed; keeping the current version", path)
+            with self._lock:
+                self.reload_failures += 1
+                self._failed[name] = key
+                self._rebuilding.discard(name)
+            return
+
+        with self._lock:
+            self._rebuilding.discard(name)
+            current = self._entries.get(name)
+            if current is None:
+                return  # evicted meanwhile; the next get loads it afresh
+            if content.ontology is None and current[1].ontology is not None:
+                # most likely a half-written file: don't trade a working ontology for the fallback
+                self.reload_failures += 1
+                self._failed[name] = key
+                logger.warning("Rebuilt %s has no usable ontology; keeping the current version", path)
+                return
+            self._entries[name] = (key, content, loader)  # the swap: one reference assignment
+            self._failed.pop(name, None)
+            self.reloads += 1
+            self.parse_seconds += elapsed
+            self.last_parse_seconds = elapsed
+            self._evict()
+        logger.info("Reloaded %s in %.1f ms", path, elapsed * 1000)
+
+    def _size(self):
+        return sum(content.size for _, content, _ in self._entries.values())
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        while len(self._entries) > 1 and self._size() > self.max_bytes:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Snapshot of the cache counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "reload_failures": self.reload_failures,
+                "entries": len(self._entries),
+                "bytes": self._size(),
+                "max_bytes": self.max_bytes,
+                "parse_seconds": self.parse_seconds,
+                "last_parse_seconds": self.last_parse_seconds,
+            }
+
+    def clear(self):
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._failed.clear()
+            self._loading.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.reloads = 0
+            self.reload_failures = 0
+            self.parse_seconds = 0.0
+            self.last_parse_seconds = 0.0
+
+
+# Shared by every session in this process. AV_TUTOR_CONTENT_BUDGET_MB caps the
+# estimated memory of all cached courses together.
+ONTOLOGY_CACHE = OntologyCache(
+    max_bytes=int(float(os.environ.get("AV_TUTOR_CONTENT_BUDGET_MB", "256")) * 2 ** 20)
+)
@@ -0,0 +1,221 @@
+"""
+Course registry: several ontology + question bank bundles in one process.
+
+A course is an ontology file, a question bank and the mapping from module
+titles to ontology classes. The built-in AV Tutor course is always available
+as "default"; more can be listed in a JSON catalog named by the
+AV_TUTOR_COURSES environment variable::
+
+    {
+      "networking": {
+        "title": "Home Network Security",
+        "ontology": "courses/networking.owl",
+        "questions": "courses/networking.jsonl",
+        "modules": {"Routers & Wi-Fi": "Router_Security", "Firewalls": "Firewall"}
+      }
+    }
+
+Relative paths are resolved against the catalog's directory. Question banks
+may be a Python file defining ``QUIZ``, a JSON list, JSON Lines (each
+question in the same shape as questions.QUIZ) or a snapshot written by
+question_import.py.
+
+Courses are loaded on first request and kept in the shared OntologyCache,
+which evicts the least recently used ones under its memory budget; a course
+that was evicted is simply loaded again the next time it is asked for.
+"""
+import json
+import logging
+import runpy
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from content_cache import ONTOLOGY_CACHE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COURSE = "default"
+
+
+@dataclass(frozen=True)
+class Course:
+    id: str
+    title: str
+    ontology: str  # OWL functional-syntax file
+    questions: str  # question bank: .py defining QUIZ, .json, .jsonl or .snapshot
+    module_classes: tuple = None  # ((module title, class name), ...); None = ontology default
+    loader: object = None  # custom cache loader (see OntologyCache.get), e.g. snapshot-aware
+
+
+def load_questions(path):
+    """Question dicts from a .py file defining QUIZ, a JSON list, JSON Lines or a snapshot."""
+    path = Path(path)
+    if path.suffix == ".py":
+        return list(runpy.run_path(str(path))["QUIZ"])
+    if path.suffix == ".snapshot":
+        from snapshot import read_snapshot
+        return read_snapshot(path).questions
+    with open(path, encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            return [json.loads(line) for line in f if line.strip()]
+        return list(json.load(f))
+
+
+def load_course(course):
+    """Cache loader result for ``course``: ``(ontology, modules, questions, module_classes)``."""
+    from ontology import (DEFAULT_MODULE_CLASSES, OntologyParseError, build_learning_modules,
+                          load_ontology)
+
+    module_classes = dict(course.module_classes) if course.module_classes else DEFAULT_MODULE_CLASSES
+    questions = load_questions(course.questions)
+    try:
+        ontology = load_ontology(course.ontology)
+    except (OSError, UnicodeDecodeError, OntologyParseError) as e:
+        logger.warning("Could not load ontology for course %s: %s", course.id, e)
+        return None, None, questions, module_classes
+    modules = build_learning_modules(ontology, module_classes)
+    if not modules:
+        logger.warning("Ontology for course %s has none of its module classes", course.id)
+        return None, None, questions, module_classes
+    return ontology, modules, questions, module_classes
+
+
+def parse_ontology(owl_path):
+    """Parse an ontology file and build learning modules from its class hierarchy.
+
+    Returns an ``(ontology, modules)`` pair, or None if the file cannot be read
+    or does not contain the classes the learning modules are built from.
+    """
+    from ontology import OntologyParseError, build_learning_modules, load_ontology
+
+    try:
+        ontology = load_ontology(owl_path)
+    except (OSError, UnicodeDecodeError, OntologyParseError) as e:
+        logger.warning("Could not load ontology %s: %s", owl_path, e)
+        return None
+
+    modules = build_learning_modules(ontology)
+    if not modules:
+        logger.warning("Ontology %s has none of the learning module classes", owl_path)
+        return None
+    return ontology, modules
+
+
+def load_default_content(owl_path):
+    """Cache loader for the built-in course: use the compiled snapshot if it matches, else parse sources."""
+    from snapshot import QUESTIONS_PATH, SNAPSHOT_PATH, load_snapshot, source_hash
+
+    snap = load_snapshot(SNAPSHOT_PATH, source_hash(owl_path, QUESTIONS_PATH))
+    if snap is not None:
+        return snap.ontology, snap.modules, snap.questions
+
+    logger.info("No up-to-date snapshot at %s; parsing sources", SNAPSHOT_PATH)
+    # run the file afresh: an imported questions module would keep serving the
+    # version from before a hot reload
+    questions = load_questions(QUESTIONS_PATH)
+    parsed = parse_ontology(owl_path)
+    if parsed is None:
+        return None, None, questions
+    return parsed[0], parsed[1], questions
+
+
+def load_catalog(path):
+    """Courses listed in a JSON catalog file, by ID."""
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    courses = {}
+    for course_id, entry in spec.items():
+        modules = entry.get("modules")
+        courses[course_id] = Course(
+            id=course_id,
+            title=entry.get("title", course_id),
+            ontology=str(path.parent / entry["ontology"]),
+            questions=str(path.parent / entry["questions"]),
+            module_classes=tuple(modules.items()) if modules else None,
+        )
+    return courses
+
+
+def build_registry(catalog_path=None, default_loader=load_default_content):
+    """Registry with the built-in course plus any courses in ``catalog_path``.
+
+    ``default_loader`` is the cache loader for the built-in course; by
+    default it reads the compiled snapshot when that is up to date.
+    """
+    from snapshot import OWL_PATH, QUESTIONS_PATH
+
+    courses = {DEFAULT_COURSE: Course(DEFAULT_COURSE, "AV Tutor", str(OWL_PATH), str(QUESTIONS_PATH),
+                                      loader=default_loader)}
+    if catalog_path:
+        for course_id, course in load_catalog(catalog_path).items():
+            if course_id == DEFAULT_COURSE:
+                logger.warning("Ignoring catalog entry %r: the built-in course cannot be replaced", course_id)
+                continue
+            courses[course_id] = course
+    return CourseRegistry(courses)
+
+
+_shared_lock = threading.Lock()
+_shared_registries = {}  # catalog path -> CourseRegistry
+_fallback_bank = None
+
+
+def shared_registry(catalog_path=None, reload_interval=0):
+    """Process-wide registry for ``catalog_path``, built on first use.
+
+    Streamlit executes the app script in a fresh module on every rerun, so
+    the registry is kept here rather than in the app's globals. With a
+    ``reload_interval`` the content cache starts polling for changed files.
+    """
+    with _shared_lock:
+        registry = _shared_registries.get(catalog_path)
+        if registry is None:
+            registry = _shared_registries[catalog_path] = build_registry(catalog_path)
+            if reload_interval > 0:
+                registry.cache.start_watching(reload_interval)
+        return registry
+
+
+def fallback_bank():
+    """QuestionBank of the built-in questions, for when no course content loads; built once per process."""
+    global _fallback_bank
+    with _shared_lock:
+        if _fallback_bank is None:
+            from question_bank import QuestionBank
+            from snapshot import QUESTIONS_PATH
+            _fallback_bank = QuestionBank(load_questions(QUESTIONS_PATH))
+        return _fallback_bank
+
+
+class CourseRegistry:
+    """Course lookup plus lazily loaded, shared content for each course."""
+
+    def __init__(self, courses, cache=ONTOLOGY_CACHE):
+        if DEFAULT_COURSE not in courses:
+            raise ValueError("a %r course is required" % DEFAULT_COURSE)
+        self.courses = dict(courses)
+        self.cache = cache
+
+    def course(self, course_id):
+        """The course with ``course_id``, or the default course if there is none."""
+        return self.courses.get(course_id) or self.courses[DEFAULT_COURSE]
+
+    def content(self, course_id):
+        """OntologyContent for a course, loading it on first use; None if its files are missing."""
+        course = self.course(course_id)
+        loader = course.loader or (lambda _path: load_course(course))
+        content = self.cache.get(course.ontology, loader, depends_on=(course.questions,))
+        if content is None:
+            logger.warning("Content files for course %s are missing", course.id)
+        return content
+
+    def cached_content(self, course_id):
+        """OntologyContent for a course if the cache holds its current version, else None; never loads."""
+        course = self.course(course_id)
+        return self.cache.peek(course.ontology, depends_on=(course.questions,))
+
+    def stats(self):
+        """Cache counters (hits, misses, evictions, bytes) plus the number of courses."""
+        return dict(self.cache.stats(), courses=len(self.courses))
@@ -0,0 +1,112 @@
+"""
+Import-time profiler.
+
+Set AV_TUTOR_PROFILE_IMPORTS=1 before ``streamlit run av_tutor_ui.py`` to log
+a per-module import cost breakdown: once at the end of the first script run,
+and again whenever later reruns import something new (for example when the
+ontology stack is first loaded by the Learning or Quiz page).
+
+Under ``streamlit run`` Streamlit itself is already imported before the app
+script starts; run ``python import_profile.py`` to profile the app's complete
+import chain, Streamlit included, in a fresh interpreter.
+"""
+import builtins
+import importlib.util
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_original_import = builtins.__import__
+_state = threading.local()
+_lock = threading.Lock()
+_records = []  # (module name, inclusive seconds, self seconds)
+_reported = 0
+
+
+def _resolve(name, globals, level):
+    if not level:
+        return name
+    try:
+        return importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+    except (ImportError, ValueError):
+        return name
+
+
+def _profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+    module = _resolve(name, globals, level)
+    if module in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    stack = getattr(_state, "stack", None)
+    if stack is None:
+        stack = _state.stack = []
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with _lock:
+            _records.append((module, elapsed, elapsed - children))
+
+
+def install():
+    """Start recording imports. Safe to call more than once."""
+    builtins.__import__ = _profiled_import
+
+
+def uninstall():
+    builtins.__import__ = _original_import
+
+
+def is_installed():
+    return builtins.__import__ is _profiled_import
+
+
+def records():
+    """All recorded imports as (module, inclusive seconds, self seconds)."""
+    with _lock:
+        return list(_records)
+
+
+def format_report(rows, limit=25):
+    """Render rows as a table sorted by self time, most expensive first."""
+    rows = sorted(rows, key=lambda r: r[2], reverse=True)
+    total = sum(r[2] for r in rows)
+    lines = ["%d modules imported, %.1f ms total" % (len(rows), total * 1000),
+             "   self ms  incl. ms  module"]
+    for module, inclusive, own in rows[:limit]:
+        lines.append("%10.2f %9.2f  %s" % (own * 1000, inclusive * 1000, module))
+    if len(rows) > limit:
+        lines.append("  ... %d more" % (len(rows) - limit))
+    return "\n".join(lines)
+
+
+def log_report(limit=25):
+    """Log imports recorded since the previous report, if there were any."""
+    global _reported
+    with _lock:
+        rows = _records[_reported:]
+        _reported = len(_records)
+    if rows:
+        logger.warning("Import profile:\n%s", format_report(rows, limit))
+
+
+def main():
+    install()
+    start = time.perf_counter()
+    for name in ("streamlit", "content_cache", "ontology", "snapshot", "questions"):
+        __import__(name)
+    uninstall()
+    print(format_report(records(), limit=40))
+    print("wall %.1f ms" % ((time.perf_counter() - start) * 1000))
+
+
+if __name__ == "__main__":
+    main()
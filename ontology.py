@@ -0,0 +1,289 @@
+"""
+Streaming loader for OWL functional-syntax ontologies.
+
+av_tutor.owl is written in OWL functional syntax (Prefix(...), Declaration(...),
+SubClassOf(...)). This module reads such a file in a single pass without
+rdflib and keeps only what the tutor needs: declared classes, their
+SubClassOf parents, existential relations between classes
+(``SubClassOf(:A ObjectSomeValuesFrom(:prop :B))``) and rdfs:label /
+rdfs:comment annotations.
+
+Learning modules are then derived from the class hierarchy, so editing the
+ontology changes what the Learning page shows.
+"""
+import re
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+# One token per match: an IRI, a quoted literal (with optional language tag or
+# datatype), a parenthesis, a comment running to end of line, or a bare word.
+# A literal still open at the end of the text is one token too; it continues
+# on the next line, since literals (e.g. multi-line rdfs:comment annotations)
+# may contain newlines.
+_LITERAL = r'"(?:[^"\\]|\\[\s\S])*"(?:@[A-Za-z-]+|\^\^\S+?(?=[\s()]))?'
+_LITERAL_RE = re.compile(_LITERAL)
+_TOKEN_RE = re.compile(
+    r'<[^>]*>'
+    r'|' + _LITERAL +
+    r'|"(?:[^"\\]|\\[\s\S])*\\?\Z'
+    r'|[()]'
+    r'|#[^\n]*'
+    r'|[^\s()"<>#]+'
+)
+
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+
+# Learning module title -> ontology class whose subtree the module teaches.
+# Titles match the "module" tag used by the quiz bank.
+DEFAULT_MODULE_CLASSES = {
+    "What is a Virus?": "Threats",
+    "How Viruses Spread": "Infection_Vectors",
+    "Using Antivirus Software": "Response_Actions",
+    "Maintenance & Updates": "Prevention",
+}
+
+
+class OntologyParseError(ValueError):
+    """Raised when an ontology file is not valid functional syntax."""
+
+
+@dataclass(frozen=True)
+class Ontology:
+    """Read-only class hierarchy extracted from an ontology file."""
+    iri: str
+    prefixes: MappingProxyType  # prefix name -> namespace IRI
+    classes: tuple  # class IRIs in declaration order
+    parents: MappingProxyType  # class IRI -> tuple of direct superclass IRIs
+    children: MappingProxyType  # class IRI -> tuple of direct subclass IRIs
+    labels: MappingProxyType  # class IRI -> rdfs:label
+    comments: MappingProxyType  # class IRI -> rdfs:comment
+    # class IRI -> ((property IRI, class IRI), ...) from SubClassOf(C ObjectSomeValuesFrom(p D))
+    relations: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    def find(self, name):
+        """Return the IRI of the class whose IRI or local name is ``name``."""
+        if name in self.parents:
+            return name
+        for iri in self.classes:
+            if local_name(iri) == name:
+                return iri
+        return None
+
+    def label(self, iri):
+        return self.labels.get(iri) or local_name(iri).replace("_", " ")
+
+    def roots(self):
+        return tuple(c for c in self.classes if not self.parents[c])
+
+    def __reduce__(self):
+        # MappingProxyType cannot be pickled; rebuild from plain dicts instead.
+        return (_rebuild_ontology, (
+            self.iri, dict(self.prefixes), self.classes, dict(self.parents),
+            dict(self.children), dict(self.labels), dict(self.comments), dict(self.relations),
+        ))
+
+
+def _rebuild_ontology(iri, prefixes, classes, parents, children, labels, comments, relations=None):
+    return Ontology(
+        iri=iri,
+        prefixes=MappingProxyType(prefixes),
+        classes=classes,
+        parents=MappingProxyType(parents),
+        children=MappingProxyType(children),
+        labels=MappingProxyType(labels),
+        comments=MappingProxyType(comments),
+        relations=MappingProxyType(relations or {}),
+    )
+
+
+def local_name(iri):
+    """Fragment or last path segment of an IRI."""
+    for sep in ("#", "/"):
+        if sep in iri:
+            return iri.rsplit(sep, 1)[1]
+    return iri
+
+
+def _tokens(lines):
+    pending, start = "", 0  # an open literal, and the line it started on
+    for lineno, line in enumerate(lines, 1):
+        if pending:
+            line = pending + line
+        else:
+            start = lineno
+        pending = ""
+        toks = _TOKEN_RE.findall(line)
+        if toks and toks[-1][:1] == '"' and not _LITERAL_RE.fullmatch(toks[-1]):
+            pending = toks.pop()
+            if not pending.endswith("\n"):
+                pending += "\n"
+        for tok in toks:
+            if not tok.startswith("#"):
+                yield tok
+    if pending:
+        raise OntologyParseError("unterminated string literal starting on line %d" % start)
+
+
+def _literal_text(tok):
+    """Strip quotes, language tag and datatype from a literal token."""
+    if not tok.startswith('"'):
+        return tok
+    body = tok[1:tok.rindex('"')]
+    return body.replace('\\"', '"').replace("\\\\", "\\")
+
+
+def parse_functional_syntax(lines):
+    """Parse OWL functional syntax from an iterable of text lines.
+
+    Axioms are assembled one at a time from a token stream and discarded once
+    handled, so memory use is proportional to the number of classes rather
+    than to the size of the file.
+    """
+    prefixes = {}
+    ontology_iri = ""
+    classes = {}  # dict as an ordered set
+    parents = {}
+    labels = {}
+    comments = {}
+    relations = {}
+
+    def expand(term):
+        if term.startswith("<") and term.endswith(">"):
+            return term[1:-1]
+        prefix, sep, name = term.partition(":")
+        if sep and prefix in prefixes:
+            return prefixes[prefix] + name
+        return term
+
+    def declare(iri):
+        if iri not in classes:
+            classes[iri] = None
+            parents[iri] = []
+
+    def handle(expr):
+        head, args = expr[0], expr[1:]
+        if head == "Prefix" and len(args) == 2:
+            prefixes[args[0].rstrip("=").rstrip(":")] = args[1][1:-1]
+        elif head == "Declaration" and args and isinstance(args[0], list):
+            kind = args[0]
+            if kind[0] == "Class" and len(kind) == 2:
+                declare(expand(kind[1]))
+        elif head == "SubClassOf" and len(args) == 2:
+            sub, sup = args
+            if isinstance(sub, str) and isinstance(sup, str):
+                sub, sup = expand(sub), expand(sup)
+                declare(sub)
+                declare(sup)
+                if sup not in parents[sub]:
+                    parents[sub].append(sup)
+            elif (isinstance(sub, str) and isinstance(sup, list) and len(sup) == 3
+                  and sup[0] == "ObjectSomeValuesFrom" and all(isinstance(a, str) for a in sup[1:])):
+                sub, prop, target = expand(sub), expand(sup[1]), expand(sup[2])
+                declare(sub)
+                declare(target)
+                relation = (prop, target)
+                if relation not in relations.setdefault(sub, []):
+                    relations[sub].append(relation)
+            # Other anonymous class expressions are skipped.
+        elif head == "AnnotationAssertion" and len(args) >= 3:
+            prop, subject, value = args[-3:]
+            if not all(isinstance(a, str) for a in (prop, subject, value)):
+                return
+            prop = expand(prop)
+            if prop == RDFS + "label":
+                labels[expand(subject)] = _literal_text(value)
+            elif prop == RDFS + "comment":
+                comments[expand(subject)] = _literal_text(value)
+
+    # Each stack frame is an expression still being read; a bare word becomes
+    # the head of the frame opened by the '(' that follows it. Expressions
+    # directly inside Ontology(...) are handled and dropped as soon as they
+    # close, so the stack never grows past the deepest single axiom.
+    stack = []
+    last_top = None
+    for tok in _tokens(lines):
+        if tok == "(":
+            head = stack[-1].pop() if stack and len(stack[-1]) > 1 else last_top
+            if not _is_keyword(head):
+                raise OntologyParseError("'(' without a preceding keyword")
+            last_top = None
+            stack.append([head])
+        elif tok == ")":
+            if not stack:
+                raise OntologyParseError("unbalanced ')'")
+            expr = stack.pop()
+            if expr[0] == "Ontology":
+                if len(expr) > 1 and expr[1].startswith("<"):
+                    ontology_iri = expr[1][1:-1]
+            elif not stack or stack[-1][0] == "Ontology":
+                handle(expr)
+            else:
+                stack[-1].append(expr)
+        elif stack:
+            stack[-1].append(tok)
+        else:
+            last_top = tok
+    if stack:
+        raise OntologyParseError("unexpected end of file inside %s(...)" % stack[-1][0])
+
+    children = {iri: [] for iri in classes}
+    for iri in classes:
+        for sup in parents[iri]:
+            children[sup].append(iri)
+
+    return Ontology(
+        iri=ontology_iri,
+        prefixes=MappingProxyType(prefixes),
+        classes=tuple(classes),
+        parents=MappingProxyType({k: tuple(v) for k, v in parents.items()}),
+        children=MappingProxyType({k: tuple(v) for k, v in children.items()}),
+        labels=MappingProxyType(labels),
+        comments=MappingProxyType(comments),
+        relations=MappingProxyType({k: tuple(v) for k, v in relations.items()}),
+    )
+
+
+def _is_keyword(tok):
+    return isinstance(tok, str) and tok[:1].isalpha() and ":" not in tok
+
+
+def load_ontology(path):
+    """Read an OWL functional-syntax file from disk."""
+    with open(path, encoding="utf-8") as f:
+        return parse_functional_syntax(f)
+
+
+def _join_labels(labels):
+    if len(labels) <= 1:
+        return "".join(labels)
+    return ", ".join(labels[:-1]) + " and " + labels[-1]
+
+
+def describe_class(ontology, iri):
+    """Short learning text for a class, built from its place in the hierarchy."""
+    label = ontology.label(iri)
+    parts = []
+    comment = ontology.comments.get(iri)
+    if comment:
+        parts.append(comment)
+    parent_labels = [ontology.label(p) for p in ontology.parents.get(iri, ())]
+    if parent_labels:
+        parts.append(f"{label} is part of {_join_labels(parent_labels)}.")
+    sub_labels = sorted(ontology.label(c) for c in ontology.children.get(iri, ()))
+    if sub_labels:
+        parts.append(f"It covers: {_join_labels(sub_labels)}.")
+    return " ".join(parts)
+
+
+def build_learning_modules(ontology, module_classes=DEFAULT_MODULE_CLASSES):
+    """Map learning module titles to text generated from the class hierarchy.
+
+    Modules whose class is missing from the ontology are left out, so callers
+    can detect an incomplete ontology by comparing keys.
+    """
+    modules = {}
+    for title, class_name in module_classes.items():
+        iri = ontology.find(class_name)
+        if iri is not None:
+            modules[title] = describe_class(ontology, iri)
+    return modules
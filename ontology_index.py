@@ -0,0 +1,249 @@
+"""
+Precomputed subsumption index over an ontology's class hierarchy.
+
+Built once per content version so queries never walk SubClassOf edges again.
+Classes are numbered in depth-first pre-order over a spanning tree of the
+hierarchy (each class hangs under its first declared parent). Every class
+then owns the interval ``[id, end[id])`` of its tree descendants, which gives:
+
+- subsumption (``is_a``): two comparisons, O(1)
+- descendants: a contiguous ID range, O(1) to produce
+- ancestors: the parent chain, O(depth)
+- lowest common ancestor: binary lifting, O(log depth)
+
+OWL allows several parents per class. Ancestors reached only through a
+non-tree parent are kept in a small side table per affected class (and the
+inverse for descendants), so the answers stay exact for any DAG; for a pure
+tree, like av_tutor.owl, the side tables are empty.
+
+QuestionClasses tags every question in a bank with the class IDs it tests
+and answers "which questions fall under this class" with a binary search
+over questions sorted by class ID.
+"""
+from array import array
+from bisect import bisect_left
+
+from ontology import DEFAULT_MODULE_CLASSES, local_name
+
+
+class OntologyIndex:
+    """Interval-labelled class hierarchy; classes are addressed by integer ID."""
+
+    def __init__(self, ontology):
+        self.ontology = ontology
+        declared = {c: n for n, c in enumerate(ontology.classes)}
+        tree_children = {c: [] for c in ontology.classes}
+        tree_parent = {}
+        for c in ontology.classes:
+            ps = [p for p in ontology.parents[c] if p in declared]
+            if ps:
+                tree_parent[c] = ps[0]
+                tree_children[ps[0]].append(c)
+
+        # Pre-order numbering from the roots. Classes on a SubClassOf cycle have
+        # no root above them; the first one met is numbered as a root.
+        order, parent, depth, end = [], array("i"), array("I"), array("I")
+        ids = {}
+        roots = [c for c in ontology.classes if c not in tree_parent]
+        for start in roots + list(ontology.classes):
+            if start in ids:
+                continue
+            stack = [(start, -1, 0)]
+            while stack:
+                c, p, d = stack.pop()
+                if c in ids:
+                    continue
+                i = ids[c] = len(order)
+                order.append(c)
+                parent.append(p)
+                depth.append(d)
+                end.append(0)
+                for child in reversed(tree_children[c]):
+                    if child not in ids:
+                        stack.append((child, i, d + 1))
+        # end[i] = one past the last ID in i's subtree, filled bottom-up.
+        for i in range(len(order) - 1, -1, -1):
+            end[i] = max(end[i], i + 1)
+            if parent[i] >= 0:
+                end[parent[i]] = max(end[parent[i]], end[i])
+
+        self.classes = tuple(order)
+        self.id = ids
+        self.parent = parent
+        self.depth = depth
+        self.end = end
+        self._by_name = {local_name(c): i for c, i in ids.items()}
+
+        # Ancestors reachable only through non-tree parents, propagated in
+        # topological order so every parent's side table is complete first.
+        # Classes on or below a SubClassOf cycle have no such order and are
+        # swept until nothing changes.
+        extra = {}
+        ordered, cyclic = self._topological(ontology, ids)
+        for i in ordered:
+            self._propagate(i, extra)
+        changed = bool(cyclic)
+        while changed:
+            changed = False
+            for i in cyclic:
+                changed |= self._propagate(i, extra)
+        self._extra = extra
+        extra_desc = {}
+        for i, anc in extra.items():
+            for a in anc:
+                extra_desc.setdefault(a, []).append(i)
+        self._extra_desc = {a: tuple(sorted(d)) for a, d in extra_desc.items()}
+
+        # Binary lifting: up[k][i] is i's 2**k-th tree ancestor (-1 past a root).
+        self._up = [parent]
+        for _ in range(max(depth, default=0).bit_length() - 1):
+            prev = self._up[-1]
+            self._up.append(array("i", (prev[p] if p >= 0 else -1 for p in prev)))
+
+    def _propagate(self, i, extra):
+        """Recompute ``extra[i]`` from i's parents; True if it changed."""
+        parent = self.parent[i]
+        more = set(extra.get(parent, ())) if parent >= 0 else set()
+        for p in self.ontology.parents[self.classes[i]]:
+            j = self.id.get(p)
+            if j is None or j == parent:
+                continue
+            more.update(self._tree_ancestors(j))
+            more.update(extra.get(j, ()))
+        more.difference_update(self._tree_ancestors(i))
+        if more == extra.get(i, set()):
+            return False
+        extra[i] = frozenset(more)
+        return True
+
+    @staticmethod
+    def _topological(ontology, ids):
+        """``(ordered, rest)``: class IDs with every class after all its parents
+        (Kahn's algorithm), and the IDs on or below a cycle that never became ready.
+        """
+        waiting = {}
+        children = {}
+        for c, i in ids.items():
+            ps = {ids[p] for p in ontology.parents[c] if p in ids}
+            waiting[i] = len(ps)
+            for p in ps:
+                children.setdefault(p, []).append(i)
+        ready = [i for i, n in waiting.items() if n == 0]
+        out = []
+        while ready:
+            i = ready.pop()
+            out.append(i)
+            for ch in children.get(i, ()):
+                waiting[ch] -= 1
+                if waiting[ch] == 0:
+                    ready.append(ch)
+        done = set(out)
+        return out, [i for i in range(len(ids)) if i not in done]
+
+    def __len__(self):
+        return len(self.classes)
+
+    def find(self, name):
+        """ID of the class whose IRI or local name is ``name``, or None."""
+        i = self.id.get(name)
+        return self._by_name.get(name) if i is None else i
+
+    def iri(self, i):
+        return self.classes[i]
+
+    def _tree_ancestors(self, i):
+        out = []
+        while i >= 0:
+            out.append(i)
+            i = self.parent[i]
+        return out
+
+    def is_a(self, i, j):
+        """True if class ``i`` is ``j`` or one of its subclasses."""
+        return j <= i < self.end[j] or j in self._extra.get(i, ())
+
+    def ancestors(self, i):
+        """IDs of ``i`` and all its superclasses, nearest tree ancestors first."""
+        out = self._tree_ancestors(i)
+        extra = self._extra.get(i)
+        if extra:
+            out.extend(sorted(extra))
+        return tuple(out)
+
+    def descendants(self, j):
+        """IDs of ``j`` and all its subclasses, in ID order."""
+        extra = self._extra_desc.get(j)
+        if not extra:
+            return range(j, self.end[j])
+        return tuple(sorted(set(range(j, self.end[j])).union(extra)))
+
+    def lca(self, a, b):
+        """The lowest class subsuming both ``a`` and ``b``, or None if they share no ancestor.
+
+        Within the spanning tree this is exact and O(log depth). When a
+        non-tree parent is involved the deepest common ancestor is returned
+        (several may be equally deep in a DAG; the lowest ID wins).
+        """
+        if a in self._extra or b in self._extra:
+            common = set(self.ancestors(a)).intersection(self.ancestors(b))
+            if not common:
+                return None
+            return min(common, key=lambda c: (-self.depth[c], c))
+        if self.is_a(b, a):
+            return a
+        if self.is_a(a, b):
+            return b
+        for up in reversed(self._up):
+            p = up[a]
+            if p >= 0 and not self.is_a(b, p):
+                a = p
+        p = self.parent[a]
+        return p if p >= 0 else None
+
+
+class QuestionClasses:
+    """Class IDs per question, and the questions under any class.
+
+    A question's classes are its "concepts" (see questions.py) that lie under
+    its module's class, or just the module's class when it names none.
+    Questions whose module has no class in the ontology get no classes.
+    """
+
+    def __init__(self, index, bank, module_classes=DEFAULT_MODULE_CLASSES):
+        self.index = index
+        self.module_class = {}  # module title -> class ID
+        for title, name in module_classes.items():
+            i = index.find(name)
+            if i is not None:
+                self.module_class[title] = i
+        tags = []
+        for q in bank.questions:
+            module_class = self.module_class.get(q.get("module", "General"))
+            if module_class is None:
+                tags.append(())
+                continue
+            concepts = [c for c in map(index.find, q.get("concepts", ()))
+                        if c is not None and index.is_a(c, module_class)]
+            tags.append(tuple(dict.fromkeys(concepts)) or (module_class,))
+        self.classes = tuple(tags)
+        # (class ID, question ID) pairs sorted by class, so the questions under
+        # a class's ID interval are one contiguous run.
+        pairs = sorted((c, qid) for qid, cs in enumerate(tags) for c in cs)
+        self._keys = array("I", (c for c, _ in pairs))
+        self._qids = array("I", (qid for _, qid in pairs))
+
+    def __getitem__(self, qid):
+        return self.classes[qid]
+
+    def _run(self, lo, hi):
+        return self._qids[bisect_left(self._keys, lo):bisect_left(self._keys, hi)]
+
+    def questions_under(self, cls):
+        """IDs of questions tagged with ``cls`` or any of its subclasses."""
+        index = self.index
+        found = self._run(cls, index.end[cls])
+        extra = index._extra_desc.get(cls)
+        if extra:
+            for d in extra:
+                found.extend(self._run(d, d + 1))
+        return sorted(set(found))
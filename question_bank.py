@@ -0,0 +1,110 @@
+"""
+Indexed, read-only question bank.
+
+A QuestionBank is built once per content version and shared by every session.
+Questions are addressed by integer ID (their position in the bank). Per-module,
+per-tag and per-difficulty indexes are compact ``array('I')`` ID lists, so
+counting is O(1) and sampling k questions from a module is O(k) regardless of
+how large the bank is.
+
+Because IDs are positions, they only mean something for one version of the
+bank; ``version`` identifies it, and is stored with attempts and reviews.
+"""
+import hashlib
+import random
+from array import array
+
+
+def _index(pairs):
+    index = {}
+    for key, qid in pairs:
+        ids = index.get(key)
+        if ids is None:
+            ids = index[key] = array("I")
+        ids.append(qid)
+    return index
+
+
+def floyd_sample(n, k, rng):
+    """Pick k distinct integers from range(n) in random order, in O(k).
+
+    Robert Floyd's algorithm: unlike ``rng.sample(range(n), k)`` it never
+    builds an O(n) pool, whatever the ratio of k to n.
+    """
+    chosen = set()
+    for j in range(n - k, n):
+        t = rng.randrange(j + 1)
+        chosen.add(j if t in chosen else t)
+    picked = list(chosen)
+    rng.shuffle(picked)
+    return picked
+
+
+class QuestionBank:
+    """Questions plus per-module, per-tag and per-difficulty ID indexes."""
+
+    def __init__(self, questions):
+        self.questions = tuple(questions)
+        self._by_module = _index((q.get("module", "General"), i) for i, q in enumerate(self.questions))
+        self._by_tag = _index((tag, i) for i, q in enumerate(self.questions) for tag in q.get("tags", ()))
+        self._by_difficulty = _index(
+            (q["difficulty"], i) for i, q in enumerate(self.questions) if q.get("difficulty") is not None
+        )
+        self._counts = {m: len(ids) for m, ids in self._by_module.items()}
+        self._version = None
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __getitem__(self, qid):
+        return self.questions[qid]
+
+    @property
+    def version(self):
+        """Hash of what each question ID means: module, text, options and answer, in bank order.
+
+        Explanations and tags are left out, so editing them keeps stored
+        records valid. Computed on first use.
+        """
+        if self._version is None:
+            # ASCII unit/record separators do not appear in question text
+            text = "\x1e".join("%s\x1f%s\x1f%s\x1f%d" % (
+                q.get("module", "General"), q["question"], "\x1f".join(q["options"]), q["correct"])
+                for q in self.questions)
+            self._version = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+        return self._version
+
+    def modules(self):
+        """Module names in the order they first appear in the bank."""
+        return tuple(self._by_module)
+
+    def count(self, module):
+        return self._counts.get(module, 0)
+
+    def ids(self, module):
+        """IDs of all questions in ``module``, in bank order."""
+        return self._by_module.get(module, array("I"))
+
+    def ids_for_tag(self, tag):
+        return self._by_tag.get(tag, array("I"))
+
+    def ids_for_difficulty(self, difficulty):
+        return self._by_difficulty.get(difficulty, array("I"))
+
+    def sample(self, module, k, rng=random):
+        """Up to k random question IDs from ``module``.
+
+        If the module has k questions or fewer, all of them are returned in
+        bank order.
+        """
+        ids = self.ids(module)
+        if len(ids) <= k:
+            return list(ids)
+        return [ids[i] for i in floyd_sample(len(ids), k, rng)]
+
+    def sample_per_module(self, modules, k, rng=random):
+        """Up to k question IDs from each module, grouped in ``modules`` order."""
+        selected = []
+        for m in modules:
+            selected.extend(self.sample(m, k, rng))
+        return selected
@@ -0,0 +1,301 @@
+"""
+Streaming importer for external question banks.
+
+Reads JSON Lines or CSV one record at a time, validates each record against
+the question schema used by questions.QUIZ, drops duplicates and writes the
+accepted questions straight into a compiled snapshot (see snapshot.py)
+through SnapshotWriter, which flushes them in fixed-size batches. Nothing is
+held per question except an 8-byte content hash for deduplication, so memory
+stays flat however many rows the input has.
+
+CSV files need a header row with ``module``, ``question``, ``options``,
+``correct`` and optionally ``explanation`` and ``concepts``. ``options`` and
+``concepts`` are either a JSON list or ``|``-separated values; ``correct`` is
+the index of the right option.
+
+Rows that cannot be decoded or parsed, or that fail validation, are written
+to a reject file (JSON Lines with the row number, the reason and the raw row)
+and the import carries on.
+
+    python question_import.py bank.jsonl -o bank.snapshot [--rejects rejects.jsonl]
+
+The resulting snapshot can be used as a course's question bank (see
+content_registry.py).
+"""
+import argparse
+import codecs
+import csv
+import hashlib
+import json
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+from quiz_state import MAX_OPTIONS
+
+REQUIRED_FIELDS = ("module", "question", "options", "correct")
+
+
+class InvalidQuestion(ValueError):
+    """Raised for a record that does not match the question schema."""
+
+
+def _list_field(value, name):
+    if isinstance(value, list):
+        items = value
+    elif isinstance(value, str):
+        text = value.strip()
+        if text.startswith("["):
+            try:
+                items = json.loads(text)
+            except ValueError:
+                raise InvalidQuestion("%s is not a valid JSON list" % name) from None
+        else:
+            items = [v.strip() for v in text.split("|")] if text else []
+    else:
+        raise InvalidQuestion("%s must be a list" % name)
+    if not isinstance(items, list) or not all(isinstance(v, str) and v.strip() for v in items):
+        raise InvalidQuestion("%s must be a list of non-empty strings" % name)
+    return [v.strip() for v in items]
+
+
+def validate(record):
+    """A clean question dict from a raw record; raises InvalidQuestion."""
+    if not isinstance(record, dict):
+        raise InvalidQuestion("record is not an object")
+    missing = [f for f in REQUIRED_FIELDS if record.get(f) in (None, "")]
+    if missing:
+        raise InvalidQuestion("missing " + ", ".join(missing))
+    module, question = record["module"], record["question"]
+    if not isinstance(module, str) or not module.strip():
+        raise InvalidQuestion("module must be a non-empty string")
+    if not isinstance(question, str) or not question.strip():
+        raise InvalidQuestion("question must be a non-empty string")
+    options = _list_field(record["options"], "options")
+    if not 2 <= len(options) <= MAX_OPTIONS:
+        raise InvalidQuestion("need 2 to %d options, got %d" % (MAX_OPTIONS, len(options)))
+    if len(set(options)) != len(options):
+        raise InvalidQuestion("options must be distinct")
+    correct = record["correct"]
+    if isinstance(correct, str) and correct.strip().lstrip("-").isdigit():
+        correct = int(correct)
+    if isinstance(correct, bool) or not isinstance(correct, int) or not 0 <= correct < len(options):
+        raise InvalidQuestion("correct must be an option index from 0 to %d" % (len(options) - 1))
+    explanation = record.get("explanation") or ""
+    if not isinstance(explanation, str):
+        raise InvalidQuestion("explanation must be a string")
+
+    q = {
+        "module": module.strip(),
+        "question": question.strip(),
+        "options": options,
+        "correct": correct,
+        "explanation": explanation.strip(),
+    }
+    if record.get("concepts") not in (None, ""):
+        q["concepts"] = _list_field(record["concepts"], "concepts")
+    return q
+
+
+def content_hash(q):
+    """64-bit hash of what makes two questions the same: module, text and answers.
+
+    Option order and explanation are ignored, so a re-shuffled copy of a
+    question counts as a duplicate.
+    """
+    key = json.dumps([q["module"], " ".join(q["question"].casefold().split()),
+                      sorted(q["options"]), q["options"][q["correct"]]], ensure_ascii=False)
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashSet64:
+    """Set of 64-bit integers in one open-addressing ``array('Q')``.
+
+    About 16 bytes per member at most, against roughly 60 for a Python set of
+    ints, which matters when deduplicating millions of rows.
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self._slots = array("Q", bytes(8 * capacity))
+        self._mask = capacity - 1
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, h):
+        """Add ``h``; False if it was already present."""
+        h = h or 1  # 0 marks an empty slot
+        slots, mask = self._slots, self._mask
+        i = h & mask
+        while True:
+            v = slots[i]
+            if v == h:
+                return False
+            if v == 0:
+                break
+            i = (i + 1) & mask
+        slots[i] = h
+        self._len += 1
+        if self._len * 2 > len(slots):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        self._len = 0
+        for h in old:
+            if h:
+                self.add(h)
+
+
+def _clean(value):
+    """``value`` with undecodable bytes (kept as surrogate escapes) replaced by U+FFFD."""
+    if isinstance(value, str):
+        return value.encode("utf-8", "surrogateescape").decode("utf-8", "replace")
+    if isinstance(value, list):
+        return [_clean(v) for v in value]
+    if isinstance(value, dict):
+        return {_clean(k): _clean(v) for k, v in value.items()}
+    return value
+
+
+def _csv_records(f):
+    # A CSV record may span lines, so lines are decoded leniently and the
+    # record is checked for undecodable bytes once the reader has built it.
+    read = 0
+
+    def lines():
+        nonlocal read
+        for line in f:
+            read += 1
+            yield line.decode("utf-8", "surrogateescape").removeprefix("\ufeff" if read == 1 else "")
+
+    reader = csv.DictReader(lines())
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield read, None, None, "not valid CSV: %s" % e
+            continue
+        clean = _clean(row)
+        if clean != row:
+            yield reader.line_num, clean, None, "not valid UTF-8"
+        else:
+            yield reader.line_num, row, row, None
+
+
+def read_records(path, fmt=None):
+    """Iterate ``(row number, raw row, record, error)``.
+
+    The file is read as bytes and every row decoded and parsed on its own, so
+    a row that is not UTF-8, JSON or CSV comes back with ``record`` None and
+    the reason in ``error`` instead of ending the import.
+    """
+    path = Path(path)
+    fmt = fmt or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+    with open(path, "rb") as f:
+        if fmt == "csv":
+            yield from _csv_records(f)
+            return
+        for n, line in enumerate(f, 1):
+            if n == 1:
+                line = line.removeprefix(codecs.BOM_UTF8)
+            if not line.strip():
+                continue
+            try:
+                text = line.decode("utf-8")
+            except UnicodeDecodeError:
+                yield n, line.decode("utf-8", "replace").rstrip("\r\n"), None, "not valid UTF-8"
+                continue
+            try:
+                yield n, text.rstrip("\r\n"), json.loads(text), None
+            except ValueError:
+                yield n, text.rstrip("\r\n"), None, "not valid JSON"
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return ("%d rows in %.2f s (%.0f rows/s): %d imported, %d duplicates, %d rejected" % (
+            self.rows, self.seconds, self.rows_per_second, self.imported, self.duplicates, self.rejected))
+
+
+def import_questions(source, out_path, rejects_path=None, owl_path=None, fmt=None):
+    """Stream ``source`` into a snapshot at ``out_path``; returns an ImportReport.
+
+    The snapshot's content frame holds the ontology at ``owl_path`` (default:
+    the built-in one) and its learning modules; its source hash covers the
+    ontology and the input file.
+    """
+    from ontology import build_learning_modules, load_ontology
+    from snapshot import OWL_PATH, SnapshotWriter, source_hash
+
+    owl_path = owl_path or OWL_PATH
+    ontology = load_ontology(owl_path)
+    modules = build_learning_modules(ontology) or None
+    report = ImportReport()
+    seen = HashSet64()
+    rejects = open(rejects_path, "w", encoding="utf-8") if rejects_path else None
+    start = time.perf_counter()
+    try:
+        with SnapshotWriter(out_path, source_hash(owl_path, source), ontology, modules) as writer:
+            for n, raw, record, error in read_records(source, fmt):
+                report.rows += 1
+                try:
+                    if error is not None:
+                        raise InvalidQuestion(error)
+                    q = validate(record)
+                except InvalidQuestion as e:
+                    report.rejected += 1
+                    if rejects is not None:
+                        rejects.write(json.dumps({"row": n, "error": str(e), "raw": raw}, ensure_ascii=False))
+                        rejects.write("\n")
+                    continue
+                if not seen.add(content_hash(q)):
+                    report.duplicates += 1
+                    continue
+                writer.add_question(q)
+                report.imported += 1
+    finally:
+        if rejects is not None:
+            rejects.close()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a JSONL/CSV question bank into a snapshot.")
+    parser.add_argument("source", help="JSON Lines or CSV question file")
+    parser.add_argument("-o", "--output", default=None, help="snapshot to write (default: <source>.snapshot)")
+    parser.add_argument("--rejects", default=None, help="JSON Lines file for rows that fail validation")
+    parser.add_argument("--ontology", default=None, help="ontology to store with the bank (default: av_tutor.owl)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default=None,
+                        help="input format (default: from the file extension)")
+    args = parser.parse_args(argv)
+
+    output = args.output or str(Path(args.source).with_suffix(".snapshot"))
+    report = import_questions(args.source, output, args.rejects, args.ontology, args.format)
+    print("%s -> %s" % (args.source, output))
+    print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Question bank for the AV Tutor quick quiz.
+
+Kept separate from the Streamlit app so tooling (snapshot builds, importers)
+can read it without importing Streamlit.
+"""
+
+# Quiz: list of questions with options, index of correct option, explanation, and module tag.
+# Optional "concepts" name the ontology classes (local names in av_tutor.owl) a question
+# tests; questions without it are tagged with their module's class.
+# There are 20 questions total — 5 from each learning module.
+QUIZ = [
+    # Module: What is a Virus?
+    {
+        "module": "What is a Virus?",
+        "question": "What is the defining capability of a computer virus?",
+        "options": ["It provides useful features", "It replicates and spreads", "It speeds up the system"],
+        "correct": 1,
+        "explanation": "A virus can replicate itself and spread to other files or systems.",
+        "concepts": ["Virus"],
+    },
+    {
+        "module": "What is a Virus?",
+        "question": "Which term best describes software that disguises itself as legitimate?",
+        "options": ["Adware", "Trojan", "Firewall"],
+        "correct": 1,
+        "explanation": "A Trojan disguises itself as legitimate software to trick users into running it.",
+        "concepts": ["Malware"],
+    },
+    {
+        "module": "What is a Virus?",
+        "question": "Which of these is NOT a typical symptom of virus infection?",
+        "options": ["Unexpected crashes", "Slower performance", "Improved battery life"],
+        "correct": 2,
+        "explanation": "Improved battery life is not a symptom of malware; the others commonly occur.",
+    },
+    {
+        "module": "What is a Virus?",
+        "question": "What does 'payload' refer to in malware context?",
+        "options": ["Update mechanism", "Harmful action carried out", "User interface"],
+        "correct": 1,
+        "explanation": "The payload is the harmful action the malware performs (e.g., data theft).",
+        "concepts": ["Malware"],
+    },
+    {
+        "module": "What is a Virus?",
+        "question": "Which practice helps prevent virus infections?",
+        "options": ["Running unknown executables", "Keeping software updated", "Disabling antivirus"],
+        "correct": 1,
+        "explanation": "Keeping software updated helps close vulnerabilities that viruses exploit.",
+    },
+
+    # Module: How Viruses Spread
+    {
+        "module": "How Viruses Spread",
+        "question": "Which is a common vector for viruses to spread?",
+        "options": ["Email attachments", "Clear desktop wallpaper", "Regular backups"],
+        "correct": 0,
+        "explanation": "Email attachments are a common vector for malware delivery.",
+        "concepts": ["Malicious_Email"],
+    },
+    {
+        "module": "How Viruses Spread",
+        "question": "Public Wi‑Fi can be risky because attackers may:",
+        "options": ["Encrypt your files automatically", "Intercept unencrypted traffic", "Improve connection speed"],
+        "correct": 1,
+        "explanation": "Attackers on the same network can intercept unencrypted traffic and exploit vulnerabilities.",
+    },
+    {
+        "module": "How Viruses Spread",
+        "question": "Removable drives (USB sticks) can spread infections when:",
+        "options": ["They are scanned by antivirus", "They carry autorun-infected files", "They are formatted regularly"],
+        "correct": 1,
+        "explanation": "Autorun or infected files on removable media can spread malware between machines.",
+        "concepts": ["Infected_USB"],
+    },
+    {
+        "module": "How Viruses Spread",
+        "question": "Social engineering attacks rely mainly on:",
+        "options": ["Technical exploits", "Tricking users", "Hardware failure"],
+        "correct": 1,
+        "explanation": "Social engineering tricks users into performing unsafe actions like opening attachments.",
+    },
+    {
+        "module": "How Viruses Spread",
+        "question": "Downloading software from untrusted sites increases risk because:",
+        "options": ["Files may be tampered with", "Downloads are always faster", "It reduces disk usage"],
+        "correct": 0,
+        "explanation": "Untrusted sites may provide tampered or bundled malware with installers.",
+        "concepts": ["Suspicious_Download"],
+    },
+
+    # Module: Using Antivirus Software
+    {
+        "module": "Using Antivirus Software",
+        "question": "What should you do if your antivirus warns about a program?",
+        "options": ["Ignore the warning", "Quarantine or delete the file", "Share it with colleagues"],
+        "correct": 1,
+        "explanation": "Quarantine or delete suspected malicious files and investigate further.",
+        "concepts": ["Quarantile_File", "Delete_Threat"],
+    },
+    {
+        "module": "Using Antivirus Software",
+        "question": "Real-time protection in antivirus software means:",
+        "options": ["It scans only on boot", "It scans files as they are accessed", "It never scans"],
+        "correct": 1,
+        "explanation": "Real-time protection scans files and actions as they occur to block threats immediately.",
+    },
+    {
+        "module": "Using Antivirus Software",
+        "question": "Why keep antivirus definitions up to date?",
+        "options": ["To detect new threats", "To reduce internet use", "To improve screen resolution"],
+        "correct": 0,
+        "explanation": "Updated definitions help the antivirus recognize and block the latest threats.",
+        "concepts": ["Update_Antivirus_Definitions"],
+    },
+    {
+        "module": "Using Antivirus Software",
+        "question": "Running a full system scan is useful when:",
+        "options": ["You suspect infection", "You want to uninstall software", "You want to defragment disk"],
+        "correct": 0,
+        "explanation": "A full scan helps find infections that real-time scanning may have missed.",
+        "concepts": ["Run_Scan"],
+    },
+    {
+        "module": "Using Antivirus Software",
+        "question": "A good antivirus vendor practice is to:",
+        "options": ["Ignore reports", "Provide regular updates and support", "Release no updates"],
+        "correct": 1,
+        "explanation": "Trusted vendors provide frequent updates and support to address new threats.",
+    },
+
+    # Module: Maintenance & Updates
+    {
+        "module": "Maintenance & Updates",
+        "question": "Why install OS updates promptly?",
+        "options": ["They add unnecessary features", "They patch security vulnerabilities", "They slow the system down"],
+        "correct": 1,
+        "explanation": "OS updates often patch security flaws that attackers could exploit.",
+        "concepts": ["Update_Software"],
+    },
+    {
+        "module": "Maintenance & Updates",
+        "question": "Regular backups help because they:",
+        "options": ["Allow recovery after an incident", "Encrypt all files automatically", "Prevent viruses entirely"],
+        "correct": 0,
+        "explanation": "Backups let you restore data after malware or hardware failure.",
+    },
+    {
+        "module": "Maintenance & Updates",
+        "question": "Using least-privilege accounts means:",
+        "options": ["Users run with only required permissions", "Everyone has admin rights", "No user can log in"],
+        "correct": 0,
+        "explanation": "Least privilege reduces the potential impact of compromised accounts.",
+    },
+    {
+        "module": "Maintenance & Updates",
+        "question": "Why enable a firewall?",
+        "options": ["To block unauthorized network access", "To speed up downloads", "To display ads"],
+        "correct": 0,
+        "explanation": "Firewalls help block unauthorized inbound and outbound connections.",
+        "concepts": ["Enable_Firewall"],
+    },
+    {
+        "module": "Maintenance & Updates",
+        "question": "What is an important habit for maintenance?",
+        "options": ["Ignore update prompts", "Review logs and update regularly", "Share passwords"],
+        "correct": 1,
+        "explanation": "Regularly reviewing logs and applying updates helps maintain security.",
+    },
+]
@@ -0,0 +1,418 @@
+"""
+Headless quiz API for LMS integrations: a plain ASGI application.
+
+Machine clients get the same content and quizzes as the Streamlit app
+without driving its UI, and without a script rerun per request:
+
+- content comes from the course registry (content_registry.py), with the
+  snapshot and hot reload
+- quizzes are the grouped quizzes of initialize_quiz_grouped(), taken from
+  the same kind of ready-quiz pool (quiz_generator.py, quiz_pool.py)
+- attempts, answers and results go to the same attempt store through a
+  write-behind writer, so they appear in item analytics and feed
+  spaced-repetition review
+
+Endpoints (JSON in and out)::
+
+    GET  /modules?course=<id>     module titles, texts and question counts
+    POST /quizzes                 start a quiz; optional body fields: course,
+                                  learner, seed, assignment (as ?assignment=<id>)
+    POST /quizzes/<id>/answers    {"answers": [{"position": 0, "option": 2}, ...]}
+    GET  /quizzes/<id>            score, per-module results and, for answered
+                                  questions, the right option and explanation
+    GET  /health
+
+An option is an index into the options in the order the quiz presented
+them. Each question can be answered once.
+
+There is no framework underneath and no handler blocks the event loop:
+starting a quiz pops from the pool, answers are queued for the writer, and
+the few disk reads (a course that is not cached, a quiz no longer held in
+memory) run in a worker thread. One process therefore keeps thousands of
+connections open at once. Live quizzes are kept in memory, the most recent
+AV_TUTOR_API_MAX_QUIZZES of them (default 100000); older ones are rebuilt
+from the attempt store when they are next used.
+
+    python quiz_api.py [--host 127.0.0.1] [--port 8000]    # serve with uvicorn
+    python benchmarks/api_load.py                           # local load test
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from aggregation import ModuleScores
+from attempt_store import AnswerRecord, AttemptRecord, ResultRecord, WriteBehindWriter, open_store
+from content_registry import DEFAULT_COURSE, build_registry
+from quiz_generator import QUESTIONS_PER_MODULE, derive_seed, generate_quiz
+from quiz_pool import shared_pool
+from quiz_state import decode_permutation, present
+
+logger = logging.getLogger(__name__)
+
+COURSES_FILE = os.environ.get("AV_TUTOR_COURSES")
+ATTEMPT_DB = os.environ.get(
+    "AV_TUTOR_ATTEMPT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "attempts.sqlite3")
+)
+RELOAD_INTERVAL = float(os.environ.get("AV_TUTOR_RELOAD_INTERVAL", "2"))
+QUIZ_POOL_SIZE = int(os.environ.get("AV_TUTOR_QUIZ_POOL_SIZE", "64"))
+QUIZ_POOL_LOW_WATER = int(os.environ.get("AV_TUTOR_QUIZ_POOL_LOW_WATER", "16"))
+MAX_QUIZZES = int(os.environ.get("AV_TUTOR_API_MAX_QUIZZES", "100000"))
+MAX_BODY = 64 * 1024
+FLUSH_TIMEOUT = 10.0  # seconds a rebuilt quiz waits for its queued answers to be written
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ApiQuiz:
+    """A quiz started through the API, with the bank it was drawn from."""
+    __slots__ = ("attempt_id", "course", "learner", "seed", "bank", "ids", "perms", "answers", "scores",
+                 "result_saved")
+
+    def __init__(self, attempt_id, course, learner, seed, bank, ids, perms):
+        self.attempt_id = attempt_id
+        self.course = course
+        self.learner = learner
+        self.seed = seed
+        self.bank = bank
+        self.ids = tuple(ids)
+        self.perms = tuple(perms)
+        self.answers = {}  # position -> chosen option, as presented
+        self.scores = ModuleScores.for_quiz(bank, self.ids)
+        self.result_saved = False
+
+    def answer(self, position, option):
+        """Record an answer; returns ``(bank option, correct)``."""
+        q = self.bank[self.ids[position]]
+        order = decode_permutation(self.perms[position], len(q["options"]))
+        correct = order[option] == q["correct"]
+        self.answers[position] = option
+        self.scores.record(q.get("module", "General"), correct)
+        return order[option], correct
+
+
+def _module_titles(content):
+    return list(content.modules) if content.modules is not None else list(content.bank.modules())
+
+
+def _int(body, name, lo, hi):
+    value = body.get(name)
+    if not isinstance(value, int) or isinstance(value, bool) or not lo <= value < hi:
+        raise HTTPError(400, "%s must be an integer in [%d, %d)" % (name, lo, hi))
+    return value
+
+
+class QuizAPI:
+    """The ASGI application. Shared state is created on startup (or on the first request)."""
+
+    def __init__(self, catalog_path=COURSES_FILE, attempt_db=ATTEMPT_DB, max_quizzes=MAX_QUIZZES):
+        self.catalog_path = catalog_path
+        self.attempt_db = attempt_db
+        self.max_quizzes = max_quizzes
+        self.registry = None
+        self.writer = None
+        self.quizzes = OrderedDict()  # attempt ID -> ApiQuiz, least recently used first
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Load the course registry and the built-in course, and open the attempt writer."""
+        with self._start_lock:
+            if self.registry is not None:
+                return
+            registry = build_registry(self.catalog_path)
+            if RELOAD_INTERVAL > 0:
+                registry.cache.start_watching(RELOAD_INTERVAL)
+            registry.content(DEFAULT_COURSE)
+            self.writer = WriteBehindWriter(open_store(self.attempt_db))
+            self.registry = registry
+
+    def stop(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.registry is not None:
+            self.registry.cache.stop_watching()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        try:
+            if self.registry is None:
+                await asyncio.to_thread(self.start)
+            status, body = await self.handle(scope, receive)
+        except HTTPError as e:
+            status, body = e.status, {"error": e.message}
+        except Exception:
+            logger.exception("Error handling %s %s", scope["method"], scope["path"])
+            status, body = 500, {"error": "internal error"}
+        payload = json.dumps(body).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", b"%d" % len(payload))],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await asyncio.to_thread(self.start)
+                except Exception as e:
+                    logger.exception("Quiz API failed to start")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.to_thread(self.stop)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def handle(self, scope, receive):
+        """``(status, JSON body)`` for one request."""
+        method = scope["method"]
+        parts = [p for p in scope["path"].split("/") if p]
+        query = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        if parts == ["health"] and method == "GET":
+            return 200, {"status": "ok"}
+        if parts == ["modules"] and method == "GET":
+            return 200, await self.list_modules(query.get("course"))
+        if parts == ["quizzes"] and method == "POST":
+            return 201, await self.create_quiz(await self._json(receive))
+        if len(parts) == 3 and parts[0] == "quizzes" and parts[2] == "answers" and method == "POST":
+            return 200, await self.submit_answers(parts[1], await self._json(receive))
+        if len(parts) == 2 and parts[0] == "quizzes" and method == "GET":
+            return 200, self.results(await self.quiz(parts[1]))
+        if parts in (["health"], ["modules"], ["quizzes"]) or (parts[:1] == ["quizzes"] and len(parts) in (2, 3)):
+            raise HTTPError(405, "method not allowed")
+        raise HTTPError(404, "not found")
+
+    async def _json(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY:
+                raise HTTPError(413, "request body is larger than %d bytes" % MAX_BODY)
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        raw = b"".join(chunks)
+        if not raw.strip():
+            return {}
+        try:
+            body = json.loads(raw)
+        except (UnicodeDecodeError, ValueError):
+            raise HTTPError(400, "request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        return body
+
+    async def content(self, course_id):
+        """``(Course, OntologyContent)``; 404 for unknown courses."""
+        course_id = course_id or DEFAULT_COURSE
+        if not isinstance(course_id, str):
+            raise HTTPError(400, "course must be a string")
+        if course_id not in self.registry.courses:
+            raise HTTPError(404, "unknown course %r" % course_id)
+        content = self.registry.cached_content(course_id)
+        if content is None:
+            # not loaded yet, evicted or changed on disk: parsing must stay off the event loop
+            content = await asyncio.to_thread(self.registry.content, course_id)
+        if content is None:
+            raise HTTPError(503, "content for course %r is unavailable" % course_id)
+        return self.registry.courses[course_id], content
+
+    async def list_modules(self, course_id):
+        course, content = await self.content(course_id)
+        texts = content.modules or {}
+        return {
+            "course": course.id,
+            "title": course.title,
+            "modules": [{"title": m, "text": texts.get(m, ""), "questions": content.bank.count(m)}
+                        for m in _module_titles(content)],
+        }
+
+    def pool(self, course, bank, module_order):
+        """The process-wide pool of ready grouped quizzes for this content version."""
+        factory = functools.partial(generate_quiz, bank, modules=module_order, per_module=QUESTIONS_PER_MODULE)
+        return shared_pool((bank, module_order), factory, size=QUIZ_POOL_SIZE, low_water=QUIZ_POOL_LOW_WATER,
+                           slot=course.id)
+
+    async def create_quiz(self, body):
+        course, content = await self.content(body.get("course"))
+        bank = content.bank
+        module_order = tuple(_module_titles(content))
+        learner = body.get("learner") or "api-" + uuid.uuid4().hex
+        if not isinstance(learner, str):
+            raise HTTPError(400, "learner must be a string")
+        seed = None
+        if body.get("seed") is not None:
+            seed = _int(body, "seed", 0, 1 << 64)
+        elif body.get("assignment"):
+            seed = derive_seed("assignment", body["assignment"])
+        if seed is None and QUIZ_POOL_SIZE > 0:
+            quiz = self.pool(course, bank, module_order).pop()
+        else:
+            quiz = generate_quiz(bank, secrets.randbits(64) if seed is None else seed,
+                                 modules=module_order, per_module=QUESTIONS_PER_MODULE)
+
+        q = ApiQuiz(uuid.uuid4().hex, course.id, learner, quiz.seed, bank, quiz.ids, quiz.perms)
+        self._remember(q)
+        self.writer.submit(AttemptRecord(
+            attempt_id=q.attempt_id,
+            learner_id=learner,
+            seed=q.seed,
+            question_ids=q.ids,
+            perms=q.perms,
+            started_at=time.time(),
+            course=course.id,
+            bank_version=bank.version,
+        ))
+        questions = []
+        for position, (qid, code) in enumerate(zip(q.ids, q.perms)):
+            shown = present(bank[qid], code)
+            questions.append({"position": position, "module": shown["module"], "question": shown["question"],
+                              "options": shown["options"]})
+        return {"quiz_id": q.attempt_id, "course": course.id, "learner": learner, "seed": str(q.seed),
+                "total": len(q.ids), "questions": questions}
+
+    def _remember(self, q):
+        self.quizzes[q.attempt_id] = q
+        self.quizzes.move_to_end(q.attempt_id)
+        while len(self.quizzes) > self.max_quizzes:
+            self.quizzes.popitem(last=False)
+
+    async def quiz(self, quiz_id):
+        q = self.quizzes.get(quiz_id)
+        if q is not None:
+            self.quizzes.move_to_end(quiz_id)
+            return q
+        q = await asyncio.to_thread(self._restore, quiz_id)
+        if q is None:
+            raise HTTPError(404, "unknown quiz %r" % quiz_id)
+        # another request may have restored it meanwhile
+        q = self.quizzes.get(quiz_id) or q
+        self._remember(q)
+        return q
+
+    def _restore(self, quiz_id):
+        """Rebuild a quiz that is no longer in memory from the attempt store (worker thread)."""
+        # its answers may still be queued; other sessions' later submissions are not waited for
+        if not self.writer.flush(FLUSH_TIMEOUT):
+            raise HTTPError(503, "the attempt store is busy; try again")
+        store = self.writer.store
+        attempt = store.attempt(quiz_id)
+        if attempt is None:
+            return None
+        content = self.registry.content(attempt.course)
+        if content is None or attempt.bank_version not in (None, content.bank.version) or any(
+                qid >= len(content.bank) for qid in attempt.question_ids):
+            raise HTTPError(410, "quiz %r refers to course content that is no longer available" % quiz_id)
+        q = ApiQuiz(attempt.attempt_id, attempt.course, attempt.learner_id, attempt.seed, content.bank,
+                    attempt.question_ids, attempt.perms)
+        for a in store.answers(quiz_id):
+            n = len(content.bank[a.question_id]["options"])
+            q.answer(a.position, decode_permutation(q.perms[a.position], n).index(a.option))
+        q.result_saved = store.result(quiz_id) is not None
+        return q
+
+    async def submit_answers(self, quiz_id, body):
+        q = await self.quiz(quiz_id)
+        items = body.get("answers")
+        if items is None and "position" in body:
+            items = [body]
+        if not isinstance(items, list) or not items or not all(isinstance(a, dict) for a in items):
+            raise HTTPError(400, "answers must be a non-empty list of {position, option} objects")
+        # validate everything before recording anything
+        seen = set()
+        for a in items:
+            position = _int(a, "position", 0, len(q.ids))
+            _int(a, "option", 0, len(q.bank[q.ids[position]]["options"]))
+            if position in q.answers or position in seen:
+                raise HTTPError(409, "question %d has already been answered" % position)
+            seen.add(position)
+
+        now = time.time()
+        results = []
+        for a in items:
+            position = a["position"]
+            option, correct = q.answer(position, a["option"])
+            self.writer.submit(AnswerRecord(q.attempt_id, position, q.ids[position], option, correct, now))
+            question = present(q.bank[q.ids[position]], q.perms[position])
+            results.append({"position": position, "correct": correct, "correct_option": question["correct"],
+                            "explanation": question["explanation"]})
+        if len(q.answers) == len(q.ids) and not q.result_saved:
+            self.writer.submit(ResultRecord(q.attempt_id, q.scores.score, len(q.ids), now))
+            q.result_saved = True
+        return {"results": results, "answered": len(q.answers), "total": len(q.ids), "score": q.scores.score}
+
+    def results(self, q):
+        questions = []
+        for position, (qid, code) in enumerate(zip(q.ids, q.perms)):
+            shown = present(q.bank[qid], code)
+            row = {"position": position, "module": shown["module"], "question": shown["question"],
+                   "options": shown["options"], "answer": q.answers.get(position)}
+            if position in q.answers:
+                # the answer key is only revealed for answered questions
+                row["correct_option"] = shown["correct"]
+                row["correct"] = q.answers[position] == shown["correct"]
+                row["explanation"] = shown["explanation"]
+            questions.append(row)
+        return {
+            "quiz_id": q.attempt_id,
+            "course": q.course,
+            "learner": q.learner,
+            "score": q.scores.score,
+            "answered": len(q.answers),
+            "total": len(q.ids),
+            "finished": len(q.answers) == len(q.ids),
+            "modules": [{"module": m, "correct": c, "total": t} for m, c, t in q.scores.rows()],
+            "questions": questions,
+        }
+
+
+app = QuizAPI()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the headless quiz API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--backlog", type=int, default=4096, help="pending connections the socket queues")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        print("uvicorn is not installed; run `pip install uvicorn` or serve quiz_api:app "
+              "with any other ASGI server", file=sys.stderr)
+        return 1
+    logging.basicConfig(level=args.log_level.upper())
+    uvicorn.run(app, host=args.host, port=args.port, backlog=args.backlog, log_level=args.log_level,
+                access_log=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Deterministic, seeded quiz generation.
+
+Every quiz is produced from its own ``random.Random(seed)`` instance, never the
+global ``random`` module, so the same bank and seed always give the same
+questions in the same order with the same option shuffles. Quizzes can
+therefore be reproduced for review, checked offline, and precomputed by
+seed.
+"""
+import hashlib
+import random
+from dataclasses import dataclass
+from math import factorial
+
+from question_bank import floyd_sample
+from quiz_state import new_quiz
+
+QUESTIONS_PER_MODULE = 5
+
+
+@dataclass(frozen=True)
+class GeneratedQuiz:
+    seed: int
+    ids: tuple  # question IDs into the bank
+    perms: tuple  # packed option permutation per question (see quiz_state)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def session_arrays(self):
+        """Fresh ``(ids, perms)`` arrays to store in a session."""
+        return new_quiz(self.ids, self.perms)
+
+
+def derive_seed(*parts):
+    """Stable 64-bit seed from any printable parts, e.g. ("assignment", "hw3").
+
+    Uses SHA-256 rather than ``hash()`` so the seed is the same in every
+    process regardless of PYTHONHASHSEED.
+    """
+    digest = hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def generate_quiz(bank, seed, modules=None, per_module=None, limit=None):
+    """Build a quiz from ``bank`` using only an RNG seeded with ``seed``.
+
+    With ``modules`` and ``per_module``, up to ``per_module`` questions are
+    drawn from each module and kept grouped in ``modules`` order. Otherwise
+    ``limit`` questions (default: all) are drawn from the whole bank in random
+    order. Each question gets an independent, uniformly random option order.
+    """
+    rng = random.Random(seed)
+    if modules is not None and per_module is not None:
+        ids = bank.sample_per_module(modules, per_module, rng)
+    else:
+        n = len(bank)
+        ids = floyd_sample(n, n if limit is None else min(limit, n), rng)
+    # A uniform rank in [0, n!) is a uniform permutation of n options.
+    perms = [rng.randrange(factorial(len(bank[qid]["options"]))) for qid in ids]
+    return GeneratedQuiz(seed, tuple(ids), tuple(perms))
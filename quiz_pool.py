@@ -0,0 +1,143 @@
+"""
+Pre-generated quiz pool with background refill.
+
+At the start of a class hundreds of learners press "Start Quiz" at once. A
+QuizPool keeps ready-made quizzes in memory, generated by a background thread,
+so starting a quiz is just a pop from a deque. When the pool drops below its
+low-water mark the refill thread is woken to top it back up; if it is ever
+empty, pop() generates a quiz inline rather than waiting.
+
+Pooled quizzes get a fresh random seed each, so any quiz can still be
+reproduced later from the seed stored with the attempt.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+
+from stats import percentile
+
+LATENCY_SAMPLES = 10000
+
+
+class QuizPool:
+    """Thread-safe pool of ready quizzes produced by ``factory(seed)``."""
+
+    def __init__(self, factory, size=64, low_water=16):
+        if not 0 <= low_water < size:
+            raise ValueError("low_water must be in [0, size)")
+        self.factory = factory
+        self.size = size
+        self.low_water = low_water
+        self._ready = deque()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+
+    def start(self):
+        """Fill the pool in the background. Returns self for chaining."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="quiz-pool-refill", daemon=True)
+            self._thread.start()
+            self._wake.set()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _generate(self):
+        quiz = self.factory(secrets.randbits(64))
+        with self._lock:
+            self.generated += 1
+        return quiz
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            while len(self._ready) < self.size and not self._stopped.is_set():
+                self._ready.append(self._generate())
+
+    def pop(self):
+        """Return a ready quiz, generating one inline if the pool is empty."""
+        start = time.perf_counter()
+        try:
+            quiz = self._ready.popleft()
+            hit = True
+        except IndexError:
+            quiz = self._generate()
+            hit = False
+        if len(self._ready) < self.low_water:
+            self._wake.set()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._latencies.append(elapsed)
+        return quiz
+
+    def wait_full(self, timeout=None):
+        """Block until the pool is full (mainly for benchmarks and warm-up)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self._ready) < self.size:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def stats(self):
+        """Counters plus p50/p99 pop latency over the most recent pops."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "ready": len(self._ready),
+                "size": self.size,
+                "low_water": self.low_water,
+                "hits": self.hits,
+                "misses": self.misses,
+                "generated": self.generated,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+            }
+
+
+# One pool per slot (e.g. per course) for the slots used most recently; older
+# ones are stopped so a process serving many courses keeps a bounded number of
+# refill threads.
+MAX_SHARED_POOLS = 8
+
+_shared_lock = threading.Lock()
+_shared = OrderedDict()  # slot -> (key, QuizPool), least recently used first
+
+
+def shared_pool(key, factory, size=64, low_water=16, slot=None):
+    """Process-wide pool for one content version.
+
+    ``key`` identifies what the quizzes are generated from (e.g. the bank
+    object and module order). When the key for a ``slot`` changes, the old
+    pool is stopped and a new one started, so stale quizzes are never served.
+    """
+    with _shared_lock:
+        current = _shared.get(slot)
+        if current is not None and current[0] == key:
+            _shared.move_to_end(slot)
+            return current[1]
+        if current is not None:
+            current[1].stop(timeout=0)
+        pool = QuizPool(factory, size=size, low_water=low_water).start()
+        _shared[slot] = (key, pool)
+        _shared.move_to_end(slot)
+        while len(_shared) > MAX_SHARED_POOLS:
+            _, (_, old) = _shared.popitem(last=False)
+            old.stop(timeout=0)
+        return pool
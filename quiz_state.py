@@ -0,0 +1,83 @@
+"""
+Compact per-session quiz representation.
+
+A session's quiz is stored as two flat arrays rather than copies of the
+question dicts:
+
+- ``ids``: question IDs into the shared QuestionBank (``array('I')``)
+- ``perms``: one packed option permutation per question (``array('Q')``)
+
+A permutation of n options is packed as its Lehmer code, i.e. its rank among
+all n! orderings, so it fits in one 64-bit integer for up to 20 options and
+code 0 is always the original order. Question text is resolved from the bank
+when a page renders.
+"""
+import functools
+from array import array
+from math import factorial
+
+MAX_OPTIONS = 20  # 20! < 2**64
+
+
+def encode_permutation(perm):
+    """Rank of ``perm`` (a permutation of range(n)) in lexicographic order."""
+    n = len(perm)
+    if n > MAX_OPTIONS:
+        raise ValueError("at most %d options can be packed" % MAX_OPTIONS)
+    remaining = list(range(n))
+    code = 0
+    for i, p in enumerate(perm):
+        pos = remaining.index(p)
+        code += pos * factorial(n - 1 - i)
+        del remaining[pos]
+    return code
+
+
+@functools.lru_cache(maxsize=4096)
+def decode_permutation(code, n):
+    """Inverse of encode_permutation: the permutation of range(n) with rank ``code``."""
+    remaining = list(range(n))
+    perm = []
+    for i in range(n - 1, -1, -1):
+        pos, code = divmod(code, factorial(i))
+        perm.append(remaining.pop(pos))
+    return tuple(perm)
+
+
+def new_quiz(ids=(), perms=()):
+    """Fresh ``(ids, perms)`` arrays for a session."""
+    return array("I", ids), array("Q", perms)
+
+
+def present(question, code):
+    """The question as shown to the learner, with options in permuted order.
+
+    ``correct`` is the index of the right answer among the shown options, so
+    the result has the same shape as the question dicts in the bank.
+    """
+    order = decode_permutation(code, len(question["options"]))
+    options = [question["options"][i] for i in order]
+    return {
+        "module": question.get("module", "General"),
+        "question": question["question"],
+        "options": options,
+        "correct": order.index(question["correct"]),
+        "explanation": question.get("explanation", ""),
+    }
+
+
+def present_quiz(bank, ids, perms):
+    """Iterate over every question of a compact quiz, resolved from ``bank``."""
+    for qid, code in zip(ids, perms):
+        yield present(bank[qid], code)
+
+
+def module_positions(bank, ids):
+    """Quiz positions grouped by module: module -> ``array('I')`` of indexes into ``ids``."""
+    positions = {}
+    for pos, qid in enumerate(ids):
+        m = bank[qid].get("module", "General")
+        if m not in positions:
+            positions[m] = array("I")
+        positions[m].append(pos)
+    return positions
@@ -0,0 +1,384 @@
+"""
+Spaced-repetition review of missed questions (SM-2).
+
+A question a learner gets wrong becomes a review card for that learner. From
+then on every answer to it, in a quiz or on the Review page, reschedules the
+card with the SM-2 algorithm: a wrong answer makes it due again straight away
+and resets its repetition count; a right one pushes it out to 1 day, then
+6 days, then the previous interval times the card's ease factor. The ease
+starts at 2.5, drops with each miss (answers are right or wrong, graded as
+SM-2 quality 4 and 1) and never goes below 1.3.
+
+Cards are never stored. They are a fold over the learner's answers, which
+the attempt store already keeps (AttemptStore.review_events), so there is
+one source of truth and nothing to migrate when the rules change.
+
+- ``schedule_cards`` folds the answers of any number of learners at once:
+  events are sorted into cards with NumPy and the k-th answers of every card
+  are applied together, so the number of Python steps is the largest number
+  of answers to one card, not the number of learners or answers.
+- ``due_sets`` then picks every learner's due questions in one pass; this
+  is the nightly sweep (``python review.py``, or ``--synthetic 100000``
+  to time 100k simulated learners).
+- In the app, a learner's cards are folded the same way when they first
+  need them and kept in a ReviewQueue, a heap ordered by due time that each
+  new answer updates in O(log n). ReviewScheduler keeps the queues of the
+  most recently active learners in the process.
+"""
+import argparse
+import csv
+import heapq
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+DAY = 86400.0
+START_EASE = 2.5
+MIN_EASE = 1.3
+FIRST_INTERVAL = 1.0  # days
+SECOND_INTERVAL = 6.0
+GRADE_CORRECT = 4  # SM-2 quality grades for right and wrong answers
+GRADE_WRONG = 1
+
+
+def next_ease(ease, grade):
+    """SM-2 ease factor after an answer of quality ``grade`` (0-5)."""
+    miss = 5 - grade
+    return max(MIN_EASE, ease + 0.1 - miss * (0.08 + miss * 0.02))
+
+
+EASE_CORRECT = next_ease(START_EASE, GRADE_CORRECT) - START_EASE
+EASE_WRONG = next_ease(START_EASE, GRADE_WRONG) - START_EASE
+
+
+@dataclass(frozen=True)
+class Card:
+    question_id: int
+    repetitions: int  # right answers since the last miss
+    ease: float
+    interval: float  # days
+    due: float  # timestamp
+
+
+def review(card, question_id, correct, at):
+    """The card after answering ``question_id`` at time ``at``; None while it has never been missed."""
+    if card is None:
+        if correct:
+            return None
+        card = Card(question_id, 0, START_EASE, 0.0, at)
+    if not correct:
+        return Card(question_id, 0, max(MIN_EASE, card.ease + EASE_WRONG), 0.0, at)
+    repetitions = card.repetitions + 1
+    if repetitions == 1:
+        interval = FIRST_INTERVAL
+    elif repetitions == 2:
+        interval = SECOND_INTERVAL
+    else:
+        interval = float(round(card.interval * card.ease))
+    return Card(question_id, repetitions, max(MIN_EASE, card.ease + EASE_CORRECT), interval, at + interval * DAY)
+
+
+@dataclass(frozen=True)
+class Cards:
+    """Review cards as columns, grouped by learner index."""
+    learner: np.ndarray  # int32 index into ``learners``
+    question: np.ndarray  # int32 question ID
+    repetitions: np.ndarray  # int32
+    ease: np.ndarray  # float64
+    interval: np.ndarray  # float64 days
+    due: np.ndarray  # float64 timestamp
+    learners: tuple  # learner IDs
+
+    def __len__(self):
+        return len(self.question)
+
+    def of(self, i):
+        """Card objects of learner index ``i``."""
+        lo, hi = np.searchsorted(self.learner, [i, i + 1])
+        return [Card(int(q), int(r), float(e), float(v), float(d)) for q, r, e, v, d in zip(
+            self.question[lo:hi], self.repetitions[lo:hi], self.ease[lo:hi], self.interval[lo:hi], self.due[lo:hi])]
+
+
+def event_columns(events):
+    """``(learner index, question, correct, at, learner IDs)`` arrays from ``(learner_id, question_id, correct, at)`` rows."""
+    learner_index = {}
+    learners, questions, corrects, times = [], [], [], []
+    for learner_id, qid, correct, at in events:
+        learners.append(learner_index.setdefault(learner_id, len(learner_index)))
+        questions.append(qid)
+        corrects.append(correct)
+        times.append(at)
+    return (np.asarray(learners, dtype=np.int32), np.asarray(questions, dtype=np.int32),
+            np.asarray(corrects, dtype=bool), np.asarray(times, dtype=np.float64), tuple(learner_index))
+
+
+def schedule_cards(learner, question, correct, at, learners=()):
+    """Fold answer columns into the current Cards of every learner, as ``review`` would one by one.
+
+    The answers must be in time order, as AttemptStore.review_events yields them.
+    """
+    # a stable sort by card keeps each card's answers in time order
+    width = int(question.max()) + 1 if len(question) else 1
+    order = np.argsort(learner.astype(np.int64) * width + question, kind="stable")
+    learner, question, correct, at = learner[order], question[order], correct[order], at[order]
+    n = len(order)
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = (learner[1:] != learner[:-1]) | (question[1:] != question[:-1])
+    group = np.cumsum(starts) - 1
+
+    # a card starts at its question's first miss; right answers before it schedule nothing
+    misses = np.cumsum(~correct)
+    before = np.concatenate(([0], misses[:-1]))[starts]  # misses before each group
+    keep = misses - before[group] > 0
+    learner, question, correct, at, group = learner[keep], question[keep], correct[keep], at[keep], group[keep]
+    cards, group = np.unique(group, return_inverse=True)
+    n_cards = len(cards)
+    first = np.searchsorted(group, np.arange(n_cards))
+    rank = np.arange(len(group)) - first[group]
+
+    repetitions = np.zeros(n_cards, dtype=np.int32)
+    ease = np.full(n_cards, START_EASE)
+    interval = np.zeros(n_cards)
+    due = np.zeros(n_cards)
+    # apply the k-th answer of every card at once
+    by_rank = np.argsort(rank, kind="stable")
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(rank)))) if len(rank) else np.zeros(1, dtype=np.int64)
+    for k in range(len(bounds) - 1):
+        sel = by_rank[bounds[k]:bounds[k + 1]]
+        g, ok, t = group[sel], correct[sel], at[sel]
+        reps = np.where(ok, repetitions[g] + 1, 0)
+        grown = np.round(interval[g] * ease[g])
+        interval[g] = np.where(ok, np.select([reps == 1, reps == 2], [FIRST_INTERVAL, SECOND_INTERVAL], grown), 0.0)
+        ease[g] = np.maximum(MIN_EASE, ease[g] + np.where(ok, EASE_CORRECT, EASE_WRONG))
+        repetitions[g] = reps
+        due[g] = t + interval[g] * DAY
+    return Cards(learner[first], question[first], repetitions, ease, interval, due, tuple(learners))
+
+
+@dataclass(frozen=True)
+class DueSets:
+    """Each learner's due questions: ``questions[offsets[i]:offsets[i + 1]]`` for learner index i."""
+    learners: tuple
+    offsets: np.ndarray
+    questions: np.ndarray  # int32, each learner's in due order
+    next_due: np.ndarray  # float64 earliest due time per learner (inf without cards)
+
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def of(self, i):
+        return self.questions[self.offsets[i]:self.offsets[i + 1]]
+
+
+def due_sets(cards, now):
+    """Questions due at ``now`` for every learner in ``cards``."""
+    n = len(cards.learners)
+    is_due = cards.due <= now
+    order = np.lexsort((cards.due[is_due], cards.learner[is_due]))
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(cards.learner[is_due], minlength=n))))
+    next_due = np.full(n, np.inf)
+    np.minimum.at(next_due, cards.learner, cards.due)
+    return DueSets(cards.learners, offsets, cards.question[is_due][order], next_due)
+
+
+class ReviewQueue:
+    """One learner's cards plus a heap of ``(due, question ID)``; thread-safe."""
+
+    def __init__(self, cards=()):
+        self._lock = threading.Lock()
+        self.cards = {c.question_id: c for c in cards}
+        self._heap = [(c.due, c.question_id) for c in self.cards.values()]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def record(self, question_id, correct, at):
+        """Reschedule ``question_id`` after an answer; returns its card (None if it has none)."""
+        with self._lock:
+            card = review(self.cards.get(question_id), question_id, correct, at)
+            if card is not None:
+                self.cards[question_id] = card
+                heapq.heappush(self._heap, (card.due, question_id))
+                if len(self._heap) > 2 * len(self.cards) + 16:
+                    # too many superseded entries: rebuild from the cards
+                    self._heap = [(c.due, c.question_id) for c in self.cards.values()]
+                    heapq.heapify(self._heap)
+            return card
+
+    def drop(self, question_id):
+        """Forget a card, e.g. for a question no longer in the bank."""
+        with self._lock:
+            self.cards.pop(question_id, None)
+
+    def _top(self):
+        # entries whose card has been rescheduled or dropped since are skipped
+        heap = self._heap
+        while heap:
+            due, qid = heap[0]
+            card = self.cards.get(qid)
+            if card is not None and card.due == due:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def next_due(self, now):
+        """Question ID of the card due longest ago, or None if nothing is due at ``now``."""
+        with self._lock:
+            top = self._top()
+            return top[1] if top is not None and top[0] <= now else None
+
+    def next_review(self):
+        """When the earliest card is due, or None without cards."""
+        with self._lock:
+            top = self._top()
+            return top[0] if top is not None else None
+
+    def due_count(self, now):
+        with self._lock:
+            return sum(1 for c in self.cards.values() if c.due <= now)
+
+
+class ReviewScheduler:
+    """ReviewQueues of recently active learners, folded from the store on first use.
+
+    ``before_load`` is called before reading the store, e.g. to flush a
+    write-behind writer so a learner's latest answers are included.
+    """
+
+    def __init__(self, store, max_learners=10_000, before_load=None):
+        self.store = store
+        self.max_learners = max_learners
+        self.before_load = before_load
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()  # (course, bank version, learner ID) -> ReviewQueue
+        self.loads = 0
+
+    def queue(self, learner_id, course="default", stored=True, bank_version=None):
+        """The learner's ReviewQueue; ``stored=False`` promises they have no answers in the store yet.
+
+        Queues are kept per version of the course's question bank, since
+        question IDs are positions in it.
+        """
+        key = (course, bank_version, learner_id)
+        with self._lock:
+            q = self._queues.get(key)
+            if q is not None:
+                self._queues.move_to_end(key)
+                return q
+        cards = ()
+        if stored:
+            if self.before_load is not None:
+                self.before_load()
+            columns = event_columns(self.store.review_events(learner_id, course, bank_version))
+            if columns[-1]:
+                cards = schedule_cards(*columns).of(0)
+        q = ReviewQueue(cards)
+        with self._lock:
+            # another session may have loaded it meanwhile; keep the first
+            q = self._queues.setdefault(key, q)
+            self._queues.move_to_end(key)
+            self.loads += 1
+            while len(self._queues) > self.max_learners:
+                self._queues.popitem(last=False)
+        return q
+
+    def record(self, learner_id, course, question_id, correct, at, stored=True, bank_version=None):
+        return self.queue(learner_id, course, stored, bank_version).record(question_id, correct, at)
+
+    def forget(self, learner_id, course="default", bank_version=None):
+        """Drop the learner's queue, so the next use folds it from the store again.
+
+        For an answer that replaces an earlier one in the store (a quiz
+        question answered again): its effect on the cards cannot be undone
+        in place.
+        """
+        with self._lock:
+            self._queues.pop((course, bank_version, learner_id), None)
+
+
+_shared_lock = threading.Lock()
+_shared_schedulers = {}  # WriteBehindWriter -> ReviewScheduler
+
+
+def shared_scheduler(writer):
+    """Process-wide ReviewScheduler over ``writer``'s store, created on first use.
+
+    Kept here rather than in the app for the reason given in
+    attempt_store.shared_writer; the writer is flushed before a learner's
+    answers are read.
+    """
+    with _shared_lock:
+        scheduler = _shared_schedulers.get(writer)
+        if scheduler is None:
+            scheduler = _shared_schedulers[writer] = ReviewScheduler(writer.store, before_load=writer.flush)
+        return scheduler
+
+
+def synthetic_events(n_learners, per_learner=40, n_questions=200, days=60, seed=0):
+    """Simulated answer columns for benchmarking: learners answering random questions over ``days``."""
+    rng = np.random.default_rng(seed)
+    n = n_learners * per_learner
+    learner = np.repeat(np.arange(n_learners, dtype=np.int32), per_learner)
+    question = rng.integers(0, n_questions, size=n).astype(np.int32)
+    correct = rng.random(n) < 0.7
+    at = rng.random(n) * days * DAY
+    order = np.argsort(at)  # in time order, as the store returns them
+    return learner[order], question[order], correct[order], at[order], tuple("learner-%d" % i for i in range(n_learners))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nightly sweep: every learner's due review questions.")
+    parser.add_argument("--db", default=os.environ.get(
+        "AV_TUTOR_ATTEMPT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "attempts.sqlite3")),
+        help="attempt database (default: the app's)")
+    parser.add_argument("--course", default="default", help="course to sweep (default: the built-in course)")
+    parser.add_argument("--synthetic", type=int, metavar="LEARNERS",
+                        help="sweep LEARNERS simulated learners instead of the database")
+    parser.add_argument("--output", default=None, help="write learner_id,due,next_due rows to this CSV file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.synthetic:
+        columns = synthetic_events(args.synthetic)
+        now = 60 * DAY
+    else:
+        from attempt_store import SQLiteAttemptStore
+        if not os.path.exists(args.db):
+            print("no attempt database at %s" % args.db, file=sys.stderr)
+            return 1
+        from content_registry import build_registry
+        content = build_registry(os.environ.get("AV_TUTOR_COURSES")).content(args.course)
+        if content is None:
+            print("course %s could not be loaded" % args.course, file=sys.stderr)
+            return 1
+        columns = event_columns(SQLiteAttemptStore(args.db).review_events(
+            course=args.course, bank_version=content.bank.version))
+        now = time.time()
+    loaded = time.perf_counter()
+    cards = schedule_cards(*columns)
+    due = due_sets(cards, now)
+    done = time.perf_counter()
+
+    counts = due.counts()
+    print("%d learners, %d answers, %d review cards; %d due for %d learners" % (
+        len(due.learners), len(columns[0]), len(cards), int(counts.sum()), int(np.count_nonzero(counts))))
+    print("loaded in %.2f s, scheduled in %.2f s" % (loaded - start, done - loaded))
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["learner_id", "due", "next_due"])
+            for i, learner_id in enumerate(due.learners):
+                writer.writerow([learner_id, int(counts[i]),
+                                 "" if np.isinf(due.next_due[i]) else "%.0f" % due.next_due[i]])
+        print("due counts written to %s" % args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
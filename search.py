@@ -0,0 +1,260 @@
+"""
+Full-text search over concepts, learning modules and quiz questions.
+
+A SearchIndex is built once per content version from documents with a title
+and a body: every ontology class that a learning module teaches (label and
+comment), every module (title and text) and every question (question text,
+options and explanation). Text is lower-cased and split into word tokens,
+minus a short stop-word list, and stored as an inverted index in CSR form:
+the vocabulary sorted alphabetically, and for each term a slice of NumPy
+arrays holding the documents it occurs in and a precomputed BM25 weight
+(title tokens count TITLE_WEIGHT times).
+
+A query token matches
+
+- the term itself,
+- terms it is a prefix of (so results appear while a word is being typed),
+  found by binary search in the sorted vocabulary, and
+- when the term itself is not in the vocabulary, terms sharing enough
+  character trigrams with it (so "malwre" finds "malware"), found through
+  a trigram -> term index and counted with one ``bincount``.
+
+Prefix and trigram matches score less than exact ones. Each token's best
+match per document is added up over one float array per query, documents
+matching only some tokens are scaled down, and the top results are picked
+with ``argpartition``; no step loops over documents in Python. Indexes are
+kept per content path in INDEXES and rebuilt when the content version
+changes.
+
+    python benchmarks/search.py    # build time and query latency at 100k documents
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+
+import numpy as np
+
+TITLE_WEIGHT = 3.0
+PREFIX_QUALITY = 0.7  # score of a prefix match relative to the exact term
+FUZZY_QUALITY = 0.6  # score of a trigram match at similarity 1, relative to the exact term
+FUZZY_MIN_SIMILARITY = 0.4  # Jaccard similarity of trigram sets
+MAX_EXPANSIONS = 16  # prefix or trigram matches kept per query token, most frequent first
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"[^\W_]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by can do does for from how in is it its of on or that the this to "
+    "what when which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    """Lower-cased word tokens of ``text``, stop words removed."""
+    return [t for t in _WORD_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def trigrams(term):
+    """Character trigrams of ``term`` padded with a space at each end."""
+    padded = " %s " % term
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+KINDS = ("concept", "module", "question")
+
+
+@dataclass(frozen=True)
+class Document:
+    kind: str  # one of KINDS
+    title: str
+    body: str
+    module: str  # learning module the document belongs to
+    concept: str = None  # local name of the ontology class, for concepts
+    qid: int = None  # question ID in the bank, for questions
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    document: Document
+    score: float
+
+
+class SearchIndex:
+    """Inverted index over a list of Documents; build once, query from any thread."""
+
+    def __init__(self, documents):
+        self.documents = tuple(documents)
+        n = len(self.documents)
+        self._kinds = np.fromiter((KINDS.index(d.kind) for d in self.documents), dtype=np.int8, count=n)
+        term_ids = {}
+        rows, docs, weights = [], [], []
+        lengths = np.zeros(n, dtype=np.float32)
+        for d, doc in enumerate(self.documents):
+            for text, weight in ((doc.title, TITLE_WEIGHT), (doc.body, 1.0)):
+                tokens = tokenize(text)
+                lengths[d] += len(tokens)
+                for t in tokens:
+                    rows.append(term_ids.setdefault(t, len(term_ids)))
+                    docs.append(d)
+                    weights.append(weight)
+
+        # vocabulary in alphabetical order, so a prefix's terms are one contiguous run
+        self.terms = sorted(term_ids)
+        self._term_id = {t: i for i, t in enumerate(self.terms)}
+        remap = np.empty(len(term_ids), dtype=np.int64)
+        remap[list(term_ids.values())] = [self._term_id[t] for t in term_ids]
+        rows = remap[np.asarray(rows, dtype=np.int64)] if rows else np.zeros(0, dtype=np.int64)
+
+        # one posting per (term, document): summed field weights, sorted by term
+        keys, inverse = np.unique(rows * max(n, 1) + np.asarray(docs, dtype=np.int64), return_inverse=True)
+        tf = np.bincount(inverse, weights=np.asarray(weights, dtype=np.float64)) if len(keys) else np.zeros(0)
+        term, doc = keys // max(n, 1), keys % max(n, 1)
+        df = np.bincount(term, minlength=len(self.terms))
+        self._offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+        self._docs = doc.astype(np.int32)
+        avg = float(lengths.mean()) if n else 0.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc] / avg) if avg else BM25_K1
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        self._weights = (idf[term] * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+        self.df = df
+
+        # trigram -> IDs of the terms containing it
+        grams = {}
+        self._gram_counts = np.zeros(len(self.terms), dtype=np.int32)
+        for i, t in enumerate(self.terms):
+            g = trigrams(t)
+            self._gram_counts[i] = len(g)
+            for gram in g:
+                grams.setdefault(gram, []).append(i)
+        self._grams = {g: np.asarray(ids, dtype=np.int32) for g, ids in grams.items()}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _prefixed(self, token):
+        """IDs of the terms starting with ``token``."""
+        return np.arange(bisect_left(self.terms, token), bisect_left(self.terms, token + "\U0010ffff"))
+
+    def expand(self, token):
+        """``(term ID, quality)`` pairs a query token matches."""
+        found = []
+        exact = self._term_id.get(token)
+        if exact is not None:
+            found.append((exact, 1.0))
+        if len(token) >= 2:
+            ids = self._prefixed(token)
+            ids = ids[ids != exact] if exact is not None else ids
+            if len(ids) > MAX_EXPANSIONS:
+                ids = ids[np.argpartition(-self.df[ids], MAX_EXPANSIONS)[:MAX_EXPANSIONS]]
+            found.extend((int(i), PREFIX_QUALITY * (0.5 + 0.5 * len(token) / len(self.terms[i]))) for i in ids)
+        if exact is None and len(token) >= 3:
+            query = trigrams(token)
+            hits = [self._grams[g] for g in query if g in self._grams]
+            if hits:
+                overlap = np.bincount(np.concatenate(hits), minlength=len(self.terms))
+                candidates = np.flatnonzero(overlap)
+                similarity = overlap[candidates] / (len(query) + self._gram_counts[candidates] - overlap[candidates])
+                keep = similarity >= FUZZY_MIN_SIMILARITY
+                candidates, similarity = candidates[keep], similarity[keep]
+                if len(candidates) > MAX_EXPANSIONS:
+                    top = np.argpartition(-similarity, MAX_EXPANSIONS)[:MAX_EXPANSIONS]
+                    candidates, similarity = candidates[top], similarity[top]
+                seen = {i for i, _ in found}
+                found.extend((int(i), FUZZY_QUALITY * float(s)) for i, s in zip(candidates, similarity)
+                             if int(i) not in seen)
+        return found
+
+    def search(self, query, limit=10, kinds=None):
+        """Best-scoring documents for ``query``, optionally only of the given ``kinds``."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.documents:
+            return []
+        n = len(self.documents)
+        total = np.zeros(n, dtype=np.float32)
+        matched = np.zeros(n, dtype=np.int16)
+        for token in tokens:
+            best = np.zeros(n, dtype=np.float32)
+            for term, quality in self.expand(token):
+                lo, hi = self._offsets[term], self._offsets[term + 1]
+                docs = self._docs[lo:hi]
+                best[docs] = np.maximum(best[docs], self._weights[lo:hi] * quality)
+            total += best
+            matched += best > 0
+        if kinds is not None:
+            total[~np.isin(self._kinds, [KINDS.index(k) for k in kinds])] = 0
+        # documents matching only some of the tokens rank below those matching all
+        total *= (matched / len(tokens)) ** 2
+        candidates = np.flatnonzero(total)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-total[candidates], limit)[:limit]]
+        candidates = candidates[np.argsort(-total[candidates], kind="stable")]
+        return [SearchResult(self.documents[d], float(total[d])) for d in candidates]
+
+
+def content_documents(content, module_texts=None):
+    """Documents for an OntologyContent: the concepts its modules teach, the modules and the questions.
+
+    ``module_texts`` (module title -> text) stands in for ``content.modules``
+    when the content has no ontology.
+    """
+    from ontology import local_name
+
+    documents = []
+    module_texts = content.modules if content.modules is not None else (module_texts or {})
+    classes = content.question_classes
+    if classes is not None:
+        index, ontology = content.index, content.ontology
+        for module, cls in classes.module_class.items():
+            for i in index.descendants(cls):
+                iri = index.iri(i)
+                documents.append(Document("concept", ontology.label(iri), ontology.comments.get(iri, ""),
+                                          module, concept=local_name(iri)))
+    for module, text in module_texts.items():
+        documents.append(Document("module", module, text, module))
+    for qid, q in enumerate(content.questions):
+        body = " ".join(list(q["options"]) + [q.get("explanation", "")])
+        documents.append(Document("question", q["question"], body, q.get("module", "General"), qid=qid))
+    return documents
+
+
+class IndexCache:
+    """The SearchIndex for the latest version of each content path, built on first search."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # content path -> (content key, SearchIndex)
+        self._building = {}  # content path -> lock held while its index is built
+        self.builds = 0
+        self.build_seconds = 0.0
+
+    def get(self, content, module_texts=None):
+        entry = self._entries.get(content.path)
+        if entry is not None and entry[0] == content.key:
+            return entry[1]
+        with self._lock:
+            building = self._building.setdefault(content.path, threading.Lock())
+        # Build outside the cache lock, so other courses' searches never wait for
+        # it; sessions searching a new version of this one wait rather than repeat it.
+        try:
+            with building:
+                entry = self._entries.get(content.path)
+                if entry is not None and entry[0] == content.key:
+                    return entry[1]
+                start = time.perf_counter()
+                index = SearchIndex(content_documents(content, module_texts))
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.build_seconds += elapsed
+                    self.builds += 1
+                    self._entries[content.path] = (content.key, index)
+                return index
+        finally:
+            with self._lock:
+                if self._building.get(content.path) is building:
+                    del self._building[content.path]
+
+
+# Shared by every session in this process.
+INDEXES = IndexCache()
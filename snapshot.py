@@ -0,0 +1,230 @@
+"""
+Compiled snapshot of the ontology and question bank.
+
+Parsing av_tutor.owl and importing the question bank on every worker start
+makes scale-up slow. ``python snapshot.py build`` compiles both into a single
+binary file that a new process can load with one read and one unpickle.
+
+File layout::
+
+    MAGIC (4 bytes) | format version (uint16) | source hash (32 bytes)
+    frame*          where frame = length (uint32) | pickle bytes
+
+The first frame holds the ontology and learning modules; the remaining frames
+hold the questions in batches, so a writer can append questions without
+keeping the whole bank in memory. The source hash covers the ontology file,
+the question bank source and the format version; a snapshot whose hash does
+not match the current sources is ignored and the app falls back to a full
+parse.
+
+``python snapshot.py bench`` reports cold-start time with and without the
+snapshot.
+"""
+import hashlib
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from ontology import DEFAULT_MODULE_CLASSES, build_learning_modules, load_ontology
+
+MAGIC = b"AVTS"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sH32s")
+_FRAME = struct.Struct("<I")
+QUESTION_BATCH = 1000
+
+BASE_DIR = Path(__file__).parent
+OWL_PATH = BASE_DIR / "av_tutor.owl"
+QUESTIONS_PATH = BASE_DIR / "questions.py"
+SNAPSHOT_PATH = BASE_DIR / "av_tutor.snapshot"
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    source_hash: bytes
+    ontology: object  # ontology.Ontology, or None if the ontology was unusable
+    modules: dict  # module title -> learning text, or None
+    questions: list  # question dicts in bank order
+
+
+def source_hash(owl_path=OWL_PATH, questions_path=QUESTIONS_PATH):
+    """Hash of everything a snapshot is compiled from."""
+    h = hashlib.sha256()
+    h.update(b"%d\0" % FORMAT_VERSION)
+    h.update(repr(sorted(DEFAULT_MODULE_CLASSES.items())).encode("utf-8"))
+    for path in (owl_path, questions_path):
+        h.update(b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.digest()
+
+
+class SnapshotWriter:
+    """Write a snapshot incrementally; the file appears atomically on close."""
+
+    def __init__(self, path, digest, ontology, modules):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._f = open(self._tmp, "wb")
+        self._f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, digest))
+        self._write_frame({"ontology": ontology, "modules": modules})
+        self._batch = []
+        self.count = 0
+
+    def _write_frame(self, obj):
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        self._f.write(_FRAME.pack(len(data)))
+        self._f.write(data)
+
+    def add_question(self, question):
+        self._batch.append(question)
+        self.count += 1
+        if len(self._batch) >= QUESTION_BATCH:
+            self._write_frame(self._batch)
+            self._batch = []
+
+    def close(self):
+        if self._batch:
+            self._write_frame(self._batch)
+            self._batch = []
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._f.close()
+        self._tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_snapshot(path):
+    """Read a snapshot file. Raises ValueError if it is not a valid snapshot."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise ValueError("snapshot too short")
+    magic, version, digest = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("not a version %d snapshot" % FORMAT_VERSION)
+
+    frames = []
+    pos = _HEADER.size
+    view = memoryview(data)
+    while pos < len(data):
+        (length,) = _FRAME.unpack_from(data, pos)
+        pos += _FRAME.size
+        if pos + length > len(data):
+            raise ValueError("truncated snapshot frame")
+        frames.append(pickle.loads(view[pos:pos + length]))
+        pos += length
+    if not frames:
+        raise ValueError("snapshot has no content frame")
+
+    questions = []
+    for batch in frames[1:]:
+        questions.extend(batch)
+    head = frames[0]
+    return Snapshot(digest, head["ontology"], head["modules"], questions)
+
+
+def load_snapshot(path=SNAPSHOT_PATH, expected_hash=None):
+    """Return the snapshot at ``path`` if it exists and matches ``expected_hash``.
+
+    Any problem (missing file, stale hash, corrupt data) returns None so the
+    caller can fall back to parsing the sources.
+    """
+    try:
+        snap = read_snapshot(path)
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+        return None
+    if expected_hash is not None and snap.source_hash != expected_hash:
+        return None
+    return snap
+
+
+def compile_sources(owl_path=OWL_PATH, questions_path=QUESTIONS_PATH):
+    """Parse the ontology and load the question bank without a snapshot."""
+    # runs the file rather than importing it: an already imported questions
+    # module may be older than the file that was hashed
+    from content_registry import load_questions
+
+    questions = load_questions(questions_path)
+
+    try:
+        ontology = load_ontology(owl_path)
+        modules = build_learning_modules(ontology) or None
+    except (OSError, UnicodeDecodeError, ValueError):
+        ontology, modules = None, None
+    return ontology, modules, questions
+
+
+def build(path=SNAPSHOT_PATH, owl_path=OWL_PATH, questions_path=QUESTIONS_PATH):
+    """Compile the ontology and question bank into a snapshot file."""
+    digest = source_hash(owl_path, questions_path)
+    ontology, modules, questions = compile_sources(owl_path, questions_path)
+    with SnapshotWriter(path, digest, ontology, modules) as writer:
+        for q in questions:
+            writer.add_question(q)
+    return digest, writer.count
+
+
+def _startup(mode):
+    # Runs in a fresh interpreter: time from here until content is ready.
+    start = time.perf_counter()
+    snap = None
+    if mode == "snapshot":
+        snap = load_snapshot(SNAPSHOT_PATH, source_hash())
+    if snap is None:
+        compile_sources()
+    print("%.6f %s" % (time.perf_counter() - start, "snapshot" if snap else "parse"))
+
+
+def bench(runs=5):
+    """Measure cold-start content loading in fresh processes."""
+    for mode in ("parse", "snapshot"):
+        loads, walls, used = [], [], set()
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, __file__, "_startup", mode],
+                check=True, capture_output=True, text=True, cwd=BASE_DIR,
+            ).stdout.split()
+            walls.append(time.perf_counter() - t0)
+            loads.append(float(out[0]))
+            used.add(out[1])
+        print("%-9s load %7.2f ms  process %7.2f ms  (min of %d, used: %s)" % (
+            mode, min(loads) * 1000, min(walls) * 1000, runs, ",".join(sorted(used))))
+
+
+def main(argv):
+    cmd = argv[1] if len(argv) > 1 else "build"
+    if cmd == "build":
+        digest, count = build()
+        print("wrote %s (%d questions, hash %s)" % (SNAPSHOT_PATH.name, count, digest.hex()[:12]))
+    elif cmd == "bench":
+        if load_snapshot(SNAPSHOT_PATH, source_hash()) is None:
+            build()
+        bench()
+    elif cmd == "_startup":
+        _startup(argv[2])
+    else:
+        print("usage: python snapshot.py [build|bench]", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,531 @@
+"""
+Static export of the learning modules and practice quizzes.
+
+Most traffic is read-only: browsing the Learning page and taking practice
+quizzes. Each of those views holds a live Streamlit session. ``python
+static_export.py`` pre-renders both into a bundle that any static file
+server can serve, with no Python session per reader. The live app stays in
+use for tracked assessments::
+
+    <output>/
+      index.html                    the courses
+      assets/style.css, quiz.js
+      <course>/index.html           its modules and practice quizzes
+      <course>/modules/<slug>.html  a module's concept page, every section as a <details>
+      <course>/concepts/<name>.html the other concepts a module teaches (cross-link targets)
+      <course>/quizzes/<n>.json     practice quiz variant n, with answers and explanations
+      <course>/quiz.html            loads a variant and scores it in the browser
+      manifest.json
+
+Pages are rendered with the same code as the app's concept pages
+(concept_pages.py). Quiz variants are grouped quizzes drawn like the app's,
+from the fixed seeds ``derive_seed("practice", course, n)``. The same
+sources therefore always give the same variants. Their JSON contains the
+answer key, because scoring happens in the browser, so variants are for
+practice only.
+
+The export is incremental. manifest.json records a hash of each course's
+source files (ontology and question bank) and a content hash for every page.
+A course whose sources hash the same as last time is not loaded at all.
+In a changed course, pages are rendered to their content (text, sections,
+links, questions), and only pages whose content hash changed are written.
+Files that are no longer produced are removed.
+
+    python static_export.py [--output site] [--course ID ...] [--variants 10] [--force]
+    python -m http.server -d site    # quiz.html fetches its JSON, so serve it over HTTP
+"""
+import argparse
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+from content_registry import build_registry
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = 1  # bump when the templates change, so every page is rewritten
+MANIFEST = "manifest.json"
+DEFAULT_VARIANTS = 10
+COURSES_FILE = os.environ.get("AV_TUTOR_COURSES")
+
+
+def digest(obj):
+    """Content hash of a JSON-serialisable value."""
+    data = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def source_digest(course, variants):
+    """Hash of everything a course's pages are rendered from, read from its files."""
+    from ontology import DEFAULT_MODULE_CLASSES
+    from quiz_generator import QUESTIONS_PER_MODULE
+
+    h = hashlib.blake2b(digest_size=16)
+    modules = course.module_classes or tuple(DEFAULT_MODULE_CLASSES.items())
+    h.update(repr((EXPORT_FORMAT, course.title, modules, variants, QUESTIONS_PER_MODULE)).encode("utf-8"))
+    for path in (course.ontology, course.questions):
+        h.update(b"\0")
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except OSError:
+            h.update(b"missing")
+    return h.hexdigest()
+
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "page"
+
+
+# --- Markdown -------------------------------------------------------------------
+
+_LIST_ITEM = re.compile(r"^(-|\d+\.) (.*)$")
+
+
+def _inline(text):
+    text = html.escape(text, quote=False)
+    text = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", text)
+    return re.sub(r"\*(.+?)\*", r"<em>\1</em>", text)
+
+
+def markdown_html(text):
+    """HTML for the markdown the concept pages produce: paragraphs, bullet and
+    numbered lists, **bold** and *italics*."""
+    out, paragraph, items, kind = [], [], [], None
+
+    def flush():
+        nonlocal kind
+        if paragraph:
+            out.append("<p>%s</p>" % "<br>".join(_inline(line) for line in paragraph))
+            paragraph.clear()
+        if items:
+            out.append("<%s>%s</%s>" % (kind, "".join("<li>%s</li>" % _inline(i) for i in items), kind))
+            items.clear()
+            kind = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        match = _LIST_ITEM.match(line)
+        if not line:
+            flush()
+        elif match:
+            list_kind = "ul" if match.group(1) == "-" else "ol"
+            if paragraph or list_kind != kind:
+                flush()
+            kind = list_kind
+            items.append(match.group(2))
+        else:
+            if items:
+                flush()
+            paragraph.append(line)
+    flush()
+    return "\n".join(out)
+
+
+# --- Page sources -----------------------------------------------------------------
+# Each page is first reduced to its content as a plain dict (the part that is
+# hashed), then turned into HTML only if that hash changed.
+
+class CourseExport:
+    """Page sources for one course's content, keyed by course-relative path."""
+
+    def __init__(self, course, content, variants):
+        self.course = course
+        self.content = content
+        self.variants = variants
+        self.texts = content.modules if content.modules is not None else dict.fromkeys(content.bank.modules(), "")
+        self.modules = list(self.texts)
+        slugs = set()
+        self.hrefs = {}
+        for title in self.modules:
+            slug = slugify(title)
+            while slug in slugs:
+                slug += "-2"
+            slugs.add(slug)
+            self.hrefs[title] = "modules/%s.html" % slug
+        classes = content.question_classes
+        self.module_class = dict(classes.module_class) if classes is not None else {}
+        # concept ID -> the module that teaches it (the first one, as on the Learning page)
+        self.owner = {}
+        for title in self.modules:
+            cls = self.module_class.get(title)
+            if cls is not None:
+                for i in content.index.descendants(cls):
+                    self.owner.setdefault(i, title)
+
+    def concept_href(self, cls):
+        """Course-relative link to a concept's page, or None if no module teaches it."""
+        from ontology import local_name
+
+        module = self.owner.get(cls)
+        if module is None:
+            return None
+        if self.module_class.get(module) == cls:
+            return self.hrefs[module]
+        return "concepts/%s.html" % slugify(local_name(self.content.index.iri(cls)))
+
+    def _module_page(self, module, title, overview, sections=(), links=(), concept=False):
+        i = self.modules.index(module)
+        return {
+            "kind": "page",
+            "module": module,
+            "title": title,
+            "overview": overview,
+            "sections": list(sections),
+            "links": list(links),
+            "back": [module, self.hrefs[module]] if concept else None,
+            "previous": [self.modules[i - 1], self.hrefs[self.modules[i - 1]]] if i > 0 else None,
+            "next": [self.modules[i + 1], self.hrefs[self.modules[i + 1]]] if i + 1 < len(self.modules) else None,
+        }
+
+    def concept_source(self, cls, module):
+        from concept_pages import build_page, render_section
+
+        content = self.content
+        page = build_page(content, cls)
+        links = []
+        for name, label in page.links:
+            href = self.concept_href(content.index.find(name))
+            if href is not None:
+                links.append([label, href])
+        concept = self.module_class.get(module) != cls
+        sections = [[heading, render_section(content, cls, key)] for key, heading in page.sections]
+        return self._module_page(module, page.title if concept else module, page.overview, sections, links, concept)
+
+    def quiz_source(self, n):
+        from quiz_generator import QUESTIONS_PER_MODULE, derive_seed, generate_quiz
+        from quiz_state import present_quiz
+
+        quiz = generate_quiz(self.content.bank, derive_seed("practice", self.course.id, n),
+                             modules=tuple(self.modules), per_module=QUESTIONS_PER_MODULE)
+        return {"course": self.course.id, "title": self.course.title, "variant": n,
+                "questions": list(present_quiz(self.content.bank, quiz.ids, quiz.perms))}
+
+    def pages(self):
+        """``(course-relative path, source)`` for every file of the course."""
+        yield "index.html", {"kind": "course", "title": self.course.title, "variants": self.variants,
+                             "modules": [[title, self.hrefs[title]] for title in self.modules]}
+        for title in self.modules:
+            cls = self.module_class.get(title)
+            if cls is None:
+                yield self.hrefs[title], self._module_page(title, title, self.texts[title] or "No content available.")
+            else:
+                yield self.hrefs[title], self.concept_source(cls, title)
+        for cls, module in self.owner.items():
+            if self.module_class.get(module) != cls:
+                yield self.concept_href(cls), self.concept_source(cls, module)
+        yield "quiz.html", {"kind": "quiz", "title": self.course.title, "variants": self.variants}
+        for n in range(self.variants):
+            yield "quizzes/%d.json" % n, self.quiz_source(n)
+
+
+# --- HTML -----------------------------------------------------------------------
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="stylesheet" href="{root}assets/style.css">
+</head>
+<body>
+<nav>{nav}</nav>
+<main>
+{body}
+</main>
+{scripts}</body>
+</html>
+"""
+
+STYLE = """body { font-family: system-ui, sans-serif; margin: 0; color: #222; line-height: 1.5; }
+nav { background: #f0f2f6; padding: 0.75rem 1.5rem; }
+nav a { margin-right: 1.25rem; }
+main { max-width: 46rem; margin: 0 auto; padding: 1rem 1.5rem 3rem; }
+a { color: #1f6feb; text-decoration: none; }
+a:hover { text-decoration: underline; }
+details { border: 1px solid #ddd; border-radius: 0.4rem; padding: 0.4rem 0.8rem; margin: 0.6rem 0; }
+summary { cursor: pointer; font-weight: 600; }
+.links a, .pager a { display: inline-block; margin: 0.2rem 0.8rem 0.2rem 0; }
+.pager { border-top: 1px solid #ddd; margin-top: 2rem; padding-top: 1rem; }
+.question { border-bottom: 1px solid #eee; padding: 0.8rem 0; }
+.question label { display: block; padding: 0.1rem 0; }
+.right { color: #1a7f37; }
+.wrong { color: #cf222e; }
+button { font-size: 1rem; padding: 0.4rem 1.2rem; }
+table { border-collapse: collapse; }
+td, th { padding: 0.2rem 0.8rem; text-align: left; }
+"""
+
+QUIZ_SCRIPT = r"""// Practice quiz: loads quizzes/<variant>.json and scores answers in the browser.
+(function () {
+  var main = document.getElementById("quiz");
+  var variants = parseInt(main.dataset.variants, 10);
+  var params = new URLSearchParams(location.search);
+  var variant = parseInt(params.get("v"), 10);
+  if (!(variant >= 0 && variant < variants)) variant = Math.floor(Math.random() * variants);
+
+  function el(tag, text, cls) {
+    var e = document.createElement(tag);
+    if (text !== undefined) e.textContent = text;
+    if (cls) e.className = cls;
+    return e;
+  }
+
+  fetch("quizzes/" + variant + ".json").then(function (r) { return r.json(); }).then(function (quiz) {
+    var form = el("form");
+    var module = null;
+    quiz.questions.forEach(function (q, i) {
+      if (q.module !== module) { module = q.module; form.appendChild(el("h3", module)); }
+      var box = el("div", undefined, "question");
+      box.appendChild(el("p", (i + 1) + ". " + q.question));
+      q.options.forEach(function (option, j) {
+        var label = el("label"), input = el("input");
+        input.type = "radio"; input.name = "q" + i; input.value = j;
+        label.appendChild(input); label.appendChild(document.createTextNode(" " + option));
+        box.appendChild(label);
+      });
+      box.appendChild(el("p", undefined, "feedback"));
+      form.appendChild(box);
+    });
+    var submit = el("button", "Submit answers"); submit.type = "submit";
+    form.appendChild(submit);
+    var result = el("div");
+    form.addEventListener("submit", function (event) {
+      event.preventDefault();
+      var score = 0, modules = {};
+      quiz.questions.forEach(function (q, i) {
+        var chosen = form.querySelector("input[name=q" + i + "]:checked");
+        var right = chosen !== null && parseInt(chosen.value, 10) === q.correct;
+        var m = modules[q.module] || (modules[q.module] = [0, 0]);
+        m[0] += right ? 1 : 0; m[1] += 1; score += right ? 1 : 0;
+        var feedback = form.querySelectorAll(".feedback")[i];
+        feedback.className = "feedback " + (right ? "right" : "wrong");
+        feedback.textContent = (right ? "Correct. " : "Answer: " + q.options[q.correct] + ". ") + q.explanation;
+      });
+      result.innerHTML = "";
+      result.appendChild(el("h2", "Score: " + score + " / " + quiz.questions.length));
+      var table = el("table");
+      Object.keys(modules).forEach(function (m) {
+        var row = el("tr");
+        row.appendChild(el("td", m)); row.appendChild(el("td", modules[m][0] + " / " + modules[m][1]));
+        table.appendChild(row);
+      });
+      result.appendChild(table);
+      var again = el("a", "Try another practice quiz");
+      again.href = "quiz.html?v=" + ((variant + 1) % variants);
+      result.appendChild(el("p")).appendChild(again);
+      result.scrollIntoView();
+    });
+    main.appendChild(el("p", "Practice quiz " + (variant + 1) + " of " + variants));
+    main.appendChild(form);
+    main.appendChild(result);
+  }).catch(function () {
+    main.appendChild(el("p", "Could not load the quiz; this page has to be served over HTTP."));
+  });
+})();
+"""
+
+
+def _link(label, href):
+    return '<a href="%s">%s</a>' % (html.escape(href), html.escape(label))
+
+
+def _page(title, body, root, nav=(), scripts=()):
+    return PAGE.format(title=html.escape(title), root=root, nav="".join(_link(*n) for n in nav), body=body,
+                       scripts="".join('<script src="%s"></script>\n' % html.escape(s) for s in scripts))
+
+
+def render(path, source, course_title=None):
+    """File contents for the source of the page at ``path`` (relative to its course, or to the site root)."""
+    if path.endswith(".json"):
+        return json.dumps(source, ensure_ascii=False, separators=(",", ":"))
+    kind = source["kind"]
+    if kind == "asset":
+        return source["text"]
+    if kind == "courses":
+        body = "<h1>🛡️ Courses</h1>\n<ul>%s</ul>" % "".join(
+            "<li>%s</li>" % _link(title, "%s/index.html" % course_id) for course_id, title in source["courses"])
+        return _page("Courses", body, "")
+
+    # everything else belongs to a course; pages in modules/ and concepts/ are one level further down
+    up = "../" if "/" in path else ""
+    nav = (("All courses", up + "../index.html"), ("Modules", up + "index.html"), ("Practice quiz", up + "quiz.html"))
+    if kind == "course":
+        body = ["<h1>%s</h1>" % html.escape(source["title"]), "<h2>📚 Learning modules</h2>", "<ol>"]
+        body += ["<li>%s</li>" % _link(title, href) for title, href in source["modules"]]
+        body.append("</ol>")
+        if source["variants"]:
+            body.append("<h2>❓ Practice quizzes</h2>")
+            body.append('<p class="links">%s</p>' % "".join(
+                _link("Quiz %d" % (n + 1), "quiz.html?v=%d" % n) for n in range(source["variants"])))
+        return _page(source["title"], "\n".join(body), "../", nav)
+    if kind == "quiz":
+        body = '<h1>❓ %s: practice quiz</h1>\n<div id="quiz" data-variants="%d"></div>' % (
+            html.escape(source["title"]), source["variants"])
+        return _page("Practice quiz · " + source["title"], body, "../", nav, scripts=("../assets/quiz.js",))
+
+    body = ["<h1>%s</h1>" % html.escape(source["module"])]
+    if source["back"]:
+        body.append("<h2>%s</h2>" % html.escape(source["title"]))
+    body.append(markdown_html(source["overview"]))
+    for heading, section in source["sections"]:
+        body.append("<details><summary>%s</summary>\n%s\n</details>" % (html.escape(heading), markdown_html(section)))
+    if source["links"]:
+        body.append('<p>See also</p>\n<p class="links">%s</p>' % "".join(
+            _link(label, up + href) for label, href in source["links"]))
+    pager = []
+    if source["back"]:
+        pager.append(("⬅️ Back to " + source["back"][0], source["back"][1]))
+    if source["previous"]:
+        pager.append(("⬅️ " + source["previous"][0], source["previous"][1]))
+    if source["next"]:
+        pager.append((source["next"][0] + " ➡️", source["next"][1]))
+    pager.append(("❓ Take Quiz", "quiz.html"))
+    body.append('<div class="pager">%s</div>' % "".join(_link(label, up + href) for label, href in pager))
+    return _page("%s · %s" % (source["title"], course_title), "\n".join(body), up + "../", nav)
+
+
+# --- Export ---------------------------------------------------------------------
+
+def _write(path, text):
+    """Replace ``path`` atomically, so a server never sends a half-written page."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_manifest(output):
+    try:
+        with open(Path(output) / MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format") == EXPORT_FORMAT else None
+
+
+class Export:
+    """One run of the exporter: writes changed files and keeps the manifest up to date."""
+
+    def __init__(self, output, force=False):
+        self.output = Path(output)
+        old = None if force else load_manifest(self.output)
+        self.old = old or {"courses": {}, "files": {}}
+        self.manifest = {"format": EXPORT_FORMAT, "courses": dict(self.old["courses"]),
+                         "files": dict(self.old["files"])}
+        self.written = self.unchanged = self.removed = 0
+
+    def emit(self, path, source, course_title=None, rel=None):
+        """Write the file at site path ``path`` unless its content hash is unchanged."""
+        h = digest(source)
+        self.manifest["files"][path] = h
+        if self.old["files"].get(path) == h and (self.output / path).exists():
+            self.unchanged += 1
+            return
+        _write(self.output / path, render(rel or path, source, course_title))
+        self.written += 1
+
+    def remove(self, paths):
+        for path in paths:
+            self.manifest["files"].pop(path, None)
+            try:
+                os.remove(self.output / path)
+            except FileNotFoundError:
+                pass
+            self.removed += 1
+
+    def course_files(self, course_id):
+        prefix = course_id + "/"
+        return {p for p in self.manifest["files"] if p.startswith(prefix)}
+
+    def course(self, registry, course_id, variants):
+        """Export one course; returns False if it was up to date and not loaded."""
+        course = registry.courses[course_id]
+        source = source_digest(course, variants)
+        previous = self.old["courses"].get(course_id)
+        existing = self.course_files(course_id)
+        if (previous is not None and previous["source"] == source
+                and all((self.output / p).exists() for p in existing)):
+            return False
+        content = registry.content(course_id)
+        if content is None:
+            raise FileNotFoundError("content files for course %r are missing" % course_id)
+        produced = set()
+        for rel, page in CourseExport(course, content, variants).pages():
+            path = "%s/%s" % (course_id, rel)
+            produced.add(path)
+            self.emit(path, page, course.title, rel)
+        self.remove(existing - produced)
+        self.manifest["courses"][course_id] = {"source": source, "title": course.title}
+        return True
+
+    def drop_course(self, course_id):
+        self.remove(self.course_files(course_id))
+        self.manifest["courses"].pop(course_id, None)
+
+    def finish(self):
+        """Write the site-wide files and the manifest, which goes last."""
+        self.emit("assets/style.css", {"kind": "asset", "text": STYLE})
+        self.emit("assets/quiz.js", {"kind": "asset", "text": QUIZ_SCRIPT})
+        courses = sorted((course_id, c["title"]) for course_id, c in self.manifest["courses"].items())
+        self.emit("index.html", {"kind": "courses", "courses": courses})
+        _write(self.output / MANIFEST, json.dumps(self.manifest, indent=1, sort_keys=True))
+
+
+def export(output, course_ids=None, variants=DEFAULT_VARIANTS, force=False, registry=None):
+    """Export ``course_ids`` (default: every course) into ``output``; returns the Export."""
+    if variants < 1:
+        raise ValueError("variants must be at least 1, got %r" % variants)
+    registry = registry or build_registry(COURSES_FILE)
+    run = Export(output, force)
+    if course_ids is None:
+        course_ids = list(registry.courses)
+        for gone in set(run.manifest["courses"]) - set(course_ids):
+            run.drop_course(gone)
+    run.rebuilt = []
+    for course_id in course_ids:
+        if course_id not in registry.courses:
+            raise KeyError("unknown course %r" % course_id)
+        if run.course(registry, course_id, variants):
+            run.rebuilt.append(course_id)
+    run.finish()
+    return run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render learning modules and practice quizzes to static files.")
+    parser.add_argument("--output", default="site", help="bundle directory (default: site)")
+    parser.add_argument("--course", action="append", dest="courses", metavar="ID",
+                        help="export only this course; repeat for several (default: every course)")
+    parser.add_argument("--variants", type=int, default=DEFAULT_VARIANTS,
+                        help="practice quiz variants per course (default: %d)" % DEFAULT_VARIANTS)
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and rewrite every file")
+    args = parser.parse_args(argv)
+    if args.variants < 1:
+        # every course page links to the practice quiz
+        parser.error("--variants must be at least 1")
+    logging.basicConfig(level=logging.WARNING)
+
+    start = time.perf_counter()
+    try:
+        run = export(args.output, args.courses, args.variants, args.force)
+    except (KeyError, FileNotFoundError) as e:
+        print(e.args[0], file=sys.stderr)
+        return 1
+    print("%d course(s) rebuilt (%s), %d up to date" % (
+        len(run.rebuilt), ", ".join(run.rebuilt) or "none", len(run.manifest["courses"]) - len(run.rebuilt)))
+    print("%d files written, %d unchanged, %d removed in %.2f s -> %s" % (
+        run.written, run.unchanged, run.removed, time.perf_counter() - start, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
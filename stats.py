@@ -0,0 +1,16 @@
+"""
+Small statistics helpers shared by the app's instrumentation and benchmarks.
+
+Kept free of imports from the rest of the app, so telemetry can use them
+without pulling in the features it measures.
+"""
+import math
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    # the smallest value with at least pct% of the values at or below it
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct * len(sorted_values) / 100.0) - 1))
+    return sorted_values[rank]
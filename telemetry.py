@@ -0,0 +1,318 @@
+"""
+Opt-in timing of the app's hot paths.
+
+Set AV_TUTOR_TELEMETRY=1 to time every rerun, content loading, quiz
+initialisation and each page function, and to track how large each
+session's state grows from rerun to rerun. Timings are kept per process:
+
+- aggregated per span name into histograms, exported as Prometheus text
+- the most recent spans with their trace and parent IDs, exported as
+  OpenTelemetry (OTLP/JSON) trace data
+
+The app shows them in a sidebar debug panel. AV_TUTOR_TELEMETRY_FILE names
+a file that is rewritten at most every EXPORT_INTERVAL seconds (and at
+exit): a ``.json`` file gets OTLP/JSON spans, anything else Prometheus text.
+
+When telemetry is off ``instrument`` returns functions unchanged and
+``span`` is a no-op context manager, so the app pays one flag check per
+rerun and nothing per call.
+
+    python telemetry.py    # cost of one span, on and off
+"""
+import atexit
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from stats import percentile
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("AV_TUTOR_TELEMETRY") == "1"
+EXPORT_PATH = os.environ.get("AV_TUTOR_TELEMETRY_FILE")
+EXPORT_INTERVAL = 10.0
+
+RECENT_SPANS = 2048  # finished spans kept for the trace export
+RECENT_SAMPLES = 1024  # durations kept per span name for percentiles
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTE_BUCKETS = (1 << 10, 4 << 10, 16 << 10, 64 << 10, 256 << 10, 1 << 20, 4 << 20, 16 << 20)
+
+
+class Histogram:
+    """Fixed-bucket histogram plus a window of recent samples for percentiles."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, pct):
+        """Nearest-rank percentile of the recent samples (0 if there are none)."""
+        return percentile(sorted(self.recent), pct)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent", "start_ns", "duration_ns", "error", "children")
+
+    def __init__(self, name, parent):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.start_ns = time.time_ns()
+        self.duration_ns = 0
+        self.error = None
+        self.children = []
+
+    def tree(self, depth=0):
+        """``(depth, name, milliseconds)`` rows for this span and everything under it."""
+        rows = [(depth, self.name, self.duration_ns / 1e6)]
+        for child in self.children:
+            rows.extend(child.tree(depth + 1))
+        return rows
+
+
+def _size(obj, seen, expand=True):
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, array)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(_size(k, seen, expand) + _size(v, seen, expand) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return size + sum(_size(v, seen, expand) for v in obj)
+    if not expand:
+        return size
+    attrs = getattr(obj, "__dict__", None)
+    if attrs is None:
+        attrs = {s: getattr(obj, s) for s in getattr(type(obj), "__slots__", ()) if hasattr(obj, s)}
+    return size + sum(_size(v, seen, False) for v in attrs.values())
+
+
+def state_size(session_state, skip=()):
+    """Approximate bytes held by a session's state.
+
+    Containers, arrays and scalars are measured all the way down. Other
+    objects count their own attributes, but objects those refer to only by
+    their shallow size: they are mostly shared between sessions (question
+    banks, adaptive models). Keys in ``skip`` are left out.
+    """
+    seen = set()
+    return sum(_size(session_state[k], seen) for k in list(session_state.keys()) if k not in skip)
+
+
+class Telemetry:
+    """Thread-safe span and session-state statistics for one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.spans = {}  # name -> Histogram of seconds
+        self.state_bytes = Histogram(BYTE_BUCKETS)
+        self.state_growth = 0  # bytes added to session states since start, net
+        self.recent = deque(maxlen=RECENT_SPANS)
+        self.started_at = time.time()
+        self._last_export = time.monotonic()
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block as ``name``, nested under the enclosing span."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        s = Span(name, stack[-1] if stack else None)
+        stack.append(s)
+        start = time.perf_counter_ns()
+        try:
+            yield s
+        except BaseException as e:
+            # st.rerun() and st.stop() unwind through here too; record what ended the span
+            s.error = type(e).__name__
+            raise
+        finally:
+            s.duration_ns = time.perf_counter_ns() - start
+            stack.pop()
+            if s.parent is not None:
+                s.parent.children.append(s)
+            with self._lock:
+                hist = self.spans.get(name)
+                if hist is None:
+                    hist = self.spans[name] = Histogram(DURATION_BUCKETS)
+                hist.observe(s.duration_ns / 1e9)
+                self.recent.append(s)
+            if s.parent is None and EXPORT_PATH:
+                self.maybe_export(EXPORT_PATH)
+
+    def observe_state(self, size, previous=None):
+        """Record a session's state size at the end of a rerun; returns the growth since ``previous``."""
+        growth = size - previous if previous is not None else size
+        with self._lock:
+            self.state_bytes.observe(size)
+            self.state_growth += growth
+        return growth
+
+    def table(self):
+        """One row per span name: calls and latency in milliseconds."""
+        with self._lock:
+            items = sorted(self.spans.items(), key=lambda kv: kv[1].sum, reverse=True)
+            return [{
+                "span": name,
+                "calls": h.count,
+                "total ms": round(h.sum * 1000, 1),
+                "mean ms": round(h.sum / h.count * 1000, 2),
+                "p50 ms": round(h.percentile(50) * 1000, 2),
+                "p90 ms": round(h.percentile(90) * 1000, 2),
+                "max ms": round(h.max * 1000, 2),
+            } for name, h in items]
+
+    def prometheus(self):
+        """Prometheus text exposition of the span and session-state histograms."""
+        lines = []
+
+        def histogram(metric, hist, labels=""):
+            cumulative = 0
+            for bound, n in zip(hist.bounds + (float("inf"),), hist.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append('%s_bucket{%sle="%s"} %d' % (metric, labels, le, cumulative))
+            braces = "{%s}" % labels.rstrip(",") if labels else ""
+            lines.append("%s_sum%s %r" % (metric, braces, hist.sum))
+            lines.append("%s_count%s %d" % (metric, braces, hist.count))
+
+        with self._lock:
+            lines.append("# HELP av_tutor_span_duration_seconds Time spent in instrumented app code.")
+            lines.append("# TYPE av_tutor_span_duration_seconds histogram")
+            for name, hist in sorted(self.spans.items()):
+                histogram("av_tutor_span_duration_seconds", hist, 'span="%s",' % name)
+            lines.append("# HELP av_tutor_session_state_bytes Session state size at the end of a rerun.")
+            lines.append("# TYPE av_tutor_session_state_bytes histogram")
+            histogram("av_tutor_session_state_bytes", self.state_bytes)
+            lines.append("# HELP av_tutor_session_state_growth_bytes Net bytes added to session states.")
+            lines.append("# TYPE av_tutor_session_state_growth_bytes gauge")
+            lines.append("av_tutor_session_state_growth_bytes %d" % self.state_growth)
+        return "\n".join(lines) + "\n"
+
+    def otlp(self):
+        """Recent spans as an OTLP/JSON ``ExportTraceServiceRequest`` document."""
+        with self._lock:
+            spans = list(self.recent)
+        out = []
+        for s in spans:
+            span = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.start_ns + s.duration_ns),
+                "status": {"code": 0},
+            }
+            if s.parent is not None:
+                span["parentSpanId"] = s.parent.span_id
+            if s.error:
+                span["attributes"] = [{"key": "exception.type", "value": {"stringValue": s.error}}]
+            out.append(span)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": "av-tutor"}},
+                {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "av_tutor.telemetry"}, "spans": out}],
+        }]}
+
+    def export(self, path):
+        """Write OTLP/JSON (``.json``) or Prometheus text to ``path``, replacing it atomically."""
+        text = json.dumps(self.otlp()) if str(path).endswith(".json") else self.prometheus()
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("Could not write telemetry to %s: %s", path, e)
+
+    def maybe_export(self, path):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_export < EXPORT_INTERVAL:
+                return
+            self._last_export = now
+        self.export(path)
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.state_bytes = Histogram(BYTE_BUCKETS)
+            self.state_growth = 0
+            self.recent.clear()
+            self.started_at = time.time()
+
+
+TELEMETRY = Telemetry()
+
+if ENABLED and EXPORT_PATH:
+    atexit.register(TELEMETRY.export, EXPORT_PATH)
+
+
+def span(name):
+    """Context manager timing a block as ``name``; a no-op when telemetry is off."""
+    return TELEMETRY.span(name) if ENABLED else nullcontext()
+
+
+def instrument(name=None):
+    """Decorator timing every call as a span; returns the function unchanged when telemetry is off."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            with TELEMETRY.span(label):
+                return fn(*args, **kwargs)
+        return timed
+    return decorate
+
+
+def main():
+    def work():
+        return None
+
+    calls = 200_000
+    on = Telemetry()
+    start = time.perf_counter()
+    for _ in range(calls):
+        work()
+    plain = (time.perf_counter() - start) / calls
+    start = time.perf_counter()
+    for _ in range(calls):
+        with on.span("work"):
+            work()
+    spanned = (time.perf_counter() - start) / calls
+    print("call %.3f us; off: unchanged function, +0 us; on: %.2f us per span" % (
+        plain * 1e6, (spanned - plain) * 1e6))
+
+
+if __name__ == "__main__":
+    main()